@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: api_index
+   :synopsis: this file contains the ApiIndex class, the indexes of the assembly read by the exposed API.
+"""
+
+import threading
+from typing import Dict, Iterable, Set, Tuple
+
+from concerto.api_snapshot import ApiSnapshot
+from concerto.connection import Connection
+from concerto.dependency import Dependency
+
+
+class ApiIndex:
+    """
+    Indexes of the assembly answering the requests of the remote assemblies:
+    - the local dependencies having at least one connection, by (component name, dependency name)
+    - the connections of each component, by (use component, use dependency, provide component, provide dependency)
+
+    They are updated by connect/disconnect and by the changes of the dependencies states (nb_users, is_refusing,
+    data), so that only the changed entries of the ApiSnapshot are replaced instead of all the connections.
+    """
+
+    def __init__(self):
+        self.dependencies: Dict[Tuple[str, str], Dependency] = {}
+        self.connections: Dict[str, Set[Tuple[str, str, str, str]]] = {}
+        # Entries changed since the last snapshot
+        self._changed_dependencies: Set[Tuple[str, str]] = set()
+        self._changed_components: Set[str] = set()
+        self._changes_lock = threading.Lock()
+
+    @staticmethod
+    def build_connection_key(conn: Connection) -> Tuple[str, str, str, str]:
+        use, provide = (conn.get_use_dep(), conn.get_provide_dep())
+        return use.get_component_name(), use.get_name(), provide.get_component_name(), provide.get_name()
+
+    def add_connection(self, conn: Connection, components_names: Iterable[str]):
+        """
+        <components_names>: the local components of the connection
+        """
+        key = self.build_connection_key(conn)
+        with self._changes_lock:
+            for component_name in components_names:
+                self.connections.setdefault(component_name, set()).add(key)
+                self._changed_components.add(component_name)
+                for dep in (conn.get_use_dep(), conn.get_provide_dep()):
+                    if dep.get_component_name() == component_name:
+                        self.dependencies[(component_name, dep.get_name())] = dep
+                        self._changed_dependencies.add((component_name, dep.get_name()))
+
+    def remove_connection(self, conn: Connection, components_names: Iterable[str]):
+        """
+        Called once <conn> is disconnected from its dependencies
+        """
+        key = self.build_connection_key(conn)
+        with self._changes_lock:
+            for component_name in components_names:
+                self.connections.get(component_name, set()).discard(key)
+                self._changed_components.add(component_name)
+                for dep in (conn.get_use_dep(), conn.get_provide_dep()):
+                    if dep.get_component_name() == component_name and len(dep.dependency_connections) == 0:
+                        self.dependencies.pop((component_name, dep.get_name()), None)
+                        self._changed_dependencies.add((component_name, dep.get_name()))
+
+    def mark_dependency_changed(self, dependency: Dependency):
+        """
+        Thread safe, called when the state of <dependency> changed (the data can be written by a transition)
+        """
+        with self._changes_lock:
+            self._changed_dependencies.add((dependency.get_component_name(), dependency.get_name()))
+
+    def update_snapshot(self, snapshot: ApiSnapshot):
+        """
+        Replaces the entries of <snapshot> changed since the last update, in O(number of changed entries)
+        """
+        with self._changes_lock:
+            changed_dependencies = self._changed_dependencies
+            changed_components = self._changed_components
+            self._changed_dependencies = set()
+            self._changed_components = set()
+
+        for key in changed_dependencies:
+            dep = self.dependencies.get(key)
+            snapshot.set_dependency(key, (dep.nb_users, dep.is_refusing, dep.data) if dep is not None else None)
+        for component_name in changed_components:
+            snapshot.set_connections(component_name, frozenset(self.connections.get(component_name, ())))
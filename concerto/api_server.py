@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: api_server
+   :synopsis: this file contains the ApiServer class, the asyncio HTTP server of the exposed API.
+"""
+
+import asyncio
+import json
+from threading import Thread
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from concerto import clock, exposed_api
+from concerto.debug_logger import log
+
+# Maximum size of the request line and of each header line
+MAX_LINE_SIZE = 8192
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class ApiServer:
+    """
+    HTTP/1.1 server of the endpoints of exposed_api, running on an asyncio event loop in its own thread.
+    The connections are kept alive (see rest_communication), each request is answered from the ApiSnapshot
+    of the assembly without blocking the loop.
+    """
+
+    def __init__(self, assembly, port: int, host: str = "0.0.0.0"):
+        self.assembly = assembly
+        self.host: str = host
+        self.port: int = port
+        # endpoint name => (function of exposed_api, number of path arguments)
+        self.routes: Dict[str, Tuple] = {
+            "get_nb_dependency_users": (exposed_api.get_nb_dependency_users, 2),
+            "get_refusing_state": (exposed_api.get_refusing_state, 2),
+            "get_data_dependency": (exposed_api.get_data_dependency, 2),
+            "is_conn_synced": (exposed_api.is_conn_synced, 5),
+        }
+        self.nb_requests: int = 0
+
+    def handle_request(self, method: str, target: str, body: bytes, accept: Optional[str] = None) -> Tuple[int, str, bytes]:
+        """
+        :return: (status, content type, body)
+        """
+        url = urlsplit(target)
+        path = [unquote(part) for part in url.path.strip("/").split("/")]
+        endpoint_name, args = path[0], path[1:]
+        binary = exposed_api.accepts_binary(accept)
+        if endpoint_name == "batch":
+            if method != "POST":
+                return 405, "text/plain", b""
+            results = exposed_api.run_batch(self.assembly, json.loads(body)["queries"])
+            return (200, *exposed_api.render_batch_results(results, binary))
+        if method not in ("GET", "HEAD"):
+            return 405, "text/plain", b""
+        if endpoint_name == "get_remote_component_state" and len(args) == 1:
+            calling_assembly_name = parse_qs(url.query).get("calling_assembly_name", [None])[0]
+            result = exposed_api.get_remote_component_state(self.assembly, args[0], calling_assembly_name)
+        elif endpoint_name in self.routes:
+            function, nb_args = self.routes[endpoint_name]
+            if len(args) != nb_args:
+                return 404, "text/plain", b""
+            result = function(self.assembly, *args)
+        else:
+            return 404, "text/plain", b""
+        if result is None:
+            # Same as the Flask server when the lookup failed
+            return 500, "text/plain", b""
+        return (200, *exposed_api.render_result(result, binary))
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                content_length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(content_length) if content_length > 0 else b""
+
+                self.nb_requests += 1
+                try:
+                    status, content_type, payload = self.handle_request(method, target, body, headers.get("accept"))
+                except Exception as e:
+                    log.exception(e)
+                    status, content_type, payload = 500, "text/plain", b""
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                response_headers = (
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"{clock.CLOCK_HEADER}: {clock.wall_time_ns()}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                ).encode("latin-1")
+                writer.write(response_headers if method == "HEAD" else response_headers + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            # Client gone or malformed request: the connection is dropped
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=MAX_LINE_SIZE)
+        async with server:
+            await server.serve_forever()
+
+    def run(self):
+        asyncio.run(self.serve())
+
+
+def run_api_server_in_thread(assembly, port: int) -> ApiServer:
+    api_server = ApiServer(assembly, port)
+    thread = Thread(target=api_server.run, name="concerto_api_server")
+    thread.setDaemon(True)  # Required to make the program exit when main thread exit
+    thread.start()
+    return api_server
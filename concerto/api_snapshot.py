@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: api_snapshot
+   :synopsis: this file contains the ApiSnapshot class, the state of the assembly read by the exposed API.
+"""
+
+import threading
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+
+class ApiSnapshot:
+    """
+    Copy of the state of the dependencies and of the connections of the assembly, answering the requests of the
+    remote assemblies. It is updated from the ApiIndex of the assembly between two semantics iterations (see
+    Assembly.publish_api_snapshot), entry by entry: each entry is an immutable value (tuple, frozenset) replaced as a
+    whole, so the threads of the API server always read a consistent entry without racing with the semantics loop,
+    each lookup is a hash lookup and an update costs O(1) per changed entry.
+    """
+
+    __slots__ = ("dependencies", "connections", "_update_lock")
+
+    def __init__(self, dependencies: Optional[Dict[Tuple[str, str], Tuple[int, bool, Any]]] = None,
+                 connections: Optional[Dict[str, FrozenSet[Tuple[str, str, str, str]]]] = None):
+        # (component name, dependency name) => (nb_users, is_refusing, data)
+        self.dependencies = dependencies if dependencies is not None else {}
+        # component name => {(use component, use dependency, provide component, provide dependency)}
+        self.connections = connections if connections is not None else {}
+        # Serializes the updates, the lookups are single reads of the dicts and take no lock
+        self._update_lock = threading.Lock()
+
+    def set_dependency(self, key: Tuple[str, str], state: Optional[Tuple[int, bool, Any]]):
+        """
+        :param state: (nb_users, is_refusing, data), None to remove the dependency
+        """
+        with self._update_lock:
+            if state is None:
+                self.dependencies.pop(key, None)
+            else:
+                self.dependencies[key] = state
+
+    def set_connections(self, component_name: str, connections_keys: FrozenSet[Tuple[str, str, str, str]]):
+        with self._update_lock:
+            self.connections[component_name] = connections_keys
+
+    def get_dependency(self, component_name: str, dependency_name: str) -> Optional[Tuple[int, bool, Any]]:
+        """
+        :return: (nb_users, is_refusing, data) of the dependency, None if it has no connection
+        """
+        return self.dependencies.get((component_name, dependency_name))
+
+    def get_nb_dependency_users(self, component_name: str, dependency_name: str) -> Optional[int]:
+        dependency = self.dependencies.get((component_name, dependency_name))
+        return dependency[0] if dependency is not None else None
+
+    def get_refusing_state(self, component_name: str, dependency_name: str) -> Optional[bool]:
+        dependency = self.dependencies.get((component_name, dependency_name))
+        return dependency[1] if dependency is not None else None
+
+    def get_data_dependency(self, component_name: str, dependency_name: str) -> Any:
+        dependency = self.dependencies.get((component_name, dependency_name))
+        return dependency[2] if dependency is not None else None
+
+    def has_dependency(self, component_name: str, dependency_name: str) -> bool:
+        return (component_name, dependency_name) in self.dependencies
+
+    def is_connected(self, syncing_component: str, component_to_sync: str, dep_to_sync: str, syncing_dep: str) -> bool:
+        """
+        True if <component_to_sync> has a connection between the two components and the two dependencies, in
+        any direction
+        """
+        connections_keys = self.connections.get(component_to_sync, frozenset())
+        components = (component_to_sync, syncing_component)
+        deps = (dep_to_sync, syncing_dep)
+        return any((use_comp, use_dep, provide_comp, provide_dep) in connections_keys
+                   for use_comp in components for provide_comp in components
+                   for use_dep in deps for provide_dep in deps)
@@ -7,27 +7,31 @@
 """
 import math
 import time
-from os.path import exists
 from pathlib import Path
 from typing import Dict, List, Set, Optional
 
 from concerto import communication_handler, assembly_config, time_logger, global_variables, rest_communication, exposed_api
+from concerto.api_index import ApiIndex
+from concerto.api_snapshot import ApiSnapshot
 from concerto.communication_handler import CONN, DECONN, INACTIVE
 from concerto.dependency import DepType
 from concerto.component import Component
 from concerto.debug_logger import log, log_once
-from concerto.global_variables import CONCERTO_D_SYNCHRONOUS
+from concerto.global_variables import CONCERTO_D_SYNCHRONOUS, CONCERTO_D_CENTRAL
 from concerto.remote_dependency import RemoteDependency
+from concerto.semantics_profiler import SemanticsProfiler
+from concerto.semantics_scheduler import SemanticsScheduler
+from concerto.snapshot_codec import SnapshotCodec
+from concerto.state_journal import JournaledState
 from concerto.time_checker_assemblies import TimeCheckerAssemblies
 from concerto.time_logger import TimestampType, create_timestamp_metric
 from concerto.transition import Transition
+from concerto.transition_executor import TransitionExecutor, TransitionEventLoop, THREAD_POOL
 from concerto.connection import Connection
+from concerto.exporters import trace_export
 from concerto.gantt_record import GanttRecord
 from concerto.utility import COLORS, TimeManager
 
-# In synchronous execution, how much interval (in seconds) to poll results
-FREQUENCE_POLLING = 0.05
-
 
 def track_instruction_number(func):
     """
@@ -90,6 +94,12 @@ class Assembly(object):
         # set of active components
         self.act_components: Set[str] = set()
 
+        # set of the components having at least one connection with a remote assembly, their remote
+        # dependencies are polled by the semantics loop
+        self.remotely_connected_components: Set[str] = set()
+        # True while an instruction (wait, wait_all) polls the state of remote components or assemblies
+        self.is_waiting_remote_state: bool = False
+
         # Nombre permettant de savoir à partir de quelle instruction reprendre le programme
         self.global_nb_instructions_done: Dict[str, int] = {reconfiguration_name: 0}
 
@@ -111,12 +121,41 @@ class Assembly(object):
 
         self.exit_code_sleep = 0
 
+        # Wakes up the semantics loop on events instead of polling (see set_event_driven_semantics)
+        # and evaluates only the components with pending work. In concerto-d-central, the components become
+        # ready when their node wakes up (see time_checker), which is not notified: they are all evaluated
+        self.scheduler = SemanticsScheduler()
+        self.scheduler.set_dirty_set_enabled(concerto_d_version != CONCERTO_D_CENTRAL)
+
+        # Executor running the functions of the transitions of the components (see set_transition_executor)
+        self.transition_executor: TransitionExecutor = TransitionExecutor()
+        # Event loop running the transitions functions declared with async def
+        self.transition_event_loop: TransitionEventLoop = TransitionEventLoop()
+
+        # Dependencies and connections states indexed for the exposed API, and the state read by the threads of
+        # the API (synchronous mode), replaced between two semantics iterations
+        self.api_index: ApiIndex = ApiIndex()
+        self.api_snapshot: ApiSnapshot = ApiSnapshot()
+
         global_variables.concerto_d_version = concerto_d_version
         global_variables.reconfiguration_name = reconfiguration_name
         global_variables.current_nb_instructions_done = 0
 
+        # State saved on disk, loaded at wake up: the next save only appends the changes (see assembly_config)
+        self.saved_state: Optional[JournaledState] = None
+        # Encoding of the checkpoints written by this assembly (see set_snapshot_codec)
+        self.snapshot_codec: SnapshotCodec = SnapshotCodec()
+        # Opt-in profiling of the semantics loop (see set_semantics_profiler)
+        self.semantics_profiler: Optional[SemanticsProfiler] = None
+
+        if trace_export.trace_recorder is not None:
+            trace_export.trace_recorder.set_assembly(self)
+
         self._reprise_previous_config()
 
+        # Remote states pushed by the Zenoh subscribers wake up the components that depend on them
+        communication_handler.set_remote_state_listener(self._on_remote_state_change)
+
         if concerto_d_version == CONCERTO_D_SYNCHRONOUS:
             rest_communication.parse_inventory_file()
             rest_communication.load_communication_cache(self.get_name())
@@ -150,8 +189,9 @@ class Assembly(object):
         and restore the previous config if so
         """
         # TODO: si on ne reprend pas le state on le log quand même ? Ca peut donner une idée du temps que ça prend sans devoir le récupérer
-        if exists(assembly_config.build_saved_config_file_path(self.name)):
-            log.debug(f"\33[33m --- conf found at {assembly_config.build_saved_config_file_path(self.name)} ----\033[0m")
+        saved_config_file_path = assembly_config.find_saved_config_file_path(self.name)
+        if saved_config_file_path is not None:
+            log.debug(f"\33[33m --- conf found at {saved_config_file_path} ----\033[0m")
             previous_config = assembly_config.load_previous_config(self)
             assembly_config.restore_previous_config(self, previous_config)
         else:
@@ -211,6 +251,107 @@ class Assembly(object):
     def get_gantt_record(self) -> GanttRecord:
         return self.gantt
 
+    def set_event_driven_semantics(self, value: bool):
+        """
+        If False, fallback to the polling of the semantics loop every FREQUENCE_POLLING seconds
+        """
+        self.scheduler.set_event_driven(value)
+
+    def set_dirty_set_scheduling(self, value: bool):
+        """
+        If False, every active component is evaluated at each semantics iteration
+        """
+        self.scheduler.set_dirty_set_enabled(value)
+
+    def set_snapshot_codec(self, codec_name: str):
+        """
+        Changes the encoding of the checkpoints of the state saved when the assembly goes to sleep. The
+        checkpoints are loaded whatever the codec they were written with.
+
+        :param codec_name: snapshot_codec.JSON (default), snapshot_codec.PICKLE, optionally followed by
+        "+gzip" or "+zstd" (e.g. "pickle+gzip")
+        """
+        self.snapshot_codec = SnapshotCodec(codec_name)
+
+    def get_snapshot_codec(self) -> SnapshotCodec:
+        return self.snapshot_codec
+
+    def set_semantics_profiler(self, profiler: Optional[SemanticsProfiler]):
+        """
+        Profiles the semantics iterations with <profiler> (see semantics_profiler), dumped when the assembly
+        goes to sleep. None disables the profiling.
+        """
+        self.semantics_profiler = profiler
+        communication_handler.set_remote_call_listener(profiler.record_remote_call if profiler is not None else None)
+
+    def get_semantics_profiler(self) -> Optional[SemanticsProfiler]:
+        return self.semantics_profiler
+
+    def set_transition_executor(self, executor_type: str = THREAD_POOL, max_concurrency: Optional[int] = None):
+        """
+        Changes the executor running the transitions of the components that do not have their own executor
+        (see Component.set_max_concurrency). Must be called when no transition is running.
+
+        :param executor_type: THREAD_POOL (default) or PROCESS_POOL for CPU-bound transitions
+        :param max_concurrency: max number of transitions running at the same time (e.g. BOUNDED_MAX_THREADS). If
+        None: no bound for a thread pool (one thread per running transition) and the number of CPUs for a process
+        pool
+        """
+        self.transition_executor.shutdown(wait=False)
+        self.transition_executor = TransitionExecutor(executor_type, max_concurrency)
+
+    def get_transition_executor_stats(self):
+        return {
+            **self.transition_executor.get_stats(),
+            "event_loop": self.transition_event_loop.get_stats()
+        }
+
+    def notify_semantics_event(self):
+        """
+        Thread safe, wakes up the semantics loop when something happened that can let a token move
+        """
+        self.scheduler.notify()
+
+    def mark_dependency_state_changed(self, dependency):
+        """
+        Thread safe, the exposed API will answer the new state of <dependency> after the current semantics iteration
+        """
+        self.api_index.mark_dependency_changed(dependency)
+
+    def mark_component_ready(self, component_name: str):
+        """
+        Thread safe, the component will be evaluated at the next semantics iteration
+        """
+        self.scheduler.mark_ready(component_name)
+
+    def get_scheduling_stats(self):
+        return self.scheduler.get_stats()
+
+    def update_remotely_connected_component(self, component_name: str):
+        if any(isinstance(conn.get_use_dep(), RemoteDependency) or isinstance(conn.get_provide_dep(), RemoteDependency)
+               for conn in self.component_connections[component_name]):
+            self.remotely_connected_components.add(component_name)
+        else:
+            self.remotely_connected_components.discard(component_name)
+
+    def _on_remote_state_change(self, topic: str):
+        """
+        Thread safe, called by the communication threads when a remote state changed
+        """
+        for component_name in list(self.remotely_connected_components):
+            self.mark_component_ready(component_name)
+
+    def get_api_snapshot(self) -> ApiSnapshot:
+        return self.api_snapshot
+
+    def publish_api_snapshot(self):
+        """
+        Updates the state read by the exposed API (synchronous mode only). Called by the main thread when no
+        component is evaluated, each entry is replaced as a whole so that the API threads never see a partial entry
+        """
+        if global_variables.concerto_d_version == CONCERTO_D_SYNCHRONOUS:
+            self.api_index.update_snapshot(self.api_snapshot)
+
     def set_dump_program(self, value: bool):
         self.dump_program = value
 
@@ -267,6 +408,7 @@ class Assembly(object):
         self.components[name] = comp
         self.component_connections[name] = set()
         self.add_to_active_components(name)  # _init
+        self.mark_component_ready(name)
 
     @track_instruction_number
     @create_timestamp_metric(TimestampType.TimestampInstruction.DEL, is_instruction_method=True)
@@ -280,6 +422,7 @@ class Assembly(object):
                 finished = False  # TODO: should never go here
             del self.component_connections[component_name]
             del self.components[component_name]
+            self.remotely_connected_components.discard(component_name)
 
             if not finished:
                 self.run_semantics_iteration()
@@ -322,6 +465,11 @@ class Assembly(object):
             remote_connection = comp2_name not in self.components.keys()
             if not remote_connection:
                 self.component_connections[comp2_name].add(new_connection)
+                self.mark_component_ready(comp2_name)
+            self.api_index.add_connection(new_connection, [comp1_name] if remote_connection else [comp1_name, comp2_name])
+            self.update_remotely_connected_component(comp1_name)
+            self.mark_component_ready(comp1_name)
+            self.publish_api_snapshot()
 
             return True
 
@@ -381,7 +529,12 @@ class Assembly(object):
             is_remote_disconnection = comp2_name not in self.components.keys()
             if not is_remote_disconnection:
                 self.component_connections[comp2_name].discard(connection)
+                self.mark_component_ready(comp2_name)
+            self.api_index.remove_connection(connection, [comp1_name] if is_remote_disconnection else [comp1_name, comp2_name])
+            self.update_remotely_connected_component(comp1_name)
+            self.mark_component_ready(comp1_name)
             del self.connections[id_connection_to_remove]
+            self.publish_api_snapshot()
             return True
         else:
             return False
@@ -393,6 +546,7 @@ class Assembly(object):
         component.queue_behavior(behavior)
         if component_name not in self.act_components:
             self.add_to_active_components(component_name)
+        self.mark_component_ready(component_name)
 
     @track_instruction_number
     @create_timestamp_metric(TimestampType.TimestampInstruction.WAIT, is_instruction_method=True)
@@ -407,6 +561,7 @@ class Assembly(object):
             if component_name in self.components.keys():  # Local component
                 is_component_idle = component_name not in self.act_components
             else:                                         # Remote component
+                self.is_waiting_remote_state = True
                 is_component_idle = communication_handler.get_remote_component_state(component_name, self.name, global_variables.reconfiguration_name) == INACTIVE
 
             finished = is_component_idle
@@ -414,6 +569,7 @@ class Assembly(object):
             if not finished:
                 self.run_semantics_iteration()
 
+        self.is_waiting_remote_state = False
         self.wait_for_refusing_provide = False
 
     @track_instruction_number
@@ -435,6 +591,7 @@ class Assembly(object):
                 finished = False
             else:
                 ass_to_wait = set()
+                self.is_waiting_remote_state = len(self._remote_assemblies) > 0
                 for ass_name in self._remote_assemblies:
                     assembly_idle = communication_handler.get_remote_component_state(ass_name, self.name, global_variables.reconfiguration_name) == INACTIVE
                     if not assembly_idle:
@@ -461,6 +618,7 @@ class Assembly(object):
             self.remote_confirmations.clear()
             communication_handler.clear_global_synchronization_cache()
 
+        self.is_waiting_remote_state = False
         self.wait_for_refusing_provide = False
 
     def is_component_idle(self, component_name: str) -> bool:
@@ -501,39 +659,87 @@ class Assembly(object):
         self.go_to_sleep(50)
 
     def run_semantics_iteration(self):
-        # Execute semantic iterator
+        # Execute semantic iterator, only on the components with pending work. The components that are
+        # not evaluated are blocked: they cannot move a token
+        profiler = self.semantics_profiler
+        if profiler is not None:
+            profiler.start_iteration()
+        communication_handler.start_semantics_iteration()
         idle_components: Set[str] = set()
-        are_active_transitions = False
         all_tokens_blocked = True
-        for c in self.act_components:
-            is_idle, did_something, are_active_transitions = self.components[c].semantics()
+        made_progress = False
+        for c in self.scheduler.select_components_to_evaluate(self.act_components, self.remotely_connected_components):
+            is_idle, did_something, _, token_moved = self.components[c].semantics()
+            if profiler is not None:
+                profiler.record_evaluation(did_something, token_moved)
             if is_idle:
                 idle_components.add(c)
+            elif token_moved:
+                self.mark_component_ready(c)
             all_tokens_blocked = all_tokens_blocked and (not did_something)
+            made_progress = made_progress or token_moved
 
         self.remove_from_active_components(idle_components)
+        self.publish_api_snapshot()
 
         if self.is_idle():
             communication_handler.set_component_state(INACTIVE, self.name, global_variables.reconfiguration_name)
 
+        if profiler is not None:
+            profiler.end_iteration()
+
         # Check for sleeping conditions
-        if self.time_manager.is_waiting_rate_time_up() and all_tokens_blocked:
+        if self.time_manager.is_waiting_rate_time_up() and all_tokens_blocked and not self._are_active_transitions():
             log.debug("Everyone blocked")
             log.debug("Going sleeping bye")
             self.go_to_sleep(self.exit_code_sleep)
-        elif self.time_manager.is_initial_time_up() and not are_active_transitions:
+        elif self.time_manager.is_initial_time_up() and not self._are_active_transitions():
             log.debug("Time's up")
             log.debug("Go sleep")
             self.go_to_sleep(self.exit_code_sleep)
+        elif profiler is not None:
+            wait_start = time.perf_counter()
+            self._wait_next_iteration(made_progress)
+            profiler.record_wait(time.perf_counter() - wait_start)
         else:
-            time.sleep(FREQUENCE_POLLING)
+            self._wait_next_iteration(made_progress)
+
+    def _wait_next_iteration(self, made_progress: bool):
+        # The remote states are polled only if a remote state is read: by an active component connected to a remote
+        # assembly or by a wait instruction. Else the loop is only woken up by the events, or when one of the
+        # sleeping conditions can become true. In concerto-d-central, the nodes waking up (see time_checker) are
+        # not notified: always polled
+        needs_polling = (
+            global_variables.is_concerto_d_central()
+            or self.is_waiting_remote_state
+            or not self.remotely_connected_components.isdisjoint(self.act_components)
+        )
+        now = time.time()
+        deadlines = [ending_time for ending_time in (self.time_manager.waiting_rate_ending_time, self.time_manager.initial_ending_time)
+                     if ending_time is not None and ending_time > now]
+        self.scheduler.wait_next_iteration(made_progress, needs_polling, min(deadlines, default=None))
+
+    def _are_active_transitions(self) -> bool:
+        return any(len(self.components[c].act_transitions) > 0 for c in self.act_components)
 
     def go_to_sleep(self, exit_code):
+        log.debug(f"Semantics scheduling stats: {self.get_scheduling_stats()}")
+        log.debug(f"Transition executor stats: {self.get_transition_executor_stats()}")
+        if self.semantics_profiler is not None:
+            log.debug(f"Semantics profile written to {self.semantics_profiler.dump(self.get_name())}")
+        self.transition_executor.shutdown(wait=False)
+        self.transition_event_loop.shutdown()
+        communication_handler.flush_published_states()
+        communication_handler.close_remote_states()
+        log.debug(f"State publisher stats: {communication_handler.get_publisher_stats()}")
         assembly_config.save_config(self)
         if global_variables.concerto_d_version == CONCERTO_D_SYNCHRONOUS:
             rest_communication.save_communication_cache(self.get_name())
+            rest_communication.close_sessions()
         time_logger.register_end_all_time_values()
         time_logger.register_timestamps_in_file()
+        if trace_export.trace_recorder is not None:
+            log.debug(f"Trace of the round written to {trace_export.trace_recorder.write()}")
         log.debug("")  # To visually separate differents sleeping rounds
         exit(exit_code)
 
@@ -1,21 +1,36 @@
+import copy
 import json
 import queue
-import shutil
 import os
 from datetime import datetime
+from typing import Any, Dict, List, Optional
 
-from concerto import global_variables
+from concerto import global_variables, snapshot_codec, state_journal, time_logger
 from concerto.component import Component, Group
 from concerto.connection import Connection
 from concerto.dependency import DepType, Dependency
 from concerto.debug_logger import log
 from concerto.place import Dock, Place
 from concerto.time_logger import create_timestamp_metric, TimestampType
+from concerto.state_journal import JournaledState
 from concerto.transition import Transition
 import concerto
 
 ARCHIVE_DIR_NAME = "archives_reprises"
 REPRISE_DIR_NAME = "reprise_configs"
+# Suffix of the checkpoint and of the journal once they are loaded: the next save_config appends to them, and
+# an assembly that stops without going to sleep starts from zero (as when the saved config was removed)
+LOADED_SUFFIX = ".loaded"
+# The codec of a checkpoint is detected from its content (see snapshot_codec), the extension does not depend on it.
+# The checkpoints were JSON files before the codecs, they are still loaded (and replaced by a new checkpoint)
+CHECKPOINT_EXTENSION = ".ckpt"
+LEGACY_CHECKPOINT_EXTENSION = ".json"
+JOURNAL_EXTENSION = ".journal"
+
+# Version of the schema of the saved state. Only the runtime state is saved, the structure of the components
+# (places, transitions, docks, dependencies) is rebuilt from their component_type at restore.
+# Version 1 (no "schema_version" key) was the whole model of the assembly (Assembly.to_json).
+SNAPSHOT_SCHEMA_VERSION = 2
 
 
 class FixedEncoder(json.JSONEncoder):
@@ -36,41 +51,224 @@ class FixedEncoder(json.JSONEncoder):
             return obj
 
 
+_encoder = FixedEncoder()
+
+
+def _to_plain(obj) -> Any:
+    """
+    Same conversion as json.dump with the FixedEncoder, into dicts, lists and scalars instead of a string
+    """
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, dict):
+        return {key if isinstance(key, str) else str(key): _to_plain(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_plain(value) for value in obj]
+    if isinstance(obj, set):
+        # Sorted: the order of a set changes between two runs, it would make the journal record false changes
+        return sorted((_to_plain(value) for value in obj), key=_sort_key)
+    converted = _encoder.default(obj)
+    if converted is obj:
+        raise TypeError(f"Object of type {type(obj).__name__} cannot be saved")
+    return _to_plain(converted)
+
+
+def _sort_key(value) -> str:
+    return value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+
+
+def _sorted_ids(objects) -> List[str]:
+    return sorted(obj.obj_id for obj in objects)
+
+
+def build_component_state(component: Component) -> Dict[str, Any]:
+    return {
+        "obj_id": component.obj_id,
+        "component_type": component.component_type,
+        "initialized": component.initialized,
+        "dependencies": {
+            name: {"is_refusing": dep.is_refusing, "nb_users": dep.nb_users, "data": _to_plain(dep.data)}
+            for name, dep in component.st_dependencies.items()
+        },
+        "groups": {name: group.nb_tokens for name, group in component.st_groups.items()},
+        "act_places": _sorted_ids(component.act_places),
+        "act_transitions": _sorted_ids(component.act_transitions),
+        "act_odocks": _sorted_ids(component.act_odocks),
+        "act_idocks": _sorted_ids(component.act_idocks),
+        "act_behavior": component.act_behavior,
+        "queued_behaviors": list(component.queued_behaviors.queue),
+        "visited_places": _sorted_ids(component.visited_places),
+        "round_reconf": component.round_reconf,
+    }
+
+
+def build_state(assembly) -> Dict[str, Any]:
+    """
+    Runtime state of <assembly>, as saved when it goes to sleep
+    """
+    return {
+        "schema_version": SNAPSHOT_SCHEMA_VERSION,
+        "components": {name: build_component_state(component) for name, component in assembly.components.items()},
+        "connections": sorted(assembly.connections.keys()),
+        "act_components": sorted(assembly.act_components),
+        "global_nb_instructions_done": _to_plain(assembly.global_nb_instructions_done),
+        "waiting_rate": assembly.waiting_rate,
+        "components_states": _to_plain(assembly.components_states),
+        "remote_confirmations": _to_plain(assembly.remote_confirmations),
+    }
+
+
+def _upgrade_dock_id(component_name: str, dock_id: str) -> str:
+    # The docks ids of the schema version 1 are <component>_<place>_<transition>, the places of the template are
+    # shared by the components and no longer prefixed by the name of the component
+    prefix = f"{component_name}_"
+    return dock_id[len(prefix):] if dock_id.startswith(prefix) else dock_id
+
+
+def _upgrade_from_full_model(previous_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converts a state saved with the schema version 1 (whole model of the assembly) to the current schema
+    """
+    components = {}
+    for name, comp_values in previous_config['components'].items():
+        components[name] = {
+            "obj_id": comp_values['obj_id'],
+            "component_type": comp_values['component_type'],
+            "initialized": comp_values['initialized'],
+            "dependencies": {
+                dep_values['dependency_name']: {key: dep_values[key] for key in ("is_refusing", "nb_users", "data")}
+                for dep_values in comp_values['st_dependencies'].values()
+            },
+            "groups": {name: group_values['nb_tokens'] for name, group_values in comp_values['st_groups'].items()},
+            "act_places": sorted(place['place_name'] for place in comp_values['act_places']),
+            "act_transitions": sorted(trans['transition_name'] for trans in comp_values['act_transitions']),
+            "act_odocks": sorted(_upgrade_dock_id(comp_values['obj_id'], dock['obj_id']) for dock in comp_values['act_odocks']),
+            "act_idocks": sorted(_upgrade_dock_id(comp_values['obj_id'], dock['obj_id']) for dock in comp_values['act_idocks']),
+            "act_behavior": comp_values['act_behavior'],
+            "queued_behaviors": comp_values['queued_behaviors'],
+            "visited_places": sorted(place['place_name'] for place in comp_values['visited_places']),
+            "round_reconf": comp_values['round_reconf'],
+        }
+    return {
+        "schema_version": SNAPSHOT_SCHEMA_VERSION,
+        "components": components,
+        "connections": sorted(previous_config['connections'].keys()),
+        "act_components": sorted(previous_config['act_components']),
+        "global_nb_instructions_done": previous_config['global_nb_instructions_done'],
+        "waiting_rate": previous_config['waiting_rate'],
+        "components_states": previous_config['components_states'],
+        "remote_confirmations": sorted(previous_config['remote_confirmations'], key=_sort_key),
+    }
+
+
 def build_saved_config_file_path(assembly_name: str) -> str:
-    return f"{global_variables.execution_expe_dir}/{REPRISE_DIR_NAME}/saved_config_{assembly_name}.json"
+    return f"{global_variables.execution_expe_dir}/{REPRISE_DIR_NAME}/saved_config_{assembly_name}{CHECKPOINT_EXTENSION}"
+
+
+def build_legacy_saved_config_file_path(assembly_name: str) -> str:
+    return f"{global_variables.execution_expe_dir}/{REPRISE_DIR_NAME}/saved_config_{assembly_name}{LEGACY_CHECKPOINT_EXTENSION}"
+
+
+def find_saved_config_file_path(assembly_name: str) -> Optional[str]:
+    """
+    :return: the path of the checkpoint of <assembly_name> (or of its legacy JSON checkpoint), None if there is none
+    """
+    for file_path in (build_saved_config_file_path(assembly_name), build_legacy_saved_config_file_path(assembly_name)):
+        if os.path.exists(file_path):
+            return file_path
+    return None
+
+
+def build_journal_file_path(assembly_name: str) -> str:
+    return f"{global_variables.execution_expe_dir}/{REPRISE_DIR_NAME}/saved_config_{assembly_name}{JOURNAL_EXTENSION}"
 
 
 def build_archive_config_file_path(assembly_name: str) -> str:
+    """
+    :return: the path of the archive without extension, the extension of the archived file is added
+    """
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     path_dir = f"{global_variables.execution_expe_dir}/{ARCHIVE_DIR_NAME}/{assembly_name}"
     os.makedirs(path_dir, exist_ok=True)
-    return f"{path_dir}/saved_config_{timestamp}.json"
+    return f"{path_dir}/saved_config_{timestamp}"
 
 
 @create_timestamp_metric(TimestampType.TimestampEvent.SAVING_STATE)
 def save_config(assembly):
+    """
+    Appends the changes since the state loaded at wake up (or saved at the previous sleep) to the journal, or
+    writes a new checkpoint if there is no previous state or if the journal needs to be compacted
+    """
     log.debug("Saving current conf ...")
     assembly.global_nb_instructions_done[global_variables.reconfiguration_name] = global_variables.current_nb_instructions_done
-    with open(build_saved_config_file_path(assembly.name), "w") as outfile:
-        json.dump(assembly, outfile, cls=FixedEncoder, indent=4)
+    state = build_state(assembly)
+    checkpoint_path = build_saved_config_file_path(assembly.name)
+    journal_path = build_journal_file_path(assembly.name)
+    saved_state = assembly.saved_state
+
+    if saved_state is not None and os.path.exists(checkpoint_path + LOADED_SUFFIX) and not saved_state.needs_compaction():
+        changes = state_journal.diff_states(saved_state.state, state)
+        os.replace(checkpoint_path + LOADED_SUFFIX, checkpoint_path)
+        if os.path.exists(journal_path + LOADED_SUFFIX):
+            os.replace(journal_path + LOADED_SUFFIX, journal_path)
+        nb_bytes = state_journal.append_changes(journal_path, changes)
+        assembly.saved_state = JournaledState(state, saved_state.nb_entries + 1, saved_state.journal_size + nb_bytes,
+                                              saved_state.checkpoint_size)
+        log.debug(f"{len(changes)} changes appended to the journal ({nb_bytes} bytes)")
+    else:
+        _archive_loaded_files(assembly.name)
+        codec = assembly.get_snapshot_codec()
+        with open(checkpoint_path, "wb") as outfile:
+            outfile.write(codec.dumps(state))
+        assembly.saved_state = JournaledState(state, checkpoint_size=os.path.getsize(checkpoint_path))
+        # Only the checkpoints are encoded with the codec, the journal entries are JSON lines
+        time_logger.register_time_value_attribute(TimestampType.TimestampEvent.SAVING_STATE, "codec", codec.get_name())
+        log.debug(f"Checkpoint written with the codec {codec.get_name()} ({assembly.saved_state.checkpoint_size} bytes)")
+
+
+def _archive_loaded_files(assembly_name: str):
+    """
+    Moves the previous checkpoint and its journal (if any) to the archives, before writing a new checkpoint
+    """
+    archive_path = build_archive_config_file_path(assembly_name)
+    for file_path, archived_file_path in [
+        (build_saved_config_file_path(assembly_name), archive_path + CHECKPOINT_EXTENSION),
+        (build_legacy_saved_config_file_path(assembly_name), archive_path + LEGACY_CHECKPOINT_EXTENSION),
+        (build_journal_file_path(assembly_name), archive_path + JOURNAL_EXTENSION)
+    ]:
+        if os.path.exists(file_path + LOADED_SUFFIX):
+            log.debug(f"Archiving file in {archived_file_path}")
+            os.replace(file_path + LOADED_SUFFIX, archived_file_path)
 
 
 def load_previous_config(assembly):
     log.debug("Retrieving previous conf ...")
-    file_path = build_saved_config_file_path(assembly.name)
-    with open(file_path, "r") as infile:
-        result = json.load(infile)
-        log.debug("done")
-
-    log.debug(f"Archiving file in {build_archive_config_file_path(assembly.get_name())}")
-    shutil.copyfile(
-        file_path,
-        build_archive_config_file_path(assembly.get_name())
-    )
-    log.debug(f"Removing previous conf ...")
-    os.remove(file_path)
-    log.debug("done")
-    return result
+    checkpoint_path = find_saved_config_file_path(assembly.name)
+    journal_path = build_journal_file_path(assembly.name)
+    with open(checkpoint_path, "rb") as infile:
+        state, codec_name = snapshot_codec.loads(infile.read())
+    time_logger.register_time_value_attribute(TimestampType.TimestampEvent.LOADING_STATE, "codec", codec_name)
+    nb_entries, journal_size = state_journal.replay_journal(journal_path, state)
+    log.debug(f"done ({nb_entries} journal entries replayed)")
+    schema_version = state.get("schema_version", 1)
+    if schema_version == 1:
+        # The journal can't be continued on a checkpoint of the previous schema, a new one is written at the next save
+        state = _upgrade_from_full_model(state)
+        assembly.saved_state = None
+    elif schema_version == SNAPSHOT_SCHEMA_VERSION:
+        if checkpoint_path.endswith(LEGACY_CHECKPOINT_EXTENSION):
+            # A new checkpoint is written at the next save, with the extension of the checkpoints
+            assembly.saved_state = None
+        else:
+            assembly.saved_state = JournaledState(state, nb_entries, journal_size, os.path.getsize(checkpoint_path))
+    else:
+        raise Exception(f"Unsupported schema version {schema_version} of the saved state (supported: {SNAPSHOT_SCHEMA_VERSION})")
+
+    os.replace(checkpoint_path, checkpoint_path + LOADED_SUFFIX)
+    if os.path.exists(journal_path):
+        os.replace(journal_path, journal_path + LOADED_SUFFIX)
+    # The restored assembly must not share objects with the saved state, which is compared at the next save
+    return copy.deepcopy(state)
 
 
 def restore_previous_config(assembly, previous_config):
@@ -88,7 +286,7 @@ def restore_previous_config(assembly, previous_config):
 
     assembly.connections = {}
     # Restore connections between components
-    for conn_data in previous_config['connections'].keys():
+    for conn_data in previous_config['connections']:
         dep1_id, dep2_id = conn_data.split("/")
         comp1_name, dep1_name = dep1_id.split("-")
         comp2_name, dep2_name = dep2_id.split("-")
@@ -99,9 +297,14 @@ def restore_previous_config(assembly, previous_config):
             assembly.component_connections[comp1_name].add(conn)
         if comp2_name in assembly.components.keys():
             assembly.component_connections[comp2_name].add(conn)
+        assembly.api_index.add_connection(conn, [name for name in (comp1_name, comp2_name) if name in assembly.components.keys()])
         assembly.connections[conn.obj_id] = conn
 
+    for component_name in assembly.components.keys():
+        assembly.update_remotely_connected_component(component_name)
+
     assembly.act_components = set(previous_config['act_components'])
+    assembly.scheduler.mark_all_ready()
     for k, v in previous_config['global_nb_instructions_done'].items():
         assembly.global_nb_instructions_done[k] = v
     assembly.waiting_rate = previous_config['waiting_rate']
@@ -128,43 +331,41 @@ def _restore_component(assembly, comp_values, components_names, components):
     component.initialized = comp_values['initialized']
 
     # Restore dependencies
-    for dep_values in comp_values['st_dependencies'].values():
-        dep_comp = component.st_dependencies[dep_values['dependency_name']]
+    for dep_name, dep_values in comp_values['dependencies'].items():
+        dep_comp = component.st_dependencies[dep_name]
         dep_comp.is_refusing = dep_values['is_refusing']
         dep_comp.nb_users = dep_values['nb_users']
         dep_comp.data = dep_values['data']
 
     # Restore groups
-    for group_name in comp_values['st_groups'].keys():
-        group_comp = component.st_groups[group_name]
-        group_vals = comp_values['st_groups'][group_name]
-        group_comp.nb_tokens = group_vals['nb_tokens']
+    for group_name, nb_tokens in comp_values['groups'].items():
+        component.st_groups[group_name].nb_tokens = nb_tokens
 
     # Restore active places
-    for place_dict in comp_values['act_places']:
-        place_comp = component.st_places[place_dict['place_name']]
-        component.act_places.add(place_comp)
+    for place_name in comp_values['act_places']:
+        component.act_places.add(component.st_places[place_name])
 
     # Restore active transitions
-    for transitions_dict in comp_values['act_transitions']:
-        transitions_comp = component.st_transitions[transitions_dict['transition_name']]
+    for transition_name in comp_values['act_transitions']:
+        transitions_comp = component.st_transitions[transition_name]
         component.act_transitions.add(transitions_comp)
+        if transitions_comp.get_name() == "_init":
+            # Nothing to run, the _init transition ends at the next semantics iteration
+            component.completed_transitions.put(transitions_comp)
 
-    # Restore active odocks
-    for odock in comp_values['act_odocks']:
-
-        # Finding corresponding odock
-        for transition in component.st_transitions.values():
-            if transition.src_dock.obj_id == odock['obj_id']:
-                component.act_odocks.add(transition.src_dock)
+    # Restore active odocks (an unknown dock would leave its transition waiting forever)
+    for odock_id in comp_values['act_odocks']:
+        odock = component.template.get_output_dock(odock_id)
+        if odock is None:
+            raise Exception(f"Unknown output dock '{odock_id}' in the saved state of component '{comp_id}'")
+        component.act_odocks.add(odock)
 
     # Restore active idocks
-    for idock in comp_values['act_idocks']:
-
-        # Finding corresponding idock
-        for transition in component.st_transitions.values():
-            if transition.dst_dock.obj_id == idock['obj_id']:
-                component.act_idocks.add(transition.dst_dock)
+    for idock_id in comp_values['act_idocks']:
+        idock = component.template.get_input_dock(idock_id)
+        if idock is None:
+            raise Exception(f"Unknown input dock '{idock_id}' in the saved state of component '{comp_id}'")
+        component.act_idocks.add(idock)
 
     # Restore active behavior
     component.set_behavior(comp_values['act_behavior'])
@@ -174,9 +375,8 @@ def _restore_component(assembly, comp_values, components_names, components):
         component.queue_behavior(bhv)
 
     # Restore visited places
-    for place_dict in comp_values['visited_places']:
-        place_comp = component.st_places[place_dict['place_name']]
-        component.visited_places.add(place_comp)
+    for place_name in comp_values['visited_places']:
+        component.visited_places.add(component.st_places[place_name])
 
     # Restore round_reconf
     component.round_reconf = comp_values["round_reconf"]  # Used only for central reconfiguration
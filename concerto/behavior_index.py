@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: behavior_index
+   :synopsis: this file contains the BehaviorIndex class, a precomputed view of a component for one behavior.
+"""
+
+from typing import Dict, List, Tuple, Optional
+
+from concerto.dependency import DepType, Dependency
+from concerto.place import Place, Dock
+from concerto.transition import Transition
+
+
+class PlaceLayout:
+    """
+    Structure of a place of a component template for one behavior. Places and docks are shared by all the
+    instances of the template, dependencies and groups are described with names only.
+    """
+
+    def __init__(self, template, place: Place, behavior: Optional[str]):
+        place_name = place.get_name()
+        self.place: Place = place
+        self.is_switch: bool = place.is_switch
+        self.output_docks: List[Dock] = place.output_docks.get(behavior, [])
+
+        deps_types = template.dependencies_types
+        place_deps = template.place_dependencies[place_name]
+        self.deps: Tuple[str, ...] = tuple(place_deps)
+        self.provide_deps: Tuple[str, ...] = tuple(
+            name for name in place_deps if deps_types[name] is DepType.PROVIDE)
+        self.use_deps: Tuple[str, ...] = tuple(
+            name for name in place_deps if deps_types[name] is DepType.USE or deps_types[name] is DepType.DATA_USE)
+        self.stop_using_deps: Tuple[str, ...] = tuple(
+            name for name in place_deps if deps_types[name] is not DepType.DATA_PROVIDE)
+
+        groups = [template.st_groups[name] for name in template.place_groups[place_name]]
+        self.groups: Tuple[str, ...] = tuple(group.get_name() for group in groups)
+        # Tokens given back to each group when leaving the place, static unless the place is a switch
+        self.leave_deltas: Optional[Tuple[int, ...]] = None
+        if self.output_docks and not self.is_switch:
+            self.leave_deltas = tuple(group.leave_place_operation(self.output_docks).delta for group in groups)
+
+        # For each set of input docks: the docks and the tokens taken to each group when entering the place
+        self.input_sets: List[Tuple[List[Dock], Tuple[int, ...]]] = []
+        for inp_docks in place.get_groups_of_input_docks(behavior):
+            if len(inp_docks) == 0:
+                continue
+            self.input_sets.append((
+                list(inp_docks),
+                tuple(group.enter_place_operation(inp_docks).delta for group in groups)
+            ))
+
+
+class BehaviorLayout:
+    """
+    Structure of a component template for one behavior, compiled once and shared by all the instances of the
+    template (see ComponentTemplate.get_behavior_layout).
+    """
+
+    def __init__(self, template, behavior: Optional[str]):
+        self.behavior: Optional[str] = behavior
+        self.places: List[PlaceLayout] = [
+            PlaceLayout(template, place, behavior) for place in template.st_places.values()
+        ]
+        self.groups_deps: Dict[str, Tuple[str, ...]] = {
+            group_name: tuple(deps) for group_name, deps in template.group_dependencies.items()
+        }
+        self.transitions_deps: Dict[Transition, Tuple[str, ...]] = {
+            template.st_transitions[transition_name]: tuple(deps)
+            for transition_name, deps in template.trans_dependencies.items()
+        }
+
+
+class GroupEntry:
+    def __init__(self, group, deps: List[Dependency]):
+        self.group = group
+        self.deps: Tuple[Dependency, ...] = tuple(deps)
+        self.provide_deps: Tuple[Dependency, ...] = tuple(dep for dep in deps if dep.get_type() is DepType.PROVIDE)
+        self.use_deps: Tuple[Dependency, ...] = tuple(dep for dep in deps if dep.get_type() is DepType.USE)
+
+
+class PlaceEntry:
+    def __init__(self, component, layout: PlaceLayout, groups_entries: Dict[str, GroupEntry]):
+        deps = component.st_dependencies
+        self.component = component
+        self.place: Place = layout.place
+        self.is_switch: bool = layout.is_switch
+        self.output_docks: List[Dock] = layout.output_docks
+
+        self.deps: Tuple[Dependency, ...] = tuple(deps[name] for name in layout.deps)
+        self.provide_deps: Tuple[Dependency, ...] = tuple(deps[name] for name in layout.provide_deps)
+        self.use_deps: Tuple[Dependency, ...] = tuple(deps[name] for name in layout.use_deps)
+        self.stop_using_deps: Tuple[Dependency, ...] = tuple(deps[name] for name in layout.stop_using_deps)
+
+        self.groups: Tuple[GroupEntry, ...] = tuple(groups_entries[name] for name in layout.groups)
+        self.leave_operations = None
+        if layout.leave_deltas is not None:
+            self.leave_operations = [
+                (group_entry, group_entry.group.Operation(delta)) for group_entry, delta in zip(self.groups, layout.leave_deltas)
+            ]
+        self.input_sets = [
+            (
+                inp_docks,
+                [(group_entry, group_entry.group.Operation(delta)) for group_entry, delta in zip(self.groups, deltas)]
+            )
+            for inp_docks, deltas in layout.input_sets
+        ]
+
+    def get_output_docks(self, behavior: Optional[str]) -> List[Dock]:
+        if self.is_switch:
+            return self.place.get_output_docks(behavior, self.component)
+        return self.output_docks
+
+    def get_leave_operations(self, odocks: List[Dock]):
+        """
+        :return: for each group of the place, the operation to apply to it when leaving the place through <odocks>
+        """
+        if self.leave_operations is not None:
+            return self.leave_operations
+        return [(group_entry, group_entry.group.leave_place_operation(odocks)) for group_entry in self.groups]
+
+
+class BehaviorIndex:
+    """
+    Flat precomputed view of the places, docks and dependencies of a component for one behavior, used
+    by the semantics instead of looking up the structure by name at each iteration. It is built once when
+    the behavior becomes active, from the layout compiled once by the template of the component.
+    """
+
+    def __init__(self, component, behavior: Optional[str]):
+        layout = component.template.get_behavior_layout(behavior)
+        deps = component.st_dependencies
+        self.behavior: Optional[str] = behavior
+        groups_entries = {
+            group_name: GroupEntry(component.st_groups[group_name], [deps[name] for name in deps_names])
+            for group_name, deps_names in layout.groups_deps.items()
+        }
+        self.places: Dict[Place, PlaceEntry] = {}
+        for place_layout in layout.places:
+            place_entry = PlaceEntry(component, place_layout, groups_entries)
+            self.places[place_entry.place] = place_entry
+        self.transitions_deps: Dict[Transition, Tuple[Dependency, ...]] = {
+            transition: tuple(deps[name] for name in deps_names)
+            for transition, deps_names in layout.transitions_deps.items()
+        }
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: clock
+   :synopsis: this file contains the clock of the timestamps and the estimation of the clock offsets of the peers.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import yaml
+
+"""
+The times of a process are measured with perf_counter_ns (monotonic, high resolution) and converted to
+wall-clock times from a single anchor (time_ns and perf_counter_ns read at the start of the process): the
+durations are not changed by the NTP adjustments made during the process, and the times of time_logger and of
+GanttRecord (perf_counter) are on the same timeline.
+
+The offset of the clock of each peer (peer clock - local clock, in seconds) is estimated from the messages
+already exchanged with it:
+- REST: the exposed API answers with its wall-clock time in the CLOCK_HEADER header. The offset is the peer
+time minus the middle of the request, the sample with the smallest round trip time is kept (as NTP).
+- Zenoh: the samples are timestamped by the router. Only a one way estimation is possible: peer time minus
+reception time, i.e. the offset minus the latency, the largest estimation is kept.
+The offsets are saved with the anchor at each sleep (see save_clock_file) to merge the timelines of the nodes.
+"""
+CLOCK_HEADER = "X-Concerto-Clock"
+ROUND_TRIP = "round_trip"
+ONE_WAY = "one_way"
+
+_ANCHOR_WALL_NS = time.time_ns()
+_ANCHOR_PERF_NS = time.perf_counter_ns()
+_ANCHOR_MONOTONIC_NS = time.monotonic_ns()
+
+
+def get_anchor() -> Dict[str, int]:
+    return {"wall_ns": _ANCHOR_WALL_NS, "perf_ns": _ANCHOR_PERF_NS}
+
+
+def wall_time_ns() -> int:
+    return _ANCHOR_WALL_NS + time.perf_counter_ns() - _ANCHOR_PERF_NS
+
+
+def wall_time() -> float:
+    """
+    Replaces time.time() for the timestamps: same origin, but does not jump with the NTP adjustments
+    """
+    return wall_time_ns() / 1e9
+
+
+def perf_counter_to_wall_time(perf_counter_value: float) -> float:
+    """
+    :param perf_counter_value: value of time.perf_counter() (e.g. the times of GanttRecord)
+    """
+    return (_ANCHOR_WALL_NS + perf_counter_value * 1e9 - _ANCHOR_PERF_NS) / 1e9
+
+
+def monotonic_to_wall_time_ns(monotonic_value: float) -> int:
+    """
+    :param monotonic_value: value of time.monotonic() (e.g. the times of TransitionRun)
+    """
+    return _ANCHOR_WALL_NS + int(monotonic_value * 1e9) - _ANCHOR_MONOTONIC_NS
+
+
+class PeerOffset:
+
+    def __init__(self, method: str):
+        self.method: str = method
+        self.offset: Optional[float] = None
+        self.rtt: Optional[float] = None
+        self.nb_samples: int = 0
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"method": self.method, "offset": self.offset, "rtt": self.rtt, "nb_samples": self.nb_samples}
+
+
+_peers_offsets: Dict[str, PeerOffset] = {}
+_peers_offsets_lock = threading.Lock()
+
+
+def record_round_trip(peer: str, request_sent_at: float, peer_time: float, response_received_at: float):
+    """
+    :param request_sent_at: local wall_time() before the request
+    :param peer_time: wall-clock time of the peer while answering
+    :param response_received_at: local wall_time() after the answer
+    """
+    rtt = response_received_at - request_sent_at
+    offset = peer_time - (request_sent_at + response_received_at) / 2
+    with _peers_offsets_lock:
+        peer_offset = _peers_offsets.setdefault(peer, PeerOffset(ROUND_TRIP))
+        peer_offset.nb_samples += 1
+        if peer_offset.rtt is None or rtt < peer_offset.rtt:
+            peer_offset.offset = offset
+            peer_offset.rtt = rtt
+
+
+def record_one_way(peer: str, peer_time: float, received_at: float):
+    estimation = peer_time - received_at
+    with _peers_offsets_lock:
+        peer_offset = _peers_offsets.setdefault(peer, PeerOffset(ONE_WAY))
+        peer_offset.nb_samples += 1
+        if peer_offset.offset is None or estimation > peer_offset.offset:
+            peer_offset.offset = estimation
+
+
+def get_peers_offsets() -> Dict[str, Dict[str, Any]]:
+    with _peers_offsets_lock:
+        return {peer: peer_offset.to_json() for peer, peer_offset in _peers_offsets.items()}
+
+
+def save_clock_file(file_path: str):
+    """
+    Writes the anchor of the process and the offsets of the peers estimated during the process
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        yaml.safe_dump({"anchor": get_anchor(), "peers": get_peers_offsets()}, f)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: communication_cache
+   :synopsis: this file contains the CommunicationCache class, the cache of the results of the requests to the peers.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Staleness policies: what to do with an entry older than the TTL when the peer cannot answer
+SERVE_STALE = "serve_stale"  # the entry is still used (previous behavior of the cache)
+DROP_STALE = "drop_stale"    # the entry is dropped, the default value is used
+
+
+class CommunicationCache:
+    """
+    Last result of each lookup made to the peers, keyed by (endpoint name, *path arguments). Written through
+    by each successful request and used:
+    - instead of the request, if the entry is younger than <max_age_without_request> (None: never, the
+    peers are always asked). Bounds the staleness of the results in exchange of fewer requests.
+    - when the peer cannot answer (asleep or unreachable). The entries older than <ttl> (None: never
+    expire) are then used or dropped depending on <stale_policy>.
+
+    The timestamps are wall-clock times: the cache is saved when the assembly goes to sleep and loaded when
+    it wakes up (see rest_communication.save_communication_cache).
+    """
+
+    # Returned by get_fresh when the peer has to be asked
+    MISSING = object()
+
+    def __init__(self, ttl: Optional[float] = None, stale_policy: str = SERVE_STALE,
+                 max_age_without_request: Optional[float] = None):
+        # key => (value, stored at)
+        self._entries: Dict[Tuple[str, ...], Tuple[Any, float]] = {}
+        self.set_policy(ttl, stale_policy, max_age_without_request)
+
+        self.nb_fresh_hits: int = 0
+        self.nb_fallback_hits: int = 0
+        self.nb_stale_hits: int = 0
+        self.nb_misses: int = 0
+        self.nb_writes: int = 0
+
+    def set_policy(self, ttl: Optional[float] = None, stale_policy: str = SERVE_STALE,
+                   max_age_without_request: Optional[float] = None):
+        if stale_policy not in (SERVE_STALE, DROP_STALE):
+            raise Exception("Unknown stale policy '%s' (expected '%s' or '%s')" % (stale_policy, SERVE_STALE, DROP_STALE))
+        self.ttl: Optional[float] = ttl
+        self.stale_policy: str = stale_policy
+        self.max_age_without_request: Optional[float] = max_age_without_request
+
+    def put(self, key: Tuple[str, ...], value: Any):
+        self._entries[key] = (value, time.time())
+        self.nb_writes += 1
+
+    def get_fresh(self, key: Tuple[str, ...]) -> Any:
+        """
+        :return: the value of <key> if it is recent enough to be used without asking the peer, else MISSING
+        """
+        if self.max_age_without_request is None:
+            return CommunicationCache.MISSING
+        entry = self._entries.get(key)
+        if entry is None or time.time() - entry[1] > self.max_age_without_request:
+            return CommunicationCache.MISSING
+        self.nb_fresh_hits += 1
+        return entry[0]
+
+    def get_fallback(self, key: Tuple[str, ...], default_value: Any) -> Any:
+        """
+        :return: the value of <key> when the peer cannot answer, <default_value> if there is no usable entry
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.nb_misses += 1
+            return default_value
+        value, stored_at = entry
+        if self.ttl is not None and time.time() - stored_at > self.ttl:
+            if self.stale_policy == DROP_STALE:
+                del self._entries[key]
+                self.nb_misses += 1
+                return default_value
+            self.nb_stale_hits += 1
+            return value
+        self.nb_fallback_hits += 1
+        return value
+
+    def remove_if(self, predicate: Callable[[Tuple[str, ...]], bool]):
+        for key in [key for key in self._entries.keys() if predicate(key)]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Tuple[str, ...]):
+        return key in self._entries
+
+    def to_json(self) -> List:
+        return [[list(key), value, stored_at] for key, (value, stored_at) in self._entries.items()]
+
+    def load_json(self, entries: List):
+        for key, value, stored_at in entries:
+            self._entries[tuple(key)] = (value, stored_at)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "nb_entries": len(self._entries),
+            "nb_fresh_hits": self.nb_fresh_hits,
+            "nb_fallback_hits": self.nb_fallback_hits,
+            "nb_stale_hits": self.nb_stale_hits,
+            "nb_misses": self.nb_misses,
+            "nb_writes": self.nb_writes,
+        }
+
@@ -1,17 +1,84 @@
+import functools
 import time
+from typing import Callable, Optional
 
 import zenoh
 
 from concerto import zenoh_communication, rest_communication, global_variables
+from concerto.state_publisher import StatePublisher
 
 config = {}
 
+# Sends the local states (asynchronous mode) in the background, coalesced per topic
+_state_publisher = StatePublisher()
+
 CONN = "CONN"
 DECONN = "DECONN"
 ACTIVE = "ACTIVE"
 INACTIVE = "INACTIVE"
 
+# Called with (function name, duration) after each read of a remote state (see semantics_profiler)
+_remote_call_listener: Optional[Callable[[str, float], None]] = None
+
+
+def set_remote_call_listener(listener: Optional[Callable[[str, float], None]]):
+    global _remote_call_listener
+    _remote_call_listener = listener
+    # The batches of lookups are counted per request sent, not per iteration (most iterations send none)
+    rest_communication.set_batch_request_listener(listener)
+
+
+def _profiled(function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _remote_call_listener is None:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _remote_call_listener(function.__name__, time.perf_counter() - start)
+    return wrapper
+
+
+def start_semantics_iteration():
+    """
+    Called at the beginning of each semantics iteration of the assembly
+    """
+    if global_variables.is_concerto_d_asynchronous():
+        zenoh_communication.refresh_state_mirror()
+    else:
+        rest_communication.send_batched_lookups()
+
+
+def flush_published_states():
+    """
+    Blocks until the local states published so far are sent (called before going to sleep)
+    """
+    _state_publisher.flush()
+
+
+def close_remote_states():
+    """
+    Stops receiving the remote states (called before going to sleep)
+    """
+    if global_variables.is_concerto_d_asynchronous():
+        zenoh_communication.close_state_mirror()
+
+
+def get_publisher_stats():
+    return _state_publisher.get_stats()
+
+
+def set_remote_state_listener(listener):
+    """
+    <listener> is called when a remote state is received (asynchronous mode only, the synchronous mode polls)
+    """
+    if global_variables.is_concerto_d_asynchronous():
+        zenoh_communication.set_remote_state_listener(listener)
+
 
+@_profiled
 def get_nb_dependency_users(component_name: str, dependency_name: str) -> int:
     if global_variables.is_concerto_d_asynchronous():
         return zenoh_communication.get_nb_dependency_users(component_name, dependency_name)
@@ -21,11 +88,13 @@ def get_nb_dependency_users(component_name: str, dependency_name: str) -> int:
 
 def send_nb_dependency_users(nb: int, component_name: str, dependency_name: str):
     if global_variables.is_concerto_d_asynchronous():
-        zenoh_communication.send_nb_dependency_users(nb, component_name, dependency_name)
+        _state_publisher.publish(("nb_users", component_name, dependency_name),
+                                 zenoh_communication.send_nb_dependency_users, nb, component_name, dependency_name)
     else:
         return
 
 
+@_profiled
 def get_refusing_state(component_name: str, dependency_name: str) -> int:
     if global_variables.is_concerto_d_asynchronous():
         return zenoh_communication.get_refusing_state(component_name, dependency_name)
@@ -35,11 +104,13 @@ def get_refusing_state(component_name: str, dependency_name: str) -> int:
 
 def send_refusing_state(value: int, component_name: str, dependency_name: str):
     if global_variables.is_concerto_d_asynchronous():
-        zenoh_communication.send_refusing_state(value, component_name, dependency_name)
+        _state_publisher.publish(("refusing_state", component_name, dependency_name),
+                                 zenoh_communication.send_refusing_state, value, component_name, dependency_name)
     else:
         return
 
 
+@_profiled
 def get_data_dependency(component_name: str, dependency_name: str):
     if global_variables.is_concerto_d_asynchronous():
         return zenoh_communication.get_data_dependency(component_name, dependency_name)
@@ -62,6 +133,7 @@ def send_syncing_conn(syncing_component: str, component_to_sync: str,  dep_provi
         return
 
 
+@_profiled
 def is_conn_synced(syncing_component: str, component_to_sync: str,  dep_provide: str, dep_use: str, action: str):
     if global_variables.is_concerto_d_asynchronous():
         return zenoh_communication.is_conn_synced(syncing_component, component_to_sync, dep_provide, dep_use, action)
@@ -71,11 +143,13 @@ def is_conn_synced(syncing_component: str, component_to_sync: str,  dep_provide:
 
 def set_component_state(state: [ACTIVE, INACTIVE], component_name: str, reconfiguration_name: str):
     if global_variables.is_concerto_d_asynchronous():
-        zenoh_communication.set_component_state(state, component_name, reconfiguration_name)
+        _state_publisher.publish(("component_state", component_name, reconfiguration_name),
+                                 zenoh_communication.set_component_state, state, component_name, reconfiguration_name)
     else:
         return
 
 
+@_profiled
 def get_remote_component_state(component_name: str, calling_assembly_name: str, reconfiguration_name: str) -> [ACTIVE, INACTIVE]:
     """
     TODO: harmoniser synchrone et asynchrone
@@ -7,118 +7,28 @@
 """
 
 import time
-from queue import Queue
+from queue import Queue, SimpleQueue, Empty
+from concurrent.futures import Future
 from abc import ABCMeta, abstractmethod
 from typing import Dict, Tuple, List, Set, Callable, Optional
 
-from concerto import time_logger, communication_handler, global_variables
+from concerto import time_logger, communication_handler, global_variables, semantics_profiler
 from concerto.communication_handler import INACTIVE, ACTIVE
 from concerto.debug_logger import log, log_once
 from concerto.place import Dock, Place
+from concerto.semantics_profiler import SemanticsProfiler
 from concerto.dependency import DepType, Dependency
+from concerto.behavior_index import BehaviorIndex, PlaceEntry, GroupEntry
+from concerto.component_template import ComponentTemplate
+from concerto.exporters import trace_export
 from concerto.time_logger import TimestampType, TimestampPeriod
 from concerto.transition import Transition
+from concerto.transition_executor import TransitionExecutor, TransitionEventLoop, TransitionRun, THREAD_POOL
 from concerto.gantt_record import GanttRecord
+from concerto.group import Group
 from concerto.utility import Messages
 
 
-class Group(object):
-    """
-    This class is used to create a group object within a Component.
-    A group is a set of places and transitions to which a service provide
-    dependency is bound. This object facilitate the semantics and its
-    efficiency.
-    """
-
-    class Operation:
-        def __init__(self, delta: int):
-            self.delta = delta
-
-        def is_nothing(self) -> bool:
-            return self.delta is 0
-
-    def __init__(self, component_name: str, name: str):
-        self.component_name: str = component_name
-        self.name: str = name
-        self.elements: Set[str] = set()
-        self.nb_tokens: int = 0
-
-    @property
-    def obj_id(self):
-        return f"{self.component_name}_{self.name}"
-
-    def to_json(self):
-        return {
-            "obj_id": self.obj_id,
-            "nb_tokens": self.nb_tokens
-        }
-
-    def get_name(self) -> str:
-        return self.name
-
-    def add_places(self, places_names):
-        self.elements.update(places_names)
-
-    def add_transitions(self, transitions_names):
-        self.elements.update(transitions_names)
-
-    def add_state(self, state_name: str):
-        self.elements.add(state_name)
-
-    def add_transition(self, transition_name: str):
-        self.elements.add(transition_name)
-
-    def contains_place(self, place_name: str) -> bool:
-        return place_name in self.elements
-
-    def contains_transition(self, transition_name: str) -> bool:
-        return transition_name in self.elements
-
-    def contains_dock(self, dock: Dock) -> bool:
-        return self.contains_transition(dock.get_transition().get_name())
-
-    def enter_place_operation(self, input_docks: List[Dock]) -> Operation:
-        delta: int = 0
-        place_name: str = input_docks[0].get_place().get_name()
-        if self.contains_place(place_name):
-            delta += 1
-        for dock in input_docks:
-            if self.contains_dock(dock):
-                delta -= 1
-        return self.Operation(delta)
-
-    def leave_place_operation(self, output_docks: List[Dock]) -> Operation:
-        delta: int = 0
-        place_name: str = output_docks[0].get_place().get_name()
-        if self.contains_place(place_name):
-            delta -= 1
-        for dock in output_docks:
-            if self.contains_dock(dock):
-                delta += 1
-        return self.Operation(delta)
-
-    def is_activating(self, operation: Operation) -> bool:
-        """
-        Un groupe s'active s'il n'est pas activé et si pour une liste de docks donnée, aucun de ces docks
-        n'appartient à une transition qui est dans le groupe (sinon le groupe serait déjà activé)
-        CF fonction enter_place_operation
-        """
-        return (not self.is_active()) and (operation.delta > 0)
-
-    def is_deactivating(self, operation: Operation) -> bool:
-        return self.is_active() and (self.nb_tokens + operation.delta is 0)
-
-    def is_active(self):
-        return self.nb_tokens > 0
-
-    def apply(self, operation: Operation):
-        if self.nb_tokens + operation.delta < 0:
-            raise Exception(
-                "Logic error: trying to remove %d tokens to group '%s' while its number of tokens is only %d." % (
-                    operation.delta, self.name, self.nb_tokens))
-        self.nb_tokens += operation.delta
-
-
 class Component(object, metaclass=ABCMeta):
     """This Component class is used to create a component.
 
@@ -150,17 +60,8 @@ class Component(object, metaclass=ABCMeta):
         self.initial_place: Optional[str] = None
         self.component_type: str = type(self).__name__  # In order to reinstanciate it later
 
-        self.st_places: Dict[str, Place] = {}
-        self.st_transitions: Dict[str, Transition] = {}
-        self.st_switches: Set[str] = set()
-        self.st_dependencies: Dict[str, Dependency] = {}
-        self.st_groups: Dict[str, Group] = {}
-        self.st_behaviors: Set[str] = set()
-
-        self.trans_dependencies: Dict[str, List[Dependency]] = {}
-        self.place_dependencies: Dict[str, List[Dependency]] = {}
-        self.group_dependencies: Dict[str, List[Dependency]] = {}
-        self.place_groups: Dict[str, List[Group]] = {}  # PERSIST NB_TOKENS
+        # Precomputed view of the structure for the active behavior, see _get_behavior_index
+        self._behavior_index: Optional[BehaviorIndex] = None
 
         self.act_places: Set[Place] = set()
         self.act_transitions: Set[Transition] = set()
@@ -169,18 +70,86 @@ class Component(object, metaclass=ABCMeta):
         self.act_behavior: str = "_init"
         self.queued_behaviors: Queue = Queue()
         self.visited_places: Set[Place] = set()
+        # Futures of the running transitions of this instance (transitions are shared by the template)
+        self.transitions_futures: Dict[Transition, Future] = {}
+        # Transitions whose function ended, pushed by the done callbacks and drained by _end_transition
+        self.completed_transitions: SimpleQueue = SimpleQueue()
+        # Executor bounding the concurrency of this component only, if None the one of the assembly is used
+        self.transition_executor: Optional[TransitionExecutor] = None
+        # Timings of the last run of each transition
+        self.transitions_runs: Dict[str, TransitionRun] = {}
 
         self.round_reconf = 0      # Used only for central reconfiguration
         self.is_sleeping = None    # Used only for central reconfiguration
         self.timestamps_dict = {}  # Used only for central reconfiguration
 
         self.initialized: bool = False
+        self._assembly = None
+        self.template: Optional[ComponentTemplate] = None
         self.create()
-        self.add_places(self.places)
-        self.add_switches(self.switches)
-        self.add_groups(self.groups)
-        self.add_transitions(self.transitions)
-        self.add_dependencies(self.dependencies)
+        self._build_structure()
+
+    def _build_structure(self):
+        # The structure (places, docks, transitions, groups elements, bindings) is shared by all the instances
+        # declaring the same structure, the instance only holds its dependencies and groups tokens
+        self.template = ComponentTemplate.get_template(self)
+        self.st_places: Dict[str, Place] = self.template.st_places
+        self.st_transitions: Dict[str, Transition] = self.template.st_transitions
+        self.st_switches: Set[str] = self.template.st_switches
+        self.st_behaviors: Set[str] = self.template.st_behaviors
+        self.st_dependencies: Dict[str, Dependency] = {
+            name: Dependency(self, name, type) for name, type in self.template.dependencies_types.items()
+        }
+        self.st_groups: Dict[str, Group] = {
+            name: Group(self.name, name, group.elements) for name, group in self.template.st_groups.items()
+        }
+        self._transitions_functions: Optional[Dict[str, Tuple[Callable, Tuple]]] = None
+        self._switches_functions: Optional[Dict[str, Callable]] = None
+        self._behavior_index = None
+        # Bindings of the template to the dependencies and groups of this instance, built at the first access
+        self._trans_dependencies: Optional[Dict[str, List[Dependency]]] = None
+        self._place_dependencies: Optional[Dict[str, List[Dependency]]] = None
+        self._group_dependencies: Optional[Dict[str, List[Dependency]]] = None
+        self._place_groups: Optional[Dict[str, List[Group]]] = None
+
+    def _update_structure(self):
+        """
+        Called by the builder methods (add_place, add_transition, ...): the structure declared by create() is
+        extended and, if the template is already built, the component is bound to the template of its new structure
+        """
+        if self.template is None:
+            return
+        if self.initialized:
+            raise Exception("Trying to change the structure of component '%s' after its initialization" % self.get_name())
+        self._build_structure()
+
+    @property
+    def trans_dependencies(self) -> Dict[str, List[Dependency]]:
+        if self._trans_dependencies is None:
+            self._trans_dependencies = {name: [self.st_dependencies[dep] for dep in deps]
+                                        for name, deps in self.template.trans_dependencies.items()}
+        return self._trans_dependencies
+
+    @property
+    def place_dependencies(self) -> Dict[str, List[Dependency]]:
+        if self._place_dependencies is None:
+            self._place_dependencies = {name: [self.st_dependencies[dep] for dep in deps]
+                                        for name, deps in self.template.place_dependencies.items()}
+        return self._place_dependencies
+
+    @property
+    def group_dependencies(self) -> Dict[str, List[Dependency]]:
+        if self._group_dependencies is None:
+            self._group_dependencies = {name: [self.st_dependencies[dep] for dep in deps]
+                                        for name, deps in self.template.group_dependencies.items()}
+        return self._group_dependencies
+
+    @property
+    def place_groups(self) -> Dict[str, List[Group]]:  # PERSIST NB_TOKENS
+        if self._place_groups is None:
+            self._place_groups = {name: [self.st_groups[group] for group in groups]
+                                  for name, groups in self.template.place_groups.items()}
+        return self._place_groups
 
     @property
     def obj_id(self):
@@ -234,285 +203,129 @@ class Component(object, metaclass=ABCMeta):
     def force_vebosity(self, forced_verobisty: int):
         self.forced_verbosity = forced_verobisty
 
+    def set_max_concurrency(self, max_concurrency: Optional[int], executor_type: str = THREAD_POOL):
+        """
+        Runs the transitions of this component in its own executor, with at most <max_concurrency>
+        transitions running at the same time. If <max_concurrency> is None, the executor of the assembly
+        is used again.
+        """
+        if self.transition_executor is not None:
+            self.transition_executor.shutdown(wait=False)
+        if max_concurrency is None:
+            self.transition_executor = None
+        else:
+            self.transition_executor = TransitionExecutor(executor_type, max_concurrency)
+
+    def get_transition_executor(self) -> TransitionExecutor:
+        if self.transition_executor is not None:
+            return self.transition_executor
+        return self._assembly.transition_executor
+
+    def get_transition_event_loop(self) -> TransitionEventLoop:
+        return self._assembly.transition_event_loop
+
     def get_verbosity(self):
         if self.forced_verbosity is None:
             return self._verbosity
         else:
             return self.forced_verbosity
 
-    def add_places(self, places: List[str], initial=None):
+    def get_transition_function(self, name: str) -> Tuple[Callable, Tuple]:
         """
-        This method add all places declared in the user component class as a
-        dictionary associating the name of a place to its number of input and
-        output docks.
-
-        :param initial:
-        :param places: dictionary of places
+        This method returns the function of the transition <name> of this instance and its arguments
         """
-        for key in places:
-            self.add_place(key)
-        if initial is not None:
-            self.set_initial_place(initial)
+        if self._transitions_functions is None:
+            from concerto.utility import empty_transition
+            self._transitions_functions = {"_init": (empty_transition, ())}
+            for key, values in self.transitions.items():
+                self._transitions_functions[key] = (values[4], values[5] if len(values) == 6 else ())
+        return self._transitions_functions[name]
 
-    def add_place(self, name: str, initial=False):
+    def get_switch_function(self, name: str) -> Callable:
         """
-        This method offers the possibility to add a single place to an
-        already existing dictionary of places.
-
-        :param name: the name of the place to add
-        :param initial: whether the place is the initial place of the component (default: False)
+        This method returns the function choosing the output docks of the switch <name> of this instance
         """
-        if name in self.st_places:
-            raise Exception("Trying to add '%s' as a place while it is already a place" % name)
-        elif name in self.st_transitions:
-            raise Exception("Trying to add '%s' as a place while it is already a transition" % name)
-        elif name in self.st_groups:
-            raise Exception("Trying to add '%s' as a place while it is already a group" % name)
-        self.st_places[name] = Place(self, name)
-        self.place_dependencies[name] = []
-        self.place_groups[name] = []
+        if self._switches_functions is None:
+            self._switches_functions = dict(self.switches)
+        return self._switches_functions[name]
+
+    """
+    BUILDER
+    The structure is declared in create() (places, switches, groups, transitions, dependencies, initial_place),
+    these methods extend the declaration. They are checked when the template of the structure is built.
+    """
+
+    def add_places(self, places: List[str], initial=None):
+        self.places.extend(places)
+        if initial is not None:
+            self._set_declared_initial_place(initial)
+        self._update_structure()
 
+    def add_place(self, name: str, initial=False):
+        self.places.append(name)
         if initial:
-            self.set_initial_place(name)
+            self._set_declared_initial_place(name)
+        self._update_structure()
 
     def add_switches(self, switches: List[Tuple[str, Callable[[Place, str], List[int]]]], initial=None):
-        for key in switches:
-            self.add_switch(key)
+        self.switches.extend(switches)
         if initial is not None:
-            self.set_initial_place(initial)
+            self._set_declared_initial_place(initial)
+        self._update_structure()
 
     def add_switch(self, tuple: Tuple[str, Callable[[Place, str], List[int]]], initial=False):
-        """
-        This method offers the possibility to add a single place to an
-        already existing dictionary of places.
-
-        :param tuple:
-        :param name: the name of the place to add
-        :param initial: whether the place is the initial place of the component (default: False)
-        """
-        (name, override_f) = tuple
-        if name in self.st_places:
-            raise Exception("Trying to add '%s' as a place while it is already a place" % name)
-        elif name in self.st_transitions:
-            raise Exception("Trying to add '%s' as a place while it is already a transition" % name)
-        elif name in self.st_groups:
-            raise Exception("Trying to add '%s' as a place while it is already a group" % name)
-        self.st_places[name] = Place(self, name, override_f, cp=self)  # TODO: Remove cp
-        self.place_dependencies[name] = []
-        self.place_groups[name] = []
-        self.st_switches.add(name)
-
+        self.switches.append(tuple)
         if initial:
-            self.set_initial_place(name)
+            self._set_declared_initial_place(tuple[0])
+        self._update_structure()
 
     def add_groups(self, groups: Dict[str, List[str]]):
-        for name in groups:
-            self.add_group(name, groups[name])
+        self._check_not_declared(groups, self.groups, "group")
+        self.groups.update(groups)
+        self._update_structure()
 
     def add_group(self, name: str, places: List[str]):
-        if name in self.st_places:
-            raise Exception("Trying to add '%s' as a group while it is already a place" % name)
-        elif name in self.st_transitions:
-            raise Exception("Trying to add '%s' as a group while it is already a transition" % name)
-        elif name in self.st_groups:
-            raise Exception("Trying to add '%s' as a group while it is already a group" % name)
-
-        for place_name in places:
-            if place_name not in self.st_places:
-                raise Exception("Error: trying to add non-existing place '%s' to group '%s'" % (place_name, name))
-            elif place_name is self.initial_place:
-                raise Exception(
-                    "Error: trying to add initial place '%s' to group '%s' (framework limitation: initial place "
-                    "cannot be in a group, for now...)" % (
-                        place_name, name))
-
-        self.st_groups[name] = Group(self.get_name(), name)
-        self.group_dependencies[name] = []
-        self.st_groups[name].add_places(places)
-        for place_name in places:
-            self.place_groups[place_name].append(self.st_groups[name])
+        self.add_groups({name: places})
 
     def add_transitions(self, transitions: Dict[str, Tuple]):
-        """
-        This method add all transitions declared in the user component class
-        as a dictionary associating the name of a transition to a transition
-        object created by the user too.
-        Requires add_states and add_groups to have been executed
-
-        :param transitions: dictionary of transitions
-        """
-        for key in transitions:
-            # add docks to places and bind docks
-            if len(transitions[key]) == 6:
-                self.add_transition(key, transitions[key][0], transitions[key][
-                    1], transitions[key][2], transitions[key][3], transitions[key][4], transitions[key][5])
-            else:
-                self.add_transition(key, transitions[key][0], transitions[key][
-                    1], transitions[key][2], transitions[key][3], transitions[key][4])
-
-    def _force_add_transition(self, name: str, src_name: Optional[str], dst_name: str, bhv: str, idset: int, func, args=()):
-        src = None
-        if src_name is not None:
-            src = self.st_places[src_name]
-        self.st_transitions[name] = Transition(name, src, self.st_places[dst_name], bhv, idset, func, args, self)
-        self.trans_dependencies[name] = []
-        self.st_behaviors.add(bhv)
-        for group in self.st_groups:
-            if self.st_groups[group].contains_place(src_name) and self.st_groups[group].contains_place(dst_name):
-                self.st_groups[group].add_transition(name)
+        self._check_not_declared(transitions, self.transitions, "transition")
+        self.transitions.update(transitions)
+        self._update_structure()
 
     def add_transition(self, name: str, src_name: str, dst_name: str, bhv: str, idset: int, func, args=()):
-        """
-        This method offers the possibility to add a single transition to an
-        already existing dictionary of transitions.
-
-        :param idset:
-        :param name: the name of the transition to add
-        :param src_name: the name of the source place of the transition
-        :param dst_name: the name of the destination place of the transition
-        :param bhv: the name of the behavior associated to the transition
-        :param func: a functor created by the user
-        :param args: optional tuple of arguments to give to the functor
-        """
-        if name in self.st_places:
-            raise Exception("Trying to add '%s' as a transition while it is already a place" % name)
-        if name in self.st_transitions:
-            raise Exception("Trying to add '%s' as a transition while it is already a transition" % name)
-        if name in self.st_groups:
-            raise Exception("Trying to add '%s' as a transition while it is already a group" % name)
-        if name is "_init":
-            raise Exception("Cannot name a transition '_init' (used internally)")
-        if bhv is "_init":
-            raise Exception("Cannot name a behavior '_init' (used internally)")
-        if src_name not in self.st_places:
-            raise Exception("Trying to add transition '%s' starting from unexisting place '%s'" % (name, src_name))
-        if dst_name not in self.st_places:
-            raise Exception("Trying to add transition '%s' going to unexisting place '%s'" % (name, dst_name))
-
-        self._force_add_transition(name, src_name, dst_name, bhv, idset, func, args)
+        self.add_transitions({name: (src_name, dst_name, bhv, idset, func, args)})
 
     def add_dependencies(self, dep: Dict[str, Tuple[DepType, List[str]]]):
-        """
-        This method add all dependencies declared in the user component class
-        as a dictionary associating the name of a dependency to both a type
-        and the name of the transition or the place to which it is bound.
-
-        - a 'use' or 'data-use' dependency can be bound to a transition
-
-        - a 'provide' or 'data-provide' dependency can be bound to a place
-
-        :param dep: dictionary of dependencies
-
-        """
-        for key in dep:
-            if len(dep[key]) == 2:
-                type = dep[key][0]
-                bname = dep[key][1]  # list of places or transitions bounded to
-                self.add_dependency(key, type, bname)
-
-            else:
-                raise Exception("ERROR dependency %s - two arguments should be given for construction, "
-                                "a type enum DepType and the name of the place, the transition "
-                                "or the group to which the dependency is bound." % key)
+        self._check_not_declared(dep, self.dependencies, "dependency")
+        self.dependencies.update(dep)
+        self._update_structure()
 
     def add_dependency(self, name: str, type: DepType, bindings: List[str]):
-        """
-        This method offers the possibility to add a single dependency to an
-        already existing dictionary of dependencies.
+        self.add_dependencies({name: (type, bindings)})
 
-        :param bindings:
-        :param name: the name of the dependency to add
-        :param type: the type DepType of the dependency
-        :param binding: the name of the binding of the dependency (place or transition)
-        """
-        if type == DepType.DATA_USE:
-            transitions = []
-            switches = []
-            for bind in bindings:
-                if bind in self.st_transitions:
-                    transitions.append(bind)
-                elif bind in self.st_switches:
-                    switches.append(bind)
-                else:
-                    raise Exception(
-                        "Trying to bind dependency %s (of type %s) to something else than a transition or a switch" % (
-                            name, str(type)))
-
-            self.st_dependencies[name] = Dependency(self, name, type)
-            for transition_name in transitions:
-                self.trans_dependencies[transition_name].append(self.st_dependencies[name])
-            for switch_name in switches:
-                self.place_dependencies[switch_name].append(self.st_dependencies[name])
-
-        elif type == DepType.USE:
-            places = []
-            transitions = []
-            groups = []
-            for bind in bindings:
-                if bind in self.st_transitions:
-                    transitions.append(bind)
-                elif bind in self.st_places:
-                    places.append(bind)
-                elif bind in self.st_groups:
-                    groups.append(bind)
-                else:
-                    raise Exception(
-                        "Trying to bind dependency %s (of type %s) to something else than a place, a transition or a group" % (
-                            name, str(type)))
-
-            self.st_dependencies[name] = Dependency(self, name, type)
-            for place_name in places:
-                self.place_dependencies[place_name].append(self.st_dependencies[name])
-            for transition_name in transitions:
-                self.trans_dependencies[transition_name].append(self.st_dependencies[name])
-            for group_name in groups:
-                self.group_dependencies[group_name].append(self.st_dependencies[name])
-
-        elif type == DepType.DATA_PROVIDE:
-            for bind in bindings:
-                if bind not in self.st_places:
-                    raise Exception(
-                        "Trying to bind dependency %s (of type %s) to something else than a place" % (name, str(type)))
-
-            self.st_dependencies[name] = Dependency(self, name, type)
-            for place_name in bindings:
-                self.place_dependencies[place_name].append(self.st_dependencies[name])
-
-        elif type == DepType.PROVIDE:
-            places = []
-            groups = []
-            for bind in bindings:
-                if bind in self.st_places:
-                    places.append(bind)
-                elif bind in self.st_groups:
-                    groups.append(bind)
-                else:
-                    raise Exception(
-                        "Trying to bind dependency %s (of type %s) to something else than a place or a group" % (
-                            name, str(type)))
+    @staticmethod
+    def _check_not_declared(names, declared: Dict, kind: str):
+        # The places are checked by the template, a name declared twice in a dict would be overwritten
+        for name in names:
+            if name in declared:
+                raise Exception("Trying to add '%s' as a %s while it is already a %s" % (name, kind, kind))
 
-            self.st_dependencies[name] = Dependency(self, name, type)
-            for place_name in places:
-                self.place_dependencies[place_name].append(self.st_dependencies[name])
-            for group_name in groups:
-                self.group_dependencies[group_name].append(self.st_dependencies[name])
+    def _set_declared_initial_place(self, name: str):
+        if self.initial_place is not None:
+            raise Exception(
+                "Trying to set place %s as intial place of component type %s while %s is already the intial place." % (
+                    name, self.component_type, self.initial_place))
+        self.initial_place = name
 
     def set_initial_place(self, name: str):
         """
         This method allows to set the (unique) initial place of the component, if not already done
         using the parameter of add_place and add_places.
-        
+
         :param name: the name of the place to mark initial
         """
-
-        if name not in self.st_places:
-            raise Exception(
-                "Trying to set non-existant place %s as intial place of component %s." % (name, self.get_name()))
-        if self.initial_place is not None:
-            raise Exception(
-                "Trying to set place %s as intial place of component %s while %s is already the intial place." % (
-                    name, self.get_name(), self.initial_place))
-        self.initial_place = name
+        self._set_declared_initial_place(name)
+        self._update_structure()
 
     def get_places(self):
         """
@@ -596,6 +409,42 @@ class Component(object, metaclass=ABCMeta):
     def thread_safe_report_error(self, transition: Transition, error: str):
         self._assembly.thread_safe_report_error(self, transition, error)
 
+    def record_transition_run(self, transition: Transition, run: TransitionRun):
+        """
+        Thread safe, called when the function of <transition> ended
+        """
+        self.transitions_runs[transition.get_name()] = run
+        if run.is_coroutine:
+            self.get_transition_event_loop().record_run(run)
+        else:
+            self.get_transition_executor().record_run(run)
+        if trace_export.trace_recorder is not None:
+            trace_export.trace_recorder.record_transition(self.get_name(), self.act_behavior, transition.get_name(), run)
+        log.debug(f"Transition {self.get_name()}.{transition.get_name()}: queue wait {run.get_queue_wait_time():.6f}s, "
+                  f"execution {run.get_execution_time():.6f}s")
+
+    def thread_safe_notify_transition_end(self, transition: Transition):
+        """
+        Pushes <transition> on the completion queue and wakes up the semantics loop for this component
+        """
+        self.completed_transitions.put(transition)
+        self._assembly.mark_component_ready(self.get_name())
+
+    def notify_dependency_change(self, dependency: Dependency):
+        """
+        Called when the state (nb_users, refusing) of a dependency connected to <dependency> changed: the
+        component of <dependency> needs to be evaluated again
+        """
+        self._assembly.mark_component_ready(dependency.get_component_name())
+
+    def notify_dependency_state_change(self, dependency: Dependency):
+        """
+        Thread safe, called when the state (nb_users, refusing, data) of <dependency>, a dependency of this
+        component, changed
+        """
+        if self._assembly is not None:
+            self._assembly.mark_dependency_state_changed(dependency)
+
     """
     RECONFIGURATION
     """
@@ -609,6 +458,7 @@ class Component(object, metaclass=ABCMeta):
                     behavior, self.get_name()))
         # TODO warn if no transition with the behavior is fireable from the current state
         self.act_behavior = behavior
+        self._behavior_index = None
         if behavior is not None:
             communication_handler.set_component_state(ACTIVE, self.get_name(), global_variables.reconfiguration_name)
         if behavior is not None and behavior != "_init":
@@ -660,15 +510,15 @@ class Component(object, metaclass=ABCMeta):
     # old_my_connections
 
     def init(self):
-        from concerto.utility import empty_transition
         """
-        This method initializes the component and returns the set of active places
+        This method initializes the component by activating the _init transition of its template
         """
         if self.initialized:
             raise Exception("Trying to initialize component '%s' a second time" % self.get_name())
 
-        self._force_add_transition("_init", None, self.initial_place, "_init", 0, empty_transition)
         self.act_transitions.add(self.st_transitions["_init"])
+        self.completed_transitions.put(self.st_transitions["_init"])
+        self._behavior_index = None
 
         self.initialized = True
 
@@ -697,10 +547,11 @@ class Component(object, metaclass=ABCMeta):
             log.debug(f"actual round reconf: {self.round_reconf}")
             self.timestamps_switch_sleeping_state(TimestampPeriod.START)
 
-    def semantics(self) -> Tuple[bool, bool, bool]:
+    def semantics(self) -> Tuple[bool, bool, bool, bool]:
         """
         This method apply the operational semantics at the component level.
-        Returns whether the component is IDLE.
+        Returns whether the component is IDLE, whether it is doing something (token moved or
+        transitions running), whether it has running transitions and whether a token moved.
         """
         if global_variables.is_concerto_d_central() and len(self.act_transitions) == 0:
             self.handle_central_timestamps()
@@ -710,22 +561,27 @@ class Component(object, metaclass=ABCMeta):
             self.init()
 
         did_smthg_idocks, did_smthg_places, did_smthg_odocks, did_smthg_trans = False, False, False, False
-        if self.act_idocks:
-            did_smthg_idocks = self._idocks_to_place()
-        if self.act_places:
-            did_smthg_places = self._place_to_odocks()
-        if self.act_odocks:
-            did_smthg_odocks = self._start_transition()
-        if self.act_transitions:
-            did_smthg_trans = self._end_transition()
+        profiler = self._assembly.semantics_profiler if self._assembly is not None else None
+        if profiler is not None:
+            did_smthg_idocks, did_smthg_places, did_smthg_odocks, did_smthg_trans = self._profiled_phases(profiler)
+        else:
+            if self.act_idocks:
+                did_smthg_idocks = self._idocks_to_place()
+            if self.act_places:
+                did_smthg_places = self._place_to_odocks()
+            if self.act_odocks:
+                did_smthg_odocks = self._start_transition()
+            if self.act_transitions:
+                did_smthg_trans = self._end_transition()
 
         did_something = any([did_smthg_idocks, did_smthg_places, did_smthg_odocks, did_smthg_trans])
         # Checks if the component is IDLE
         idle = not self.act_transitions and not self.act_odocks and not self.act_idocks
         # Check s'il y a des output docks associés au behavior actif (s'il y a une place à atteindre)
         if idle:
+            index = self._get_behavior_index()
             for place in self.act_places:
-                if place not in self.visited_places and len(place.get_output_docks(self.act_behavior)) > 0:
+                if place not in self.visited_places and len(index.places[place].get_output_docks(self.act_behavior)) > 0:
                     idle = False
                     break
 
@@ -750,7 +606,7 @@ class Component(object, metaclass=ABCMeta):
             time_logger.register_end_all_time_values(component_timestamps_dict=self.timestamps_dict)
             time_logger.register_timestamps_in_file(component_timestamps_dict=self.timestamps_dict, component_name=self.get_name())
 
-        return idle, doing_something, len(self.act_transitions) > 0
+        return idle, doing_something, len(self.act_transitions) > 0, did_something
 
     def _go_idle(self):
         # Ajoute un behavior "de fin" (?) si c'est le cas
@@ -762,26 +618,47 @@ class Component(object, metaclass=ABCMeta):
     def is_idle(self):
         return self.act_behavior is None
 
-    def _put_provide_deps_in_refusing_state(self, place: Place):
+    def _get_behavior_index(self) -> BehaviorIndex:
+        if self._behavior_index is None or self._behavior_index.behavior != self.act_behavior:
+            self._behavior_index = BehaviorIndex(self, self.act_behavior)
+        return self._behavior_index
+
+    def _put_provide_deps_in_refusing_state(self, place_entry: PlaceEntry, odocks: List[Dock]):
         """
         TODO: duplicated code with _place_to_odocks
         """
         # Deps attached to place
-        for dep in self.place_dependencies[place.get_name()]:
-            if dep.get_type() is DepType.PROVIDE and not dep.is_refusing:
+        for dep in place_entry.provide_deps:
+            if not dep.is_refusing:
                 log.debug(f"Provide dep {str(dep)} is now refusing")
                 dep.set_refusing_state(True)
 
         # Deps attached to the group of the place
-        odocks = place.get_output_docks(self.act_behavior)
-        for group in self.place_groups[place.get_name()]:
-            group_operation = group.leave_place_operation(odocks)
-            if group.is_deactivating(group_operation):
-                for dep in self.group_dependencies[group.get_name()]:
-                    if dep.get_type() is DepType.PROVIDE and not dep.is_refusing:
+        for group_entry, group_operation in place_entry.get_leave_operations(odocks):
+            if group_entry.group.is_deactivating(group_operation):
+                for dep in group_entry.provide_deps:
+                    if not dep.is_refusing:
                         log.debug(f"Provide dep {str(dep)} is now refusing")
                         dep.set_refusing_state(True)
 
+    def _profiled_phases(self, profiler: SemanticsProfiler) -> Tuple[bool, bool, bool, bool]:
+        """
+        Same phases as semantics, each one timed by <profiler>
+        """
+        results = []
+        for phase, is_active, phase_function in (
+                (semantics_profiler.IDOCKS_TO_PLACE, self.act_idocks, self._idocks_to_place),
+                (semantics_profiler.PLACE_TO_ODOCKS, self.act_places, self._place_to_odocks),
+                (semantics_profiler.START_TRANSITION, self.act_odocks, self._start_transition),
+                (semantics_profiler.END_TRANSITION, self.act_transitions, self._end_transition)):
+            if not is_active:
+                results.append(False)
+                continue
+            start = time.perf_counter()
+            results.append(phase_function())
+            profiler.record_phase(phase, time.perf_counter() - start)
+        return results[0], results[1], results[2], results[3]
+
     def _place_to_odocks(self) -> bool:
         """
         This method represents the one moving the token of a place to its
@@ -789,51 +666,51 @@ class Component(object, metaclass=ABCMeta):
         """
         did_something = False
         places_to_remove: Set[Place] = set()
+        index = self._get_behavior_index()
 
         for place in self.act_places:
             if place in self.visited_places:
                 continue
-            odocks = place.get_output_docks(self.act_behavior)
+            place_entry = index.places[place]
+            odocks = place_entry.get_output_docks(self.act_behavior)
             log_once.debug(f"Move from place to odocks ({place.get_name()})")
-            if len(odocks) is 0:
+            if len(odocks) == 0:
                 continue
 
-            self._put_provide_deps_in_refusing_state(place)
+            self._put_provide_deps_in_refusing_state(place_entry, odocks)
 
             can_leave: bool = True
             # Checking place dependencies
-            for dep in self.place_dependencies[place.get_name()]:
-                if dep.get_type() is DepType.PROVIDE:
-                    if dep.is_locked():
-                        log_once.debug(f"Provide dependency {str(dep)} is locked and cannot leave the place {place}")
-                        can_leave = False
+            for dep in place_entry.provide_deps:
+                if dep.is_locked():
+                    log_once.debug(f"Provide dependency {str(dep)} is locked and cannot leave the place {place}")
+                    can_leave = False
             if not can_leave:
                 continue
 
             # Checking group dependencies if in a group
-            deactivating_groups_operation: Dict[Group, Group.Operation] = {}
-            for group in self.place_groups[place.get_name()]:
-                group_operation = group.leave_place_operation(odocks)
-                if group.is_deactivating(group_operation):
-                    for dep in self.group_dependencies[group.get_name()]:
-                        if (dep.get_type() is DepType.PROVIDE) and dep.is_locked():
-                            log_once.debug(f"Provide dependency {str(dep)} is locked and cannot leave the group {group}")
+            deactivating_groups_operation: Dict[GroupEntry, Group.Operation] = {}
+            for group_entry, group_operation in place_entry.get_leave_operations(odocks):
+                if group_entry.group.is_deactivating(group_operation):
+                    for dep in group_entry.provide_deps:
+                        if dep.is_locked():
+                            log_once.debug(f"Provide dependency {str(dep)} is locked and cannot leave the group {group_entry.group}")
                             can_leave = False
-                    deactivating_groups_operation[group] = group_operation
+                    deactivating_groups_operation[group_entry] = group_operation
             if not can_leave:
                 continue
 
             did_something = True
             if self.get_verbosity() >= 1:
                 self.print_color("Leaving place '%s'" % (place.get_name()))
-            for dep in self.place_dependencies[place.get_name()]:
-                if dep.get_type() is not DepType.DATA_PROVIDE:
-                    dep.stop_using()
-                    if self.get_verbosity() >= 2:
-                        self.print_color("Stopping to use place dependency '%s'" % dep.get_name())
-            for group in deactivating_groups_operation:
-                group.apply(deactivating_groups_operation[group])
-                for dep in self.group_dependencies[group.get_name()]:
+            for dep in place_entry.stop_using_deps:
+                dep.stop_using()
+                if self.get_verbosity() >= 2:
+                    self.print_color("Stopping to use place dependency '%s'" % dep.get_name())
+            for group_entry in deactivating_groups_operation:
+                group = group_entry.group
+                group.apply(deactivating_groups_operation[group_entry])
+                for dep in group_entry.deps:
                     dep.stop_using()
                     if self.get_verbosity() >= 2:
                         self.print_color("Stopping to use group dependency '%s'" % dep.get_name())
@@ -853,12 +730,14 @@ class Component(object, metaclass=ABCMeta):
         """
         did_something = False
         docks_to_remove: Set[Dock] = set()
+        index = self._get_behavior_index()
 
         for od in self.act_odocks:
             trans = od.get_transition()
+            trans_deps = index.transitions_deps[trans]
             enabled = True
 
-            for dep in self.trans_dependencies[trans.get_name()]:
+            for dep in trans_deps:
                 # Necessarily USE or DATA_USE
                 if not dep.is_served():
                     log_once.debug(f"Use dependency {str(dep)} of the transition {trans.get_name()} not served, transition cannot start")
@@ -874,7 +753,7 @@ class Component(object, metaclass=ABCMeta):
             did_something = True
             if self.get_verbosity() >= 1:
                 self.print_color("Starting transition '%s'" % (trans.get_name()))
-            for dep in self.trans_dependencies[trans.get_name()]:
+            for dep in trans_deps:
                 dep.start_using()
                 if self.get_verbosity() >= 2:
                     self.print_color("Starting to use transition dependency '%s'" % dep.get_name())
@@ -882,7 +761,7 @@ class Component(object, metaclass=ABCMeta):
                 gantt_tuple = None
             else:
                 gantt_tuple = (self.gantt, (self.name, self.act_behavior, trans.get_name(), time.perf_counter()))
-            trans.start_thread(gantt_tuple, self.dryrun)
+            trans.start_thread(self, gantt_tuple, self.dryrun)
             self.act_transitions.add(trans)
             docks_to_remove.add(od)
 
@@ -891,34 +770,40 @@ class Component(object, metaclass=ABCMeta):
 
     def _end_transition(self) -> bool:
         """
-        This method try to join threads from currently running transitions.
+        This method ends the transitions whose function is completed, drained from the completion queue
+        (the running transitions are not polled).
         """
         did_something = False
-        transitions_to_remove: Set[Transition] = set()
-
-        # check if some of these running transitions are finished
-        for trans in self.act_transitions:
-            if trans.get_name() is not "_init":
+        index = self._get_behavior_index()
+
+        while True:
+            try:
+                trans = self.completed_transitions.get_nowait()
+            except Empty:
+                break
+            if trans not in self.act_transitions:
+                continue
+            if trans.get_name() != "_init":
                 if self.gantt is None:
                     gantt_tuple = None
                 else:
                     gantt_tuple = (self.gantt, (self.name, self.act_behavior, trans.get_name(), time.perf_counter()))
-                joined = trans.join_thread(gantt_tuple, self.dryrun)
-                # get the new set of activated input docks
+                joined = trans.join_thread(self, gantt_tuple, self.dryrun)
                 if not joined:
-                    continue
+                    self.completed_transitions.put(trans)
+                    break
 
             did_something = True
-            for dep in self.trans_dependencies[trans.get_name()]:
+            for dep in index.transitions_deps[trans]:
                 dep.stop_using()
                 if self.get_verbosity() >= 2:
                     self.print_color("Stopping to use transition dependency '%s'" % dep.get_name())
             if self.get_verbosity() >= 1:
                 self.print_color("Ending transition '%s'" % (trans.get_name()))
+            # get the new set of activated input docks
             self.act_idocks.add(trans.get_dst_dock())
-            transitions_to_remove.add(trans)
+            self.act_transitions.discard(trans)
 
-        self.act_transitions.difference_update(transitions_to_remove)
         return did_something
 
     def _idocks_to_place(self):
@@ -927,6 +812,7 @@ class Component(object, metaclass=ABCMeta):
         """
         did_something = False
         docks_to_remove: Set[Dock] = set()
+        index = self._get_behavior_index()
 
         # if not all input docks are enabled for a place, the place will not
         # be activated.
@@ -939,10 +825,8 @@ class Component(object, metaclass=ABCMeta):
 
             # On récupère tous les input docks associés au behavior actif de la fin des transitions
             # allant vers cette place
-            grp_inp_docks = place.get_groups_of_input_docks(self.act_behavior)
-            for inp_docks in grp_inp_docks:
-                if len(inp_docks) is 0:
-                    continue
+            place_entry = index.places[place]
+            for inp_docks, enter_operations in place_entry.input_sets:
 
                 # On regarde si tous les input docks on reçu le jeton
                 ready = True
@@ -955,45 +839,44 @@ class Component(object, metaclass=ABCMeta):
                     continue
 
                 # Checking place dependencies
-                for dep in self.place_dependencies[place.get_name()]:
-                    if dep.get_type() is DepType.USE or dep.get_type() is DepType.DATA_USE:
-                        if not dep.is_served():
-                            log_once.debug(f"Use dep {dep.get_name()} from the place {place.get_name()} is not served. "
-                                                "cannot go into it")
-                            ready = False
-                        if not dep.is_allowed():
-                            log_once.debug(f"Use dep {dep.get_name()} from the place {place.get_name()} is not allowed. "
-                                                "cannot go into it")
-                            ready = False
+                for dep in place_entry.use_deps:
+                    if not dep.is_served():
+                        log_once.debug(f"Use dep {dep.get_name()} from the place {place.get_name()} is not served. "
+                                            "cannot go into it")
+                        ready = False
+                    if not dep.is_allowed():
+                        log_once.debug(f"Use dep {dep.get_name()} from the place {place.get_name()} is not allowed. "
+                                            "cannot go into it")
+                        ready = False
                 if not ready:
                     continue
 
                 # Checking group dependencies
-                activating_groups_operation: Dict[Group, Group.Operation] = {}
-                for group in self.place_groups[place.get_name()]:
+                activating_groups_operation: Dict[GroupEntry, Group.Operation] = {}
+                for group_entry, group_operation in enter_operations:
                     # A vérifier: on regarde combien de input dock manquants n'ont pas le jeton
-                    group_operation = group.enter_place_operation(inp_docks)
-                    if group.is_activating(group_operation):
-                        for dep in self.group_dependencies[group.get_name()]:
-                            if dep.get_type() is DepType.USE and (not dep.is_served() or not dep.is_allowed()):
+                    if group_entry.group.is_activating(group_operation):
+                        for dep in group_entry.use_deps:
+                            if not dep.is_served() or not dep.is_allowed():
                                 if not dep.is_served():
                                     log_once.debug(f"Use dep {dep.get_name()} from the group {place.get_name()} is not served. "
                                                         "cannot go into it")
                                 if not dep.is_allowed():
-                                    log_once.debug(f"Use dep {dep.get_name()} from the group {group.get_name()} is not allowed. "
+                                    log_once.debug(f"Use dep {dep.get_name()} from the group {group_entry.group.get_name()} is not allowed. "
                                                         "cannot go into it")
                                 ready = False
-                        activating_groups_operation[group] = group_operation
+                        activating_groups_operation[group_entry] = group_operation
                 if not ready:
                     continue
 
                 did_something = True
                 # Activation des dependances (start_using)
-                for group in activating_groups_operation:
+                for group_entry in activating_groups_operation:
+                    group = group_entry.group
                     if self.get_verbosity() >= 2:
                         self.print_color("Activating group '%s'" % (group.get_name()))
-                    group.apply(activating_groups_operation[group])
-                    for dep in self.group_dependencies[group.get_name()]:
+                    group.apply(activating_groups_operation[group_entry])
+                    for dep in group_entry.deps:
                         dep.start_using()
                         if dep.is_refusing:
                             dep.set_refusing_state(False)
@@ -1001,7 +884,7 @@ class Component(object, metaclass=ABCMeta):
                             self.print_color("Starting to use group dependency '%s'" % dep.get_name())
                 if self.get_verbosity() >= 1:
                     self.print_color("Entering place '%s'" % (place.get_name()))
-                for dep in self.place_dependencies[place.get_name()]:
+                for dep in place_entry.deps:
                     dep.start_using()
                     if dep.is_refusing:
                         dep.set_refusing_state(False)
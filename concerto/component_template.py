@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: component_template
+   :synopsis: this file contains the ComponentTemplate class, the structure shared by the instances of a component type.
+"""
+
+from typing import Dict, Tuple, List, Set, Callable, Optional
+
+from concerto.behavior_index import BehaviorLayout
+from concerto.dependency import DepType
+from concerto.group import Group
+from concerto.place import Dock, Place
+from concerto.transition import Transition
+
+
+class ComponentTemplate(object):
+    """
+    Immutable structure of a component type: places, docks, transitions, groups elements, dependencies
+    bindings and compiled behavior layouts. It is built once from the structure declared by create() and
+    shared by all the instances declaring the same structure, which only hold their runtime state (active
+    elements, dependencies values, groups tokens, transitions threads).
+    """
+
+    # structure declared by create() -> template
+    _templates: Dict[Tuple, 'ComponentTemplate'] = {}
+
+    @staticmethod
+    def get_template(component) -> 'ComponentTemplate':
+        """
+        Returns the template matching the structure declared by <component>, building it the first time.
+        """
+        structure = ComponentTemplate._compute_structure_key(component)
+        template = ComponentTemplate._templates.get(structure)
+        if template is None:
+            template = ComponentTemplate(component)
+            ComponentTemplate._templates[structure] = template
+        return template
+
+    @staticmethod
+    def clear_cache():
+        ComponentTemplate._templates = {}
+
+    @staticmethod
+    def _compute_structure_key(component) -> Tuple:
+        """
+        Key identifying the structure declared by create() (places, switches, groups, transitions and
+        dependencies bindings). The functions of the transitions and switches are not part of the structure,
+        they are looked up on the instance.
+        """
+        return (
+            type(component),
+            tuple(component.places),
+            tuple(name for (name, _) in component.switches),
+            tuple((name, tuple(places)) for name, places in component.groups.items()),
+            tuple((name, values[0], values[1], values[2], values[3]) for name, values in component.transitions.items()),
+            tuple((name, values[0], tuple(values[1])) for name, values in component.dependencies.items()),
+            component.initial_place
+        )
+
+    def __init__(self, component):
+        self.component_type: str = type(component).__name__
+        self.st_places: Dict[str, Place] = {}
+        self.st_transitions: Dict[str, Transition] = {}
+        self.st_switches: Set[str] = set()
+        self.st_groups: Dict[str, Group] = {}
+        self.st_behaviors: Set[str] = set()
+        self.dependencies_types: Dict[str, DepType] = {}
+        self.initial_place: Optional[str] = component.initial_place
+
+        self.trans_dependencies: Dict[str, List[str]] = {}
+        self.place_dependencies: Dict[str, List[str]] = {}
+        self.group_dependencies: Dict[str, List[str]] = {}
+        self.place_groups: Dict[str, List[str]] = {}
+        self._behaviors_layouts: Dict[Optional[str], BehaviorLayout] = {}
+        # obj_id => output dock and input dock of the transitions, built at the first lookup (see get_output_dock)
+        self._output_docks: Optional[Dict[str, Dock]] = None
+        self._input_docks: Optional[Dict[str, Dock]] = None
+
+        self.add_places(component.places)
+        self.add_switches(component.switches)
+        self.add_groups(component.groups)
+        self.add_transitions(component.transitions)
+        self.add_dependencies(component.dependencies)
+        if self.initial_place is not None:
+            if self.initial_place not in self.st_places:
+                raise Exception("Trying to set non-existant place %s as intial place of component type %s." % (
+                    self.initial_place, self.component_type))
+            # Transition de départ vers la place initiale (donc sans source), activée par Component.init
+            self._force_add_transition("_init", None, self.initial_place, "_init", 0)
+
+    def get_behavior_layout(self, behavior: Optional[str]) -> BehaviorLayout:
+        if behavior not in self._behaviors_layouts:
+            self._behaviors_layouts[behavior] = BehaviorLayout(self, behavior)
+        return self._behaviors_layouts[behavior]
+
+    def _index_docks(self):
+        self._output_docks = {}
+        self._input_docks = {}
+        for transition in self.st_transitions.values():
+            if transition.src_dock is not None:
+                self._output_docks[transition.src_dock.obj_id] = transition.src_dock
+            self._input_docks[transition.dst_dock.obj_id] = transition.dst_dock
+
+    def get_output_dock(self, obj_id: str) -> Optional[Dock]:
+        """
+        :return: the source dock of a transition from its obj_id (as saved by assembly_config), None if there is
+        no such dock. The output and input docks are looked up separately: the two docks of a transition
+        looping on a place have the same obj_id.
+        """
+        if self._output_docks is None:
+            self._index_docks()
+        return self._output_docks.get(obj_id)
+
+    def get_input_dock(self, obj_id: str) -> Optional[Dock]:
+        """
+        :return: the destination dock of a transition from its obj_id, None if there is no such dock
+        """
+        if self._input_docks is None:
+            self._index_docks()
+        return self._input_docks.get(obj_id)
+
+    def add_places(self, places: List[str], initial=None):
+        """
+        This method add all places declared in the user component class as a
+        dictionary associating the name of a place to its number of input and
+        output docks.
+
+        :param initial:
+        :param places: dictionary of places
+        """
+        for key in places:
+            self.add_place(key)
+        if initial is not None:
+            self.set_initial_place(initial)
+
+    def add_place(self, name: str, initial=False, is_switch=False):
+        """
+        This method offers the possibility to add a single place to an
+        already existing dictionary of places.
+
+        :param name: the name of the place to add
+        :param initial: whether the place is the initial place of the component (default: False)
+        :param is_switch: whether the output docks of the place are chosen by a switch function (default: False)
+        """
+        if name in self.st_places:
+            raise Exception("Trying to add '%s' as a place while it is already a place" % name)
+        elif name in self.st_transitions:
+            raise Exception("Trying to add '%s' as a place while it is already a transition" % name)
+        elif name in self.st_groups:
+            raise Exception("Trying to add '%s' as a place while it is already a group" % name)
+        self.st_places[name] = Place(name, is_switch)
+        self.place_dependencies[name] = []
+        self.place_groups[name] = []
+
+        if initial:
+            self.set_initial_place(name)
+
+    def add_switches(self, switches: List[Tuple[str, Callable[[Place, str], List[int]]]], initial=None):
+        for key in switches:
+            self.add_switch(key)
+        if initial is not None:
+            self.set_initial_place(initial)
+
+    def add_switch(self, tuple: Tuple[str, Callable[[Place, str], List[int]]], initial=False):
+        """
+        This method offers the possibility to add a single switch. The switch function is
+        not stored in the template, it is looked up on the component instance.
+
+        :param tuple: the name of the switch to add and its function
+        :param initial: whether the place is the initial place of the component (default: False)
+        """
+        (name, _) = tuple
+        self.add_place(name, initial, is_switch=True)
+        self.st_switches.add(name)
+
+    def add_groups(self, groups: Dict[str, List[str]]):
+        for name in groups:
+            self.add_group(name, groups[name])
+
+    def add_group(self, name: str, places: List[str]):
+        if name in self.st_places:
+            raise Exception("Trying to add '%s' as a group while it is already a place" % name)
+        elif name in self.st_transitions:
+            raise Exception("Trying to add '%s' as a group while it is already a transition" % name)
+        elif name in self.st_groups:
+            raise Exception("Trying to add '%s' as a group while it is already a group" % name)
+
+        for place_name in places:
+            if place_name not in self.st_places:
+                raise Exception("Error: trying to add non-existing place '%s' to group '%s'" % (place_name, name))
+            elif place_name == self.initial_place:
+                raise Exception(
+                    "Error: trying to add initial place '%s' to group '%s' (framework limitation: initial place "
+                    "cannot be in a group, for now...)" % (
+                        place_name, name))
+
+        self.st_groups[name] = Group(self.component_type, name)
+        self.group_dependencies[name] = []
+        self.st_groups[name].add_places(places)
+        for place_name in places:
+            self.place_groups[place_name].append(name)
+
+    def add_transitions(self, transitions: Dict[str, Tuple]):
+        """
+        This method add all transitions declared in the user component class
+        as a dictionary associating the name of a transition to a transition
+        object created by the user too. The functions of the transitions are
+        not stored in the template, they are looked up on the component instance.
+        Requires add_states and add_groups to have been executed
+
+        :param transitions: dictionary of transitions
+        """
+        for key in transitions:
+            # add docks to places and bind docks
+            self.add_transition(key, transitions[key][0], transitions[key][1], transitions[key][2], transitions[key][3])
+
+    def _force_add_transition(self, name: str, src_name: Optional[str], dst_name: str, bhv: str, idset: int):
+        src = None
+        if src_name is not None:
+            src = self.st_places[src_name]
+        self.st_transitions[name] = Transition(name, src, self.st_places[dst_name], bhv, idset)
+        self.trans_dependencies[name] = []
+        self.st_behaviors.add(bhv)
+        for group in self.st_groups:
+            if self.st_groups[group].contains_place(src_name) and self.st_groups[group].contains_place(dst_name):
+                self.st_groups[group].add_transition(name)
+
+    def add_transition(self, name: str, src_name: str, dst_name: str, bhv: str, idset: int):
+        """
+        This method offers the possibility to add a single transition to an
+        already existing dictionary of transitions.
+
+        :param idset:
+        :param name: the name of the transition to add
+        :param src_name: the name of the source place of the transition
+        :param dst_name: the name of the destination place of the transition
+        :param bhv: the name of the behavior associated to the transition
+        """
+        if name in self.st_places:
+            raise Exception("Trying to add '%s' as a transition while it is already a place" % name)
+        if name in self.st_transitions:
+            raise Exception("Trying to add '%s' as a transition while it is already a transition" % name)
+        if name in self.st_groups:
+            raise Exception("Trying to add '%s' as a transition while it is already a group" % name)
+        if name == "_init":
+            raise Exception("Cannot name a transition '_init' (used internally)")
+        if bhv == "_init":
+            raise Exception("Cannot name a behavior '_init' (used internally)")
+        if src_name not in self.st_places:
+            raise Exception("Trying to add transition '%s' starting from unexisting place '%s'" % (name, src_name))
+        if dst_name not in self.st_places:
+            raise Exception("Trying to add transition '%s' going to unexisting place '%s'" % (name, dst_name))
+
+        self._force_add_transition(name, src_name, dst_name, bhv, idset)
+
+    def add_dependencies(self, dep: Dict[str, Tuple[DepType, List[str]]]):
+        """
+        This method add all dependencies declared in the user component class
+        as a dictionary associating the name of a dependency to both a type
+        and the name of the transition or the place to which it is bound.
+
+        - a 'use' or 'data-use' dependency can be bound to a transition
+
+        - a 'provide' or 'data-provide' dependency can be bound to a place
+
+        :param dep: dictionary of dependencies
+
+        """
+        for key in dep:
+            if len(dep[key]) == 2:
+                type = dep[key][0]
+                bname = dep[key][1]  # list of places or transitions bounded to
+                self.add_dependency(key, type, bname)
+
+            else:
+                raise Exception("ERROR dependency %s - two arguments should be given for construction, "
+                                "a type enum DepType and the name of the place, the transition "
+                                "or the group to which the dependency is bound." % key)
+
+    def add_dependency(self, name: str, type: DepType, bindings: List[str]):
+        """
+        This method offers the possibility to add a single dependency to an
+        already existing dictionary of dependencies.
+
+        :param bindings:
+        :param name: the name of the dependency to add
+        :param type: the type DepType of the dependency
+        :param binding: the name of the binding of the dependency (place or transition)
+        """
+        if type == DepType.DATA_USE:
+            transitions = []
+            switches = []
+            for bind in bindings:
+                if bind in self.st_transitions:
+                    transitions.append(bind)
+                elif bind in self.st_switches:
+                    switches.append(bind)
+                else:
+                    raise Exception(
+                        "Trying to bind dependency %s (of type %s) to something else than a transition or a switch" % (
+                            name, str(type)))
+
+            self.dependencies_types[name] = type
+            for transition_name in transitions:
+                self.trans_dependencies[transition_name].append(name)
+            for switch_name in switches:
+                self.place_dependencies[switch_name].append(name)
+
+        elif type == DepType.USE:
+            places = []
+            transitions = []
+            groups = []
+            for bind in bindings:
+                if bind in self.st_transitions:
+                    transitions.append(bind)
+                elif bind in self.st_places:
+                    places.append(bind)
+                elif bind in self.st_groups:
+                    groups.append(bind)
+                else:
+                    raise Exception(
+                        "Trying to bind dependency %s (of type %s) to something else than a place, a transition or a group" % (
+                            name, str(type)))
+
+            self.dependencies_types[name] = type
+            for place_name in places:
+                self.place_dependencies[place_name].append(name)
+            for transition_name in transitions:
+                self.trans_dependencies[transition_name].append(name)
+            for group_name in groups:
+                self.group_dependencies[group_name].append(name)
+
+        elif type == DepType.DATA_PROVIDE:
+            for bind in bindings:
+                if bind not in self.st_places:
+                    raise Exception(
+                        "Trying to bind dependency %s (of type %s) to something else than a place" % (name, str(type)))
+
+            self.dependencies_types[name] = type
+            for place_name in bindings:
+                self.place_dependencies[place_name].append(name)
+
+        elif type == DepType.PROVIDE:
+            places = []
+            groups = []
+            for bind in bindings:
+                if bind in self.st_places:
+                    places.append(bind)
+                elif bind in self.st_groups:
+                    groups.append(bind)
+                else:
+                    raise Exception(
+                        "Trying to bind dependency %s (of type %s) to something else than a place or a group" % (
+                            name, str(type)))
+
+            self.dependencies_types[name] = type
+            for place_name in places:
+                self.place_dependencies[place_name].append(name)
+            for group_name in groups:
+                self.group_dependencies[group_name].append(name)
+
+    def set_initial_place(self, name: str):
+        """
+        This method allows to set the (unique) initial place of the component, if not already done
+        using the parameter of add_place and add_places.
+
+        :param name: the name of the place to mark initial
+        """
+
+        if name not in self.st_places:
+            raise Exception(
+                "Trying to set non-existant place %s as intial place of component type %s." % (name, self.component_type))
+        if self.initial_place is not None:
+            raise Exception(
+                "Trying to set place %s as intial place of component type %s while %s is already the intial place." % (
+                    name, self.component_type, self.initial_place))
+        self.initial_place = name
@@ -6,6 +6,8 @@ class Connection:
     This class is used by the assembly to store connections between components
     """
 
+    __slots__ = ("_use_dep", "_provide_dep")
+
     def __init__(self, dep1: Dependency, dep2: Dependency):
         use_dep, provide_dep = self.compute_provide_use_deps(dep1, dep2)
         self._use_dep = use_dep
@@ -70,6 +70,9 @@ class Dependency(object):
     This class represents a dependency.
     """
 
+    __slots__ = ("_component", "dependency_name", "dependency_type", "dependency_connections", "is_refusing",
+                 "nb_users", "data")
+
     def __init__(self, component, name: str, dep_type: DepType):
         self._component = component
         self.dependency_name = name
@@ -141,6 +144,7 @@ class Dependency(object):
     def write(self, data):
         self.check_write_data_is_provide()
         self.data = data
+        self._component.notify_dependency_state_change(self)
 
     def connect(self, c):
         """
@@ -161,19 +165,25 @@ class Dependency(object):
 
     def start_using(self):
         self.nb_users += 1
-
-        # S'il y a au moins une dépendance remote, il faut la prévenir de la mise à jour du nb_users
-        for conn in self.dependency_connections:
-            if type(conn.get_opposite_dependency(self)).__name__ == 'RemoteDependency':
-                communication_handler.send_nb_dependency_users(self.nb_users, self.get_component_name(), self.dependency_name)
+        self._propagate_nb_users()
 
     def stop_using(self):
         self.nb_users -= 1
+        self._propagate_nb_users()
 
-        # S'il y a au moins une dépendance remote, il faut la prévenir de la mise à jour du nb_users
+    def _propagate_nb_users(self):
+        self._component.notify_dependency_state_change(self)
+        has_remote_dependency = False
         for conn in self.dependency_connections:
-            if type(conn.get_opposite_dependency(self)).__name__ == 'RemoteDependency':
-                communication_handler.send_nb_dependency_users(self.nb_users, self.get_component_name(), self.dependency_name)
+            opposite_dep = conn.get_opposite_dependency(self)
+            if type(opposite_dep).__name__ == 'RemoteDependency':
+                has_remote_dependency = True
+            else:
+                self._component.notify_dependency_change(opposite_dep)
+        # S'il y a au moins une dépendance remote, il faut la prévenir de la mise à jour du nb_users
+        # (une seule publication, le topic ne dépend pas de la connexion)
+        if has_remote_dependency:
+            communication_handler.send_nb_dependency_users(self.nb_users, self.get_component_name(), self.dependency_name)
 
     def is_allowed(self):
         if self.dependency_type != DepType.DATA_USE and self.dependency_type != DepType.USE:
@@ -185,11 +195,16 @@ class Dependency(object):
 
     def set_refusing_state(self, value: bool):
         self.is_refusing = value
+        self._component.notify_dependency_state_change(self)
 
         # S'il y a au moins une dépendance remote, il faut la prévenir du fait que le provide n'accepte
         # plus d'utilisation
         if any(type(conn.get_opposite_dependency(self)).__name__ == 'RemoteDependency' for conn in self.dependency_connections):
             communication_handler.send_refusing_state(value, self.get_component_name(), self.dependency_name)
+        for conn in self.dependency_connections:
+            opposite_dep = conn.get_opposite_dependency(self)
+            if type(opposite_dep).__name__ != 'RemoteDependency':
+                self._component.notify_dependency_change(opposite_dep)
 
     def is_served(self):
         """
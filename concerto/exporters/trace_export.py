@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: trace_export
+   :synopsis: this file contains the TraceRecorder class, the export of the reconfigurations as traces (OTLP JSON and Chrome trace events).
+
+usage of the merge of the traces of a reconfiguration:
+    python3 -m concerto.exporters.trace_export <reconfiguration dir> (--format otlp|chrome) (--output <file>)
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from concerto import clock, global_variables, time_logger
+from concerto.time_logger import TimestampPeriod, TimestampType
+from concerto.timestamps_buffer import build_timestamp_name
+
+"""
+The spans of a sleep round of an assembly are written at its sleep to
+<execution_expe_dir>/<reconfiguration_name>/traces/<assembly>_<start of the round>.json, in the OTLP JSON format
+(one resourceSpans per assembly). All the spans of a reconfiguration share the trace id derived from its
+reconfiguration_name, on all the assemblies:
+assembly <name>                      the assembly in the reconfiguration
+    round                            a sleep round
+        instruction_* / event_*      the timestamps of create_timestamp_metric
+    component <name>                 a component of the assembly
+        behavior_*                   its behaviors
+            transition <name>        the runs of its transitions
+The spans of the assemblies and of the components have ids derived from their names: they are written in each
+round (covering the round) and merged by merge_traces, and the wait (resp. wait_all) instructions link to the
+span of the component (resp. of the remote assemblies) they wait for, even if it is on another assembly.
+"""
+OTLP = "otlp"
+CHROME = "chrome"
+TRACES_DIR_NAME = "traces"
+SCOPE_NAME = "concerto"
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_ERROR = 2
+
+# Recorder of the current process, see start_recording
+trace_recorder: Optional['TraceRecorder'] = None
+
+
+def build_trace_id(reconfiguration_name: str) -> str:
+    return hashlib.sha256(reconfiguration_name.encode("utf-8")).hexdigest()[:32]
+
+
+def build_span_id(reconfiguration_name: str, kind: str, name: str) -> str:
+    """
+    Id of the span of an assembly or a component, the same on all the assemblies
+    """
+    return hashlib.sha256(f"{reconfiguration_name}/{kind}/{name}".encode("utf-8")).hexdigest()[:16]
+
+
+def _new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+class Span:
+
+    __slots__ = ("span_id", "parent_span_id", "name", "start_ns", "end_ns", "attributes", "links", "error")
+
+    def __init__(self, span_id: str, parent_span_id: Optional[str], name: str, start_ns: int, end_ns: Optional[int] = None,
+                 attributes: Optional[Dict[str, Any]] = None, links: Optional[List[str]] = None, error: Optional[str] = None):
+        self.span_id: str = span_id
+        self.parent_span_id: Optional[str] = parent_span_id
+        self.name: str = name
+        self.start_ns: int = start_ns
+        self.end_ns: Optional[int] = end_ns
+        self.attributes: Dict[str, Any] = attributes or {}
+        self.links: List[str] = links or []
+        self.error: Optional[str] = error
+
+    def to_otlp(self, trace_id: str) -> Dict[str, Any]:
+        otlp_span = {
+            "traceId": trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": {"stringValue": str(value)}} for key, value in self.attributes.items()],
+        }
+        if self.parent_span_id is not None:
+            otlp_span["parentSpanId"] = self.parent_span_id
+        if self.links:
+            otlp_span["links"] = [{"traceId": trace_id, "spanId": span_id} for span_id in self.links]
+        if self.error is not None:
+            otlp_span["status"] = {"code": STATUS_CODE_ERROR, "message": self.error}
+        return otlp_span
+
+    @staticmethod
+    def from_otlp(otlp_span: Dict[str, Any]) -> 'Span':
+        return Span(
+            otlp_span["spanId"],
+            otlp_span.get("parentSpanId"),
+            otlp_span["name"],
+            int(otlp_span["startTimeUnixNano"]),
+            int(otlp_span["endTimeUnixNano"]),
+            {attribute["key"]: attribute["value"]["stringValue"] for attribute in otlp_span.get("attributes", [])},
+            [link["spanId"] for link in otlp_span.get("links", [])],
+            otlp_span.get("status", {}).get("message")
+        )
+
+
+class TraceRecorder:
+    """
+    Records the spans of the current sleep round of the assembly from the timestamps of time_logger and from
+    the runs of the transitions (see Component.record_transition_run)
+    """
+
+    def __init__(self):
+        self.assembly = None
+        self.round_span: Span = Span(_new_span_id(), None, "round", clock.wall_time_ns())
+        self.spans: List[Span] = [self.round_span]
+        # (timestamp type, args, kwargs values) => span started
+        self._open_spans: Dict[Tuple, Span] = {}
+        # component => start of its first span in the round
+        self._components_starts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def set_assembly(self, assembly):
+        self.assembly = assembly
+
+    def _get_assembly_name(self) -> str:
+        return self.assembly.get_name() if self.assembly is not None else time_logger.ASSEMBLY_NAME
+
+    def _get_component_span_id(self, component_name: str) -> str:
+        return build_span_id(global_variables.reconfiguration_name, "component", component_name)
+
+    def _get_links(self, timestamp_type: str, args: Tuple) -> List[str]:
+        if timestamp_type == TimestampType.TimestampInstruction.WAIT and len(args) >= 2:
+            return [self._get_component_span_id(args[1])]
+        if timestamp_type == TimestampType.TimestampInstruction.WAITALL and self.assembly is not None:
+            return [build_span_id(global_variables.reconfiguration_name, "assembly", assembly_name)
+                    for assembly_name in self.assembly._remote_assemblies]
+        return []
+
+    def on_time_value(self, timestamp_type: str, timestamp_period: str, args: Tuple, kwargs_values: Tuple):
+        """
+        Listener of time_logger (see time_logger.set_span_listener)
+        """
+        now_ns = clock.wall_time_ns()
+        timestamp_key = (timestamp_type, args, kwargs_values)
+        with self._lock:
+            if timestamp_period == TimestampPeriod.START:
+                if timestamp_type == TimestampType.BEHAVIOR:
+                    # args: behavior, component
+                    parent_span_id = self._get_component_span_id(args[1])
+                    self._components_starts.setdefault(args[1], now_ns)
+                    attributes = {"concerto.behavior": args[0], "concerto.component": args[1]}
+                else:
+                    parent_span_id = self.round_span.span_id
+                    attributes = {"concerto.args": "-".join(args)} if args else {}
+                name = build_timestamp_name(timestamp_type, args, kwargs_values)
+                span = Span(_new_span_id(), parent_span_id, name, now_ns, attributes=attributes,
+                            links=self._get_links(timestamp_type, args))
+                self._open_spans[timestamp_key] = span
+                self.spans.append(span)
+            else:
+                span = self._open_spans.pop(timestamp_key, None)
+                if span is not None:
+                    span.end_ns = now_ns
+
+    def record_transition(self, component_name: str, behavior: Optional[str], transition_name: str, run):
+        """
+        :param run: TransitionRun of the transition (times of time.monotonic)
+        """
+        if run.started_at == 0.:
+            # The function could not be run
+            return
+        start_ns = clock.monotonic_to_wall_time_ns(run.started_at)
+        with self._lock:
+            parent = next((span for (timestamp_type, args, _), span in self._open_spans.items()
+                           if timestamp_type == TimestampType.BEHAVIOR and args[:2] == (behavior, component_name)), None)
+            self._components_starts.setdefault(component_name, start_ns)
+            self.spans.append(Span(
+                _new_span_id(),
+                parent.span_id if parent is not None else self._get_component_span_id(component_name),
+                f"transition {transition_name}",
+                start_ns,
+                clock.monotonic_to_wall_time_ns(run.ended_at),
+                {"concerto.component": component_name, "concerto.transition": transition_name,
+                 "concerto.queue_wait_s": run.get_queue_wait_time()},
+                error=run.error
+            ))
+
+    def build_spans(self) -> List[Span]:
+        """
+        :return: the spans of the round, the spans not ended yet are ended now
+        """
+        now_ns = clock.wall_time_ns()
+        reconfiguration_name = global_variables.reconfiguration_name
+        assembly_name = self._get_assembly_name()
+        with self._lock:
+            for span in self.spans:
+                if span.end_ns is None:
+                    span.end_ns = now_ns
+            assembly_span_id = build_span_id(reconfiguration_name, "assembly", assembly_name)
+            self.round_span.parent_span_id = assembly_span_id
+            spans = [Span(assembly_span_id, None, f"assembly {assembly_name}", self.round_span.start_ns, now_ns,
+                          {"concerto.assembly": assembly_name})]
+            for component_name, start_ns in self._components_starts.items():
+                spans.append(Span(self._get_component_span_id(component_name), assembly_span_id,
+                                  f"component {component_name}", start_ns, now_ns,
+                                  {"concerto.component": component_name}))
+            return spans + list(self.spans)
+
+    def write(self, file_path: Optional[str] = None) -> str:
+        assembly_name = self._get_assembly_name()
+        if file_path is None:
+            file_path = build_trace_file_path(assembly_name, self.round_span.start_ns)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            json.dump(to_otlp({assembly_name: self.build_spans()}, global_variables.reconfiguration_name), f)
+        return file_path
+
+
+def build_trace_file_path(assembly_name: str, round_start_ns: int) -> str:
+    return f"{global_variables.execution_expe_dir}/{global_variables.reconfiguration_name}/{TRACES_DIR_NAME}/{assembly_name}_{round_start_ns}.json"
+
+
+def start_recording():
+    """
+    Records the spans of the assembly of this process, to call before creating it. The spans are written
+    when the assembly goes to sleep.
+    """
+    global trace_recorder
+    trace_recorder = TraceRecorder()
+    time_logger.set_span_listener(trace_recorder.on_time_value)
+
+
+def stop_recording():
+    global trace_recorder
+    trace_recorder = None
+    time_logger.set_span_listener(None)
+
+
+def to_otlp(spans_by_assembly: Dict[str, List[Span]], reconfiguration_name: str) -> Dict[str, Any]:
+    trace_id = build_trace_id(reconfiguration_name)
+    return {"resourceSpans": [
+        {
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": assembly_name}},
+                {"key": "concerto.reconfiguration_name", "value": {"stringValue": reconfiguration_name}},
+            ]},
+            "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": [span.to_otlp(trace_id) for span in spans]}]
+        }
+        for assembly_name, spans in spans_by_assembly.items()
+    ]}
+
+
+def to_chrome_trace(spans_by_assembly: Dict[str, List[Span]]) -> Dict[str, Any]:
+    """
+    Complete events ("X") with a process per assembly and a thread per component (the instructions and the
+    events on the thread "assembly"), and flow events ("s"/"f") from the end of the spans waited for to the end
+    of the wait instructions
+    """
+    events = []
+    spans_by_id = {}
+    for assembly_name, spans in spans_by_assembly.items():
+        events.append({"name": "process_name", "ph": "M", "pid": assembly_name, "args": {"name": assembly_name}})
+        for span in spans:
+            spans_by_id[span.span_id] = (assembly_name, span)
+    for flow_id, (assembly_name, span) in enumerate(spans_by_id.values()):
+        thread = span.attributes.get("concerto.component", "assembly")
+        event = {"name": span.name, "cat": span.name.split(" ", 1)[0].split("_", 1)[0], "ph": "X", "pid": assembly_name,
+                 "tid": thread, "ts": span.start_ns / 1000, "dur": (span.end_ns - span.start_ns) / 1000,
+                 "args": dict(span.attributes)}
+        if span.error is not None:
+            event["args"]["error"] = span.error
+        events.append(event)
+        for linked_span_id in span.links:
+            if linked_span_id not in spans_by_id:
+                continue
+            linked_assembly_name, linked_span = spans_by_id[linked_span_id]
+            flow_name = f"waited by {span.name}"
+            events.append({"name": flow_name, "cat": "wait", "ph": "s", "id": f"{flow_id}-{linked_span_id}",
+                           "pid": linked_assembly_name, "tid": linked_span.attributes.get("concerto.component", "assembly"),
+                           "ts": min(linked_span.end_ns, span.end_ns) / 1000})
+            events.append({"name": flow_name, "cat": "wait", "ph": "f", "bp": "e", "id": f"{flow_id}-{linked_span_id}",
+                           "pid": assembly_name, "tid": thread, "ts": span.end_ns / 1000})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def merge_traces(file_paths: List[str]) -> Dict[str, List[Span]]:
+    """
+    Reads the traces written by the assemblies (OTLP JSON), the spans of the assemblies and of the components
+    written in several rounds are merged into one span
+    :return: assembly => spans
+    """
+    spans_by_assembly: Dict[str, Dict[str, Span]] = {}
+    for file_path in file_paths:
+        with open(file_path) as f:
+            trace = json.load(f)
+        for resource_spans in trace["resourceSpans"]:
+            assembly_name = next(attribute["value"]["stringValue"] for attribute in resource_spans["resource"]["attributes"]
+                                 if attribute["key"] == "service.name")
+            assembly_spans = spans_by_assembly.setdefault(assembly_name, {})
+            for scope_spans in resource_spans["scopeSpans"]:
+                for otlp_span in scope_spans["spans"]:
+                    span = Span.from_otlp(otlp_span)
+                    previous_span = assembly_spans.get(span.span_id)
+                    if previous_span is not None:
+                        previous_span.start_ns = min(previous_span.start_ns, span.start_ns)
+                        previous_span.end_ns = max(previous_span.end_ns, span.end_ns)
+                    else:
+                        assembly_spans[span.span_id] = span
+    return {assembly_name: list(spans.values()) for assembly_name, spans in spans_by_assembly.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Merge of the traces of the assemblies of a reconfiguration")
+    parser.add_argument("reconfiguration_dir")
+    parser.add_argument("--format", choices=[OTLP, CHROME], default=OTLP)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    reconfiguration_name = os.path.basename(os.path.normpath(args.reconfiguration_dir))
+    spans = merge_traces(sorted(glob.glob(f"{args.reconfiguration_dir}/{TRACES_DIR_NAME}/*.json")))
+    output = args.output or f"{args.reconfiguration_dir}/{reconfiguration_name}_{args.format}_trace.json"
+    with open(output, "w") as f:
+        json.dump(to_otlp(spans, reconfiguration_name) if args.format == OTLP else to_chrome_trace(spans), f)
+    print(output)
@@ -1,11 +1,13 @@
+import json
 import traceback
 from functools import wraps
 
 import yaml
-from flask import Flask, request
+from flask import Flask, Response, request
 from threading import Thread
+from typing import Any, List, Optional, Tuple
 
-from concerto import global_variables
+from concerto import clock, global_variables, api_server, wire_format
 from concerto.debug_logger import log, log_once
 from concerto.rest_communication import ACTIVE, INACTIVE
 import logging
@@ -15,12 +17,132 @@ CONN = "CONN"
 DECONN = "DECONN"
 
 
+API_SERVER_ASYNCIO = "asyncio"
+API_SERVER_FLASK = "flask"
+
+# Server answering the remote assemblies: the Flask development server (default) or, opt-in, the asyncio server of
+# api_server (see set_api_server_type)
+api_server_type = API_SERVER_FLASK
+
+
+def set_api_server_type(server_type: str):
+    """
+    Has to be called before the creation of the assembly
+    """
+    global api_server_type
+    if server_type not in (API_SERVER_ASYNCIO, API_SERVER_FLASK):
+        raise Exception("Unknown API server type '%s' (expected '%s' or '%s')" % (
+            server_type, API_SERVER_ASYNCIO, API_SERVER_FLASK))
+    api_server_type = server_type
+
+
+def get_api_port(assembly) -> int:
+    with open(global_variables.get_inventory_absolute_path()) as f:
+        loaded_inventory = yaml.safe_load(f)
+    _, port = loaded_inventory[assembly.get_name()].split(":")
+    return int(port)
+
+
 def run_api_in_thread(assembly):
+    assembly.publish_api_snapshot()
+    if api_server_type == API_SERVER_ASYNCIO:
+        api_server.run_api_server_in_thread(assembly, get_api_port(assembly))
+        return
     thread = Thread(target=run_flask_api, args=(assembly,))
     thread.setDaemon(True)  # Required to make the program exit when main thread exit
     thread.start()
 
 
+# The endpoints read the last ApiSnapshot published by the semantics loop. They return a typed value, rendered
+# as text or in the binary wire format depending on the Accept header of the request (see render_result), None if
+# the lookup failed
+
+def get_nb_dependency_users(assembly, component_name: str, dependency_name: str) -> Optional[int]:
+    return assembly.get_api_snapshot().get_nb_dependency_users(component_name, dependency_name)
+
+
+def get_refusing_state(assembly, component_name: str, dependency_name: str) -> Optional[bool]:
+    return assembly.get_api_snapshot().get_refusing_state(component_name, dependency_name)
+
+
+def get_data_dependency(assembly, component_name: str, dependency_name: str) -> Optional[str]:
+    dependency = assembly.get_api_snapshot().get_dependency(component_name, dependency_name)
+    if dependency is None:
+        return None
+    return str(dependency[2])
+
+
+def is_conn_synced(assembly, syncing_component: str, component_to_sync: str, dep_to_sync: str, syncing_dep: str,
+                   action: str) -> bool:
+    if assembly.get_api_snapshot().is_connected(syncing_component, component_to_sync, dep_to_sync, syncing_dep):
+        return action == CONN
+    return action == DECONN
+
+
+def get_remote_component_state(assembly, component_name: str, calling_assembly_name: str) -> str:
+    # Read from the assembly and not from the snapshot: the answer confirms the end of the global synchronization
+    # to the calling assembly (see Assembly.wait_all)
+    if assembly.is_component_idle(component_name):
+        assembly.remote_confirmations.add(calling_assembly_name)
+        assembly.notify_semantics_event()
+        component_state = INACTIVE
+    else:
+        component_state = ACTIVE
+    # log_once.debug(f"Remote asembly {calling_assembly_name} checks for my local state of {component_name}: {component_state}")
+
+    return component_state
+
+
+# Endpoints that can be queried through /batch (without side effects)
+batch_endpoints = {
+    "get_nb_dependency_users": get_nb_dependency_users,
+    "get_refusing_state": get_refusing_state,
+    "get_data_dependency": get_data_dependency,
+    "is_conn_synced": is_conn_synced,
+}
+
+
+def run_batch(assembly, queries: List) -> List[Any]:
+    """
+    Answers several lookups: queries is [[endpoint_name, [path arguments]], ...], a result is None if the
+    lookup failed
+    """
+    results = []
+    for endpoint_name, args in queries:
+        if endpoint_name in batch_endpoints:
+            try:
+                results.append(batch_endpoints[endpoint_name](assembly, *args))
+            except Exception as e:
+                log.exception(e)
+                results.append(None)
+        else:
+            results.append(None)
+    return results
+
+
+def accepts_binary(accept_header: Optional[str]) -> bool:
+    """
+    The binary wire format is negotiated per request: only the clients that accept it receive it
+    """
+    return accept_header is not None and wire_format.BINARY_CONTENT_TYPE in accept_header
+
+
+def render_result(result: Any, binary: bool) -> Tuple[str, bytes]:
+    """
+    :return: (content type, body) of the answer of an endpoint
+    """
+    if binary:
+        return wire_format.BINARY_CONTENT_TYPE, wire_format.encode_value(result)
+    return "text/plain", str(result).encode()
+
+
+def render_batch_results(results: List[Any], binary: bool) -> Tuple[str, bytes]:
+    if binary:
+        return wire_format.BINARY_CONTENT_TYPE, wire_format.encode_values(results)
+    text_results = [str(result) if result is not None else None for result in results]
+    return "application/json", json.dumps({"results": text_results}).encode()
+
+
 def catch_exceptions(func):
     """
     Permet de catcher les exceptions des routes TODO: comprendre pk need de les catcher explicitement
@@ -40,64 +162,52 @@ def catch_exceptions(func):
 def run_flask_api(assembly):
     app = Flask(__name__)
 
+    def answer(result):
+        if result is None:
+            return None
+        content_type, body = render_result(result, accepts_binary(request.headers.get("Accept")))
+        return Response(body, content_type=content_type)
+
+    @app.after_request
+    def add_clock_header(response):
+        # Used by the peers to estimate the offset of the clock of this node, see clock
+        response.headers[clock.CLOCK_HEADER] = str(clock.wall_time_ns())
+        return response
+
     @app.route("/get_nb_dependency_users/<component_name>/<dependency_name>")
     @catch_exceptions
-    def get_nb_dependency_users(component_name: str, dependency_name: str):
-        for conn in set(assembly.component_connections[component_name]):
-            if conn._use_dep.get_name() == dependency_name:
-                return str(conn._use_dep.nb_users)
-            if conn._provide_dep.get_name() == dependency_name:
-                return str(conn._provide_dep.nb_users)
+    def flask_get_nb_dependency_users(component_name: str, dependency_name: str):
+        return answer(get_nb_dependency_users(assembly, component_name, dependency_name))
 
     @app.route("/get_refusing_state/<component_name>/<dependency_name>")
     @catch_exceptions
-    def get_refusing_state(component_name: str, dependency_name: str):
-        for conn in set(assembly.component_connections[component_name]):
-            if conn._use_dep.get_name() == dependency_name:
-                return str(conn._use_dep.is_refusing)
-            if conn._provide_dep.get_name() == dependency_name:
-                return str(conn._provide_dep.is_refusing)
+    def flask_get_refusing_state(component_name: str, dependency_name: str):
+        return answer(get_refusing_state(assembly, component_name, dependency_name))
 
     @app.route("/get_data_dependency/<component_name>/<dependency_name>")
     @catch_exceptions
-    def get_data_dependency(component_name: str, dependency_name: str):
-        for conn in set(assembly.component_connections[component_name]):
-            if conn._use_dep.get_name() == dependency_name:
-                return str(conn._use_dep.data)
-            if conn._provide_dep.get_name() == dependency_name:
-                return str(conn._provide_dep.data)
+    def flask_get_data_dependency(component_name: str, dependency_name: str):
+        return answer(get_data_dependency(assembly, component_name, dependency_name))
 
     @app.route("/is_conn_synced/<syncing_component>/<component_to_sync>/<dep_to_sync>/<syncing_dep>/<action>")
     @catch_exceptions
-    def is_conn_synced(syncing_component: str, component_to_sync: str, dep_to_sync: str, syncing_dep: str, action: str):
-        for conn in set(assembly.component_connections[component_to_sync]):
-            use, provide = (conn.get_use_dep(), conn.get_provide_dep())
-            if (use.get_component_name() in [component_to_sync, syncing_component]
-                and provide.get_component_name() in [component_to_sync, syncing_component]
-                and use.get_name() in [dep_to_sync, syncing_dep]
-                and provide.get_name() in [dep_to_sync, syncing_dep]):
-                return str(action == CONN)
-        return str(action == DECONN)
+    def flask_is_conn_synced(syncing_component: str, component_to_sync: str, dep_to_sync: str, syncing_dep: str, action: str):
+        return answer(is_conn_synced(assembly, syncing_component, component_to_sync, dep_to_sync, syncing_dep, action))
 
     @app.route("/get_remote_component_state/<component_name>")
     @catch_exceptions
-    def get_remote_component_state(component_name: str):
-        calling_assembly_name = request.args.get("calling_assembly_name")
-        if assembly.is_component_idle(component_name):
-            assembly.remote_confirmations.add(calling_assembly_name)
-            component_state = INACTIVE
-        else:
-            component_state = ACTIVE
-        # log_once.debug(f"Remote asembly {calling_assembly_name} checks for my local state of {component_name}: {component_state}")
+    def flask_get_remote_component_state(component_name: str):
+        return answer(get_remote_component_state(assembly, component_name, request.args.get("calling_assembly_name")))
 
-        return component_state
+    @app.route("/batch", methods=["POST"])
+    @catch_exceptions
+    def batch():
+        results = run_batch(assembly, request.get_json()["queries"])
+        content_type, body = render_batch_results(results, accepts_binary(request.headers.get("Accept")))
+        return Response(body, content_type=content_type)
 
     # Remove logging of each HTTP transactions
     werkzeug_log = logging.getLogger('werkzeug')
     werkzeug_log.setLevel(logging.ERROR)
 
-    with open(global_variables.get_inventory_absolute_path()) as f:
-        loaded_inventory = yaml.safe_load(f)
-    _, port = loaded_inventory[assembly.get_name()].split(":")
-
-    app.run(host='0.0.0.0', port=port)
+    app.run(host='0.0.0.0', port=get_api_port(assembly))
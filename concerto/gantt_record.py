@@ -1,3 +1,4 @@
+from concerto import clock
 from concerto.gnuplot.gnuplot_gantt import gnuplot_file_from_list
 
 
@@ -22,7 +23,8 @@ class GanttRecord:
         import csv
         file = open(file_name, "w")
         
-        fieldnames = ['action', 'component', 'behavior', 'transition', 'time']
+        # wall_time: time on the timeline of time_logger (the times are perf_counter values)
+        fieldnames = ['action', 'component', 'behavior', 'transition', 'time', 'wall_time']
         writer = csv.DictWriter(file, fieldnames=fieldnames)
         writer.writeheader()
         
@@ -32,7 +34,8 @@ class GanttRecord:
                 'component': component,
                 'behavior': behavior,
                 'transition': transition,
-                'time': time
+                'time': time,
+                'wall_time': clock.perf_counter_to_wall_time(time)
             }
             writer.writerow(row_dict)
         
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: group
+   :synopsis: this file contains the Group class.
+"""
+
+from typing import Set, List, Optional
+
+from concerto.place import Dock
+
+
+class Group(object):
+    """
+    This class is used to create a group object within a Component.
+    A group is a set of places and transitions to which a service provide
+    dependency is bound. This object facilitate the semantics and its
+    efficiency.
+    """
+
+    __slots__ = ("component_name", "name", "elements", "nb_tokens")
+
+    class Operation:
+        __slots__ = ("delta",)
+
+        def __init__(self, delta: int):
+            self.delta = delta
+
+        def is_nothing(self) -> bool:
+            return self.delta == 0
+
+    def __init__(self, component_name: str, name: str, elements: Optional[Set[str]] = None):
+        self.component_name: str = component_name
+        self.name: str = name
+        # The elements of the group are part of the component template, they are shared by the groups of all the
+        # instances of a component type
+        self.elements: Set[str] = elements if elements is not None else set()
+        self.nb_tokens: int = 0
+
+    @property
+    def obj_id(self):
+        return f"{self.component_name}_{self.name}"
+
+    def to_json(self):
+        return {
+            "obj_id": self.obj_id,
+            "nb_tokens": self.nb_tokens
+        }
+
+    def get_name(self) -> str:
+        return self.name
+
+    def add_places(self, places_names):
+        self.elements.update(places_names)
+
+    def add_transitions(self, transitions_names):
+        self.elements.update(transitions_names)
+
+    def add_state(self, state_name: str):
+        self.elements.add(state_name)
+
+    def add_transition(self, transition_name: str):
+        self.elements.add(transition_name)
+
+    def contains_place(self, place_name: str) -> bool:
+        return place_name in self.elements
+
+    def contains_transition(self, transition_name: str) -> bool:
+        return transition_name in self.elements
+
+    def contains_dock(self, dock: Dock) -> bool:
+        return self.contains_transition(dock.get_transition().get_name())
+
+    def enter_place_operation(self, input_docks: List[Dock]) -> Operation:
+        delta: int = 0
+        place_name: str = input_docks[0].get_place().get_name()
+        if self.contains_place(place_name):
+            delta += 1
+        for dock in input_docks:
+            if self.contains_dock(dock):
+                delta -= 1
+        return self.Operation(delta)
+
+    def leave_place_operation(self, output_docks: List[Dock]) -> Operation:
+        delta: int = 0
+        place_name: str = output_docks[0].get_place().get_name()
+        if self.contains_place(place_name):
+            delta -= 1
+        for dock in output_docks:
+            if self.contains_dock(dock):
+                delta += 1
+        return self.Operation(delta)
+
+    def is_activating(self, operation: Operation) -> bool:
+        """
+        Un groupe s'active s'il n'est pas activé et si pour une liste de docks donnée, aucun de ces docks
+        n'appartient à une transition qui est dans le groupe (sinon le groupe serait déjà activé)
+        CF fonction enter_place_operation
+        """
+        return (not self.is_active()) and (operation.delta > 0)
+
+    def is_deactivating(self, operation: Operation) -> bool:
+        return self.is_active() and (self.nb_tokens + operation.delta == 0)
+
+    def is_active(self):
+        return self.nb_tokens > 0
+
+    def apply(self, operation: Operation):
+        if self.nb_tokens + operation.delta < 0:
+            raise Exception(
+                "Logic error: trying to remove %d tokens to group '%s' while its number of tokens is only %d." % (
+                    operation.delta, self.name, self.nb_tokens))
+        self.nb_tokens += operation.delta
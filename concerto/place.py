@@ -15,6 +15,8 @@ class Dock(object):
         A dock is an input or an output of a place.
     """
 
+    __slots__ = ("place", "dock_type", "transition")
+
     def __init__(self, place, dock_type, transition: Transition):
         self.place = place
         self.dock_type = dock_type
@@ -60,20 +62,22 @@ class Place(object):
     """This Place class is used to create a place of a component.
 
         A place represents an evolution state in the deployment of a component.
+        Places are part of the component template: they are shared by all the
+        instances of a component type and do not hold any runtime state.
     """
 
-    def __init__(self, component, name, override_get_output_docks=None, cp=None):  # TODO remove cp
-        self.component = component
+    __slots__ = ("place_name", "is_switch", "input_docks", "output_docks", "provides")
+
+    def __init__(self, name, is_switch=False):
         self.place_name = name
-        self.override_get_output_docks = override_get_output_docks
+        self.is_switch = is_switch
         self.input_docks = {}  # dictionary behavior -> docks[]
         self.output_docks = {}  # dictionary behavior -> docks[]
         self.provides = []
-        self.cp = cp  # TODO remove cp
 
     @property
     def obj_id(self):
-        return f"{self.component.get_name()}_{self.place_name}"
+        return self.place_name
 
     def to_json(self):
         return {
@@ -81,7 +85,6 @@ class Place(object):
             "input_docks": self.input_docks,
             "output_docks": self.output_docks,
             "provides": self.provides,
-            "cp": self.cp,
         }
 
     def create_input_dock(self, transition: Transition):
@@ -139,17 +142,19 @@ class Place(object):
         else:
             return list(self.input_docks[behavior].values())
 
-    def get_output_docks(self, behavior):
+    def get_output_docks(self, behavior, component=None):
         """
         This method returns the list of output docks of the place
 
+        :param component: the component instance, needed to choose the output docks of a switch
         :return: self.output_docks[behavior] if not empty, [] otherwise
         """
         if behavior not in self.output_docks:
             return []
         else:
-            if self.override_get_output_docks is not None:
-                return [self.output_docks[behavior][i] for i in self.override_get_output_docks(self.cp, behavior)]
+            if self.is_switch:
+                override_get_output_docks = component.get_switch_function(self.place_name)
+                return [self.output_docks[behavior][i] for i in override_get_output_docks(component, behavior)]
             else:
                 return self.output_docks[behavior]
 
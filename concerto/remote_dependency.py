@@ -14,6 +14,8 @@ class RemoteDependency(Dependency):
     assembly an the one that host the real dependency.
     """
 
+    __slots__ = ("remote_component_name",)
+
     def __init__(self, remote_component_name: str, name: str, dep_type: DepType):
         Dependency.__init__(self, None, name, dep_type)
         self.remote_component_name = remote_component_name
@@ -24,7 +26,7 @@ class RemoteDependency(Dependency):
         """
         return communication_handler.get_nb_dependency_users(self.remote_component_name, self.dependency_name)
 
-    def is_refusing(self):
+    def get_remote_refusing_state(self):
         return communication_handler.get_refusing_state(self.get_component_name(), self.get_name())
 
     def get_data(self):
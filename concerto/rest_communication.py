@@ -1,13 +1,17 @@
 import json
 import os
+import threading
 import time
 from os.path import exists
+from typing import Callable, Dict, Optional, Set, Tuple
 
 import yaml
 import requests
+from requests.adapters import HTTPAdapter
 
+from concerto.communication_cache import CommunicationCache, SERVE_STALE
 from concerto.debug_logger import log, log_once
-from concerto import global_variables
+from concerto import clock, global_variables, wire_format
 
 config = {}
 
@@ -21,7 +25,43 @@ INACTIVE = "INACTIVE"
 inventory: each component should be associated with an ip/port
 """
 inventory = {}
-communications_cache = {}
+communications_cache = CommunicationCache()
+
+GET_REMOTE_COMPONENT_STATE = "get_remote_component_state"
+
+"""
+Batching of the lookups: the lookups made to a peer during a semantics iteration are sent again in one
+request to its /batch endpoint at the beginning of the next iteration (see send_batched_lookups). The
+lookups that are answered by the batch do not need a request of their own.
+get_remote_component_state is not batched: it registers the confirmation of the calling assembly.
+"""
+BATCH_ENDPOINT_NAME = "batch"
+# host -> lookups (endpoint name, path arguments) made during the current iteration
+_next_batch: Dict[str, Set[Tuple[str, Tuple[str, ...]]]] = {}
+# host -> results of the lookups of the last batch sent to the host
+_batch_results: Dict[str, Dict[Tuple[str, Tuple[str, ...]], str]] = {}
+_unreachable_hosts: Set[str] = set()
+_batch_lock = threading.Lock()
+
+"""
+One pooled keep-alive session per peer, with short timeouts: a peer that is asleep is detected by the failure
+of the request itself (connection refused or timeout), there is no pre-flight request.
+"""
+CONNECT_TIMEOUT = 0.5
+READ_TIMEOUT = 2.
+POOL_MAXSIZE = 10
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+requests_stats = {"nb_requests": 0, "nb_batch_requests": 0, "nb_batched_lookups": 0}
+
+# Called with (function name, duration) after each batch request (see communication_handler.set_remote_call_listener)
+_batch_request_listener: Optional[Callable[[str, float], None]] = None
+
+
+def set_batch_request_listener(listener: Optional[Callable[[str, float], None]]):
+    global _batch_request_listener
+    _batch_request_listener = listener
 
 
 def parse_inventory_file():
@@ -33,6 +73,20 @@ def parse_inventory_file():
             inventory[ass_comp_name] = host
 
 
+def set_communication_cache_policy(ttl: Optional[float] = None, stale_policy: str = SERVE_STALE,
+                                   max_age_without_request: Optional[float] = None):
+    """
+    See CommunicationCache. With <max_age_without_request>, the lookups answered by a peer less than
+    <max_age_without_request> seconds ago are not sent again (get_remote_component_state is always sent, it
+    registers the confirmation of the calling assembly)
+    """
+    communications_cache.set_policy(ttl, stale_policy, max_age_without_request)
+
+
+def get_communication_cache_stats():
+    return communications_cache.get_stats()
+
+
 def _communication_cache_file_path():
     return f"{global_variables.execution_expe_dir}/communication_cache"
 
@@ -40,9 +94,10 @@ def _communication_cache_file_path():
 def save_communication_cache(assembly_name):
     communication_cache_file = _communication_cache_file_path()
     log.debug(f"Saving communication cache here {communication_cache_file}")
+    log.debug(f"Communication cache stats: {communications_cache.get_stats()}")
     os.makedirs(communication_cache_file, exist_ok=True)
     with open(f"{communication_cache_file}/{assembly_name}.json", "w") as f:
-        json.dump(communications_cache, f)
+        json.dump({"entries": communications_cache.to_json()}, f)
 
 
 def load_communication_cache(assembly_name):
@@ -55,8 +110,10 @@ def load_communication_cache(assembly_name):
     log.debug("Cache EXISTS")
     with open(file_name, "r") as f:
         loaded_json = json.load(f)
-        for key_cache, value in loaded_json.items():
-            communications_cache[key_cache] = value
+        if "entries" in loaded_json:
+            communications_cache.load_json(loaded_json["entries"])
+        else:
+            log.debug("Cache saved with the previous format (string keys), ignored")
 
     os.remove(file_name)
 
@@ -72,81 +129,183 @@ def clear_communication_cache(assembly_name):
 
 
 def clear_global_synchronization_cache():
-    for comp_name in inventory.keys():
-        if comp_name in communications_cache.keys():
-            del communications_cache[comp_name]
+    communications_cache.remove_if(lambda key: key[0] == GET_REMOTE_COMPONENT_STATE)
 
 
-def _is_url_accessible(url):
-    try:
-        requests.head(url)
-        return True
-    except requests.exceptions.ConnectionError:
-        return False
+def _get_session(target_host: str) -> requests.Session:
+    with _sessions_lock:
+        if target_host not in _sessions:
+            session = requests.Session()
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE))
+            _sessions[target_host] = session
+        return _sessions[target_host]
+
+
+def _get_request_headers() -> Dict[str, str]:
+    """
+    The binary wire format is asked to the peers if it is enabled, a peer that does not support it answers in text
+    """
+    if wire_format.is_binary_enabled():
+        return {"Accept": f"{wire_format.BINARY_CONTENT_TYPE}, text/plain;q=0.5, application/json;q=0.5"}
+    return {}
+
+
+def _is_binary_response(response: requests.Response) -> bool:
+    return response.headers.get("Content-Type", "").startswith(wire_format.BINARY_CONTENT_TYPE)
 
 
-def get_results_from_request(key_cache, url, default_value, params=None):
+def _record_peer_clock(target_host: str, response: requests.Response, request_sent_at: float, response_received_at: float):
+    peer_time_ns = response.headers.get(clock.CLOCK_HEADER)
+    if peer_time_ns is not None:
+        clock.record_round_trip(target_host, request_sent_at, int(peer_time_ns) / 1e9, response_received_at)
+
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def get_results_from_request(key_cache, target_host, url, default_value, params=None):
     try:
-        if _is_url_accessible(url):
-            result = requests.get(url, params=params).text
-            if result != "":  # TODO: Bug, sometimes API return blank response
-                communications_cache[key_cache] = result
-                # log_once.debug(f"{url}?{params} accessible, result: {result}")
-            else:             # TODO: act as if the remote node is unreachable
-                result = default_value
-        else:
-            result = communications_cache[key_cache] if key_cache in communications_cache.keys() else default_value
-            # log_once.debug(f"{url}?{params} is not accessible, using cache result: {result} instead")
-    except requests.exceptions.ConnectionError as e:
+        requests_stats["nb_requests"] += 1
+        request_sent_at = clock.wall_time()
+        response = _get_session(target_host).get(url, params=params, headers=_get_request_headers(),
+                                                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        _record_peer_clock(target_host, response, request_sent_at, clock.wall_time())
+        result = wire_format.decode_value(response.content) if _is_binary_response(response) else response.text
+        if result is not None and result != "":  # TODO: Bug, sometimes API return blank response
+            communications_cache.put(key_cache, result)
+            # log_once.debug(f"{url}?{params} accessible, result: {result}")
+        else:             # TODO: act as if the remote node is unreachable
+            result = default_value
+    except (requests.exceptions.RequestException, ValueError) as e:
+        # Connection refused (the node is asleep), timeout or undecodable answer
         # log_once.debug(e)
-        result = communications_cache[key_cache] if key_cache in communications_cache.keys() else default_value
+        result = communications_cache.get_fallback(key_cache, default_value)
         # log_once.debug(f"{url}?{params} raised an exception, using cache result: {result} instead")
-    # time.sleep(0.2)
     return result
 
 
+def send_batched_lookups():
+    """
+    Sends the lookups made since the previous batch, one request per peer. Called at the beginning of each
+    semantics iteration, nothing is sent if no remote state was read.
+    """
+    global _next_batch
+    with _batch_lock:
+        batches = _next_batch
+        _next_batch = {}
+        # The results of the other peers are kept until their lookups are sent again: the remote components are
+        # only evaluated at the sweeps of the scheduler, not at the iterations between two sweeps
+        for target_host in batches:
+            _batch_results.pop(target_host, None)
+            _unreachable_hosts.discard(target_host)
+
+    for target_host, lookups in batches.items():
+        lookups = list(lookups)
+        url = f"http://{target_host}/{BATCH_ENDPOINT_NAME}"
+        try:
+            requests_stats["nb_requests"] += 1
+            requests_stats["nb_batch_requests"] += 1
+            request_sent_at = clock.wall_time()
+            start = time.perf_counter()
+            try:
+                response = _get_session(target_host).post(
+                    url,
+                    json={"queries": [[endpoint_name, list(args)] for endpoint_name, args in lookups]},
+                    headers=_get_request_headers(),
+                    timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+                )
+            finally:
+                if _batch_request_listener is not None:
+                    _batch_request_listener("send_batched_lookups", time.perf_counter() - start)
+            _record_peer_clock(target_host, response, request_sent_at, clock.wall_time())
+            if _is_binary_response(response):
+                results = wire_format.decode_values(response.content)
+            else:
+                results = response.json()["results"]
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            # The peer is not reachable: answer its lookups from the cache until the next iteration
+            with _batch_lock:
+                _unreachable_hosts.add(target_host)
+            continue
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError):
+            # The peer did not answer the batch (e.g. no /batch endpoint), fallback to one request per lookup
+            continue
+        requests_stats["nb_batched_lookups"] += len(lookups)
+        with _batch_lock:
+            _batch_results[target_host] = dict(zip(lookups, results))
+
+
+def _get_result(endpoint_name: str, target_host: str, path_args: Tuple[str, ...], default_value):
+    """
+    Result of the lookup <endpoint_name>/<path_args> on <target_host>: taken from the cache if it is fresh
+    enough (see set_communication_cache_policy), else from the last batch sent to <target_host> if it contains
+    it, else requested on its own. The lookup is recorded to be part of the next batch.
+    """
+    key_cache = (endpoint_name, *path_args)
+    fresh_result = communications_cache.get_fresh(key_cache)
+    if fresh_result is not CommunicationCache.MISSING:
+        return fresh_result
+
+    lookup = (endpoint_name, path_args)
+    with _batch_lock:
+        _next_batch.setdefault(target_host, set()).add(lookup)
+        host_results = _batch_results.get(target_host)
+        is_batched = host_results is not None and lookup in host_results
+        result = host_results[lookup] if is_batched else None
+        is_unreachable = target_host in _unreachable_hosts
+
+    if is_batched:
+        if result is None or result == "":
+            return default_value
+        communications_cache.put(key_cache, result)
+        return result
+    if is_unreachable:
+        return communications_cache.get_fallback(key_cache, default_value)
+
+    url = f"http://{target_host}/{endpoint_name}/{'/'.join(path_args)}"
+    return get_results_from_request(key_cache, target_host, url, default_value)
+
+
 # TODO: refacto les routes
 def get_nb_dependency_users(component_name: str, dependency_name: str) -> int:
     endpoint_name = "get_nb_dependency_users"
     target_host = inventory[component_name]
-    url = f"http://{target_host}/{endpoint_name}/{component_name}/{dependency_name}"
-    key_cache = endpoint_name + component_name + dependency_name
-    result = int(get_results_from_request(key_cache, url, -1))
+    result = int(_get_result(endpoint_name, target_host, (component_name, dependency_name), -1))
     return result
 
 
 def get_refusing_state(component_name: str, dependency_name: str) -> int:
     endpoint_name = "get_refusing_state"
     target_host = inventory[component_name]
-    url = f"http://{target_host}/{endpoint_name}/{component_name}/{dependency_name}"
-    key_cache = endpoint_name + component_name + dependency_name
-    result = get_results_from_request(key_cache, url, "False") == "True"
+    # The results are str in the text format and typed values in the binary format
+    result = str(_get_result(endpoint_name, target_host, (component_name, dependency_name), "False")) == "True"
     return result
 
 
 def get_data_dependency(component_name: str, dependency_name: str):
     endpoint_name = "get_data_dependency"
     target_host = inventory[component_name]
-    url = f"http://{target_host}/{endpoint_name}/{component_name}/{dependency_name}"
-    key_cache = endpoint_name + component_name + dependency_name
-    result = get_results_from_request(key_cache, url, "")
+    result = _get_result(endpoint_name, target_host, (component_name, dependency_name), "")
     return result
 
 
 def is_conn_synced(syncing_component: str, component_to_sync: str,  dep_provide: str, dep_use: str, action: str):
     endpoint_name = "is_conn_synced"
     target_host = inventory[component_to_sync]
-    url = f"http://{target_host}/{endpoint_name}/{syncing_component}/{component_to_sync}/{dep_provide}/{dep_use}/{action}"
-    key_cache = endpoint_name + syncing_component + component_to_sync + dep_provide + dep_use + action
-    result = get_results_from_request(key_cache, url, "False") == "True"
+    path_args = (syncing_component, component_to_sync, dep_provide, dep_use, action)
+    result = str(_get_result(endpoint_name, target_host, path_args, "False")) == "True"
     return result
 
 
 def get_remote_component_state(component_name: str, calling_assembly_name: str) -> [ACTIVE, INACTIVE]:
-    endpoint_name = "get_remote_component_state"
+    endpoint_name = GET_REMOTE_COMPONENT_STATE
     target_host = inventory[component_name]
     url = f"http://{target_host}/{endpoint_name}/{component_name}"
-    key_cache = component_name
+    key_cache = (endpoint_name, component_name)
     params = {"calling_assembly_name": calling_assembly_name}
-    result = get_results_from_request(key_cache, url, ACTIVE, params=params)
+    result = get_results_from_request(key_cache, target_host, url, ACTIVE, params=params)
     return result
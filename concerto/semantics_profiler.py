@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: semantics_profiler
+   :synopsis: this file contains the SemanticsProfiler class, the opt-in profiling of the semantics iterations.
+"""
+
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+
+from concerto import clock, global_variables, rest_communication
+
+# Phases of Component.semantics
+IDOCKS_TO_PLACE = "idocks_to_place"
+PLACE_TO_ODOCKS = "place_to_odocks"
+START_TRANSITION = "start_transition"
+END_TRANSITION = "end_transition"
+PHASES = (IDOCKS_TO_PLACE, PLACE_TO_ODOCKS, START_TRANSITION, END_TRANSITION)
+
+# Upper bounds (in seconds) of the buckets of the histograms, the last bucket has no bound
+HISTOGRAM_BOUNDS = tuple(float(f"{mantissa}e{exponent}") for exponent in range(-6, 1) for mantissa in (1, 2, 5))
+
+
+class Histogram:
+    """
+    Durations (in seconds) counted in fixed buckets: constant memory whatever the number of iterations
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.count: int = 0
+        self.total: float = 0.
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float):
+        self.counts[bisect_left(HISTOGRAM_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def get_quantile(self, quantile: float) -> Optional[float]:
+        """
+        :return: upper bound of the bucket containing the quantile (max for the last bucket)
+        """
+        if self.count == 0:
+            return None
+        rank = quantile * self.count
+        cumulated = 0
+        for index, count in enumerate(self.counts):
+            cumulated += count
+            if cumulated >= rank and count > 0:
+                return min(HISTOGRAM_BOUNDS[index], self.max) if index < len(HISTOGRAM_BOUNDS) else self.max
+        return self.max
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count > 0 else None,
+            "min": self.min,
+            "p50": self.get_quantile(0.5),
+            "p99": self.get_quantile(0.99),
+            "max": self.max,
+            # upper bound => count, of the buckets not empty
+            "buckets": {bound: count for bound, count in zip(HISTOGRAM_BOUNDS + (float("inf"),), self.counts) if count > 0},
+        }
+
+
+class IterationProfile:
+    """
+    Measures of one semantics iteration, given to the callbacks of the profiler
+    """
+
+    __slots__ = ("index", "duration", "phases", "nb_evaluated_components", "nb_remote_calls", "remote_calls_time",
+                 "is_idle")
+
+    def __init__(self, index: int):
+        self.index: int = index
+        self.duration: float = 0.
+        # phase => time spent in the phase by all the components evaluated
+        self.phases: Dict[str, float] = dict.fromkeys(PHASES, 0.)
+        self.nb_evaluated_components: int = 0
+        self.nb_remote_calls: int = 0
+        self.remote_calls_time: float = 0.
+        # No token moved and no component did something
+        self.is_idle: bool = True
+
+
+class SemanticsProfiler:
+    """
+    Counters and histograms of the semantics loop of an assembly (see Assembly.set_semantics_profiler):
+    - duration of the iterations (evaluation of the components, without the wait for the next iteration)
+    - time of each phase of Component.semantics
+    - number and latency of the calls of communication_handler reading the remote states (REST requests in
+    synchronous mode, reads of the states received by Zenoh in asynchronous mode)
+    - ratio of the idle iterations
+    The callbacks (see add_callback) are called with the IterationProfile at the end of each iteration, on the
+    semantics thread. The profile is dumped when the assembly goes to sleep.
+    """
+
+    def __init__(self):
+        self.iterations_durations: Histogram = Histogram()
+        self.phases_durations: Dict[str, Histogram] = {phase: Histogram() for phase in PHASES}
+        self.waits_durations: Histogram = Histogram()
+        # function of communication_handler => latencies
+        self.remote_calls_durations: Dict[str, Histogram] = {}
+        self.nb_iterations: int = 0
+        self.nb_idle_iterations: int = 0
+        self._callbacks: List[Callable[[IterationProfile], None]] = []
+        self._current: Optional[IterationProfile] = None
+        self._iteration_start: float = 0.
+        self._round_start_ns: int = clock.wall_time_ns()
+
+    def add_callback(self, callback: Callable[[IterationProfile], None]):
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[IterationProfile], None]):
+        self._callbacks.remove(callback)
+
+    def start_iteration(self):
+        self._current = IterationProfile(self.nb_iterations)
+        self._iteration_start = time.perf_counter()
+
+    def record_phase(self, phase: str, duration: float):
+        self.phases_durations[phase].add(duration)
+        if self._current is not None:
+            self._current.phases[phase] += duration
+
+    def record_evaluation(self, did_something: bool, token_moved: bool):
+        if self._current is not None:
+            self._current.nb_evaluated_components += 1
+            self._current.is_idle = self._current.is_idle and not did_something and not token_moved
+
+    def record_remote_call(self, function_name: str, duration: float):
+        """
+        Listener of communication_handler (see communication_handler.set_remote_call_listener)
+        """
+        histogram = self.remote_calls_durations.get(function_name)
+        if histogram is None:
+            histogram = Histogram()
+            self.remote_calls_durations[function_name] = histogram
+        histogram.add(duration)
+        if self._current is not None:
+            self._current.nb_remote_calls += 1
+            self._current.remote_calls_time += duration
+
+    def end_iteration(self):
+        iteration = self._current
+        if iteration is None:
+            return
+        self._current = None
+        iteration.duration = time.perf_counter() - self._iteration_start
+        self.iterations_durations.add(iteration.duration)
+        self.nb_iterations += 1
+        if iteration.is_idle:
+            self.nb_idle_iterations += 1
+        for callback in self._callbacks:
+            callback(iteration)
+
+    def record_wait(self, duration: float):
+        self.waits_durations.add(duration)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "nb_iterations": self.nb_iterations,
+            "nb_idle_iterations": self.nb_idle_iterations,
+            "idle_ratio": self.nb_idle_iterations / self.nb_iterations if self.nb_iterations > 0 else None,
+            "iterations": self.iterations_durations.to_json(),
+            "waits": self.waits_durations.to_json(),
+            "phases": {phase: histogram.to_json() for phase, histogram in self.phases_durations.items()},
+            "remote_calls": {function_name: histogram.to_json()
+                             for function_name, histogram in sorted(self.remote_calls_durations.items())},
+            "nb_remote_calls": sum(histogram.count for histogram in self.remote_calls_durations.values()),
+            "rest_requests": dict(rest_communication.requests_stats),
+        }
+
+    def dump(self, assembly_name: str) -> str:
+        """
+        Writes the stats of the sleep round to
+        <execution_expe_dir>/<reconfiguration_name>/semantics_profiles/<assembly_name>_<start of the round>.yaml
+        :return: the path of the file
+        """
+        file_path = f"{global_variables.execution_expe_dir}/{global_variables.reconfiguration_name}/semantics_profiles/{assembly_name}_{self._round_start_ns}.yaml"
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            yaml.safe_dump(self.get_stats(), f)
+        return file_path
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: semantics_scheduler
+   :synopsis: this file contains the SemanticsScheduler class.
+"""
+
+import threading
+import time
+from typing import Set, List, Optional, Dict
+
+# In synchronous execution, how much interval (in seconds) to poll results
+FREQUENCE_POLLING = 0.05
+
+
+class SemanticsScheduler:
+    """
+    Decides when the assembly runs its next semantics iteration.
+
+    - Polling mode (historical behavior): sleep FREQUENCE_POLLING seconds after each iteration.
+    - Event driven mode: if the previous iteration moved a token, the next one is run right away. Else the
+    loop blocks until an event is notified (end of a transition thread, remote state update, new instruction).
+    The wait is bounded by FREQUENCE_POLLING only when remote states have to be polled (see
+    Assembly._wait_next_iteration), else the loop does not wake up while nothing happens.
+
+    It also keeps the ready-set of the components that need to be evaluated (dirty-set scheduling): a component
+    is re-evaluated only if one of its inputs changed (dependency changed, transition ended, behavior queued) or
+    if it moved a token during its last evaluation. Components connected to remote assemblies are also
+    re-evaluated every FREQUENCE_POLLING seconds, as the changes of their remote dependencies are not notified.
+    """
+
+    def __init__(self, event_driven: bool = True, polling_interval: float = FREQUENCE_POLLING):
+        self.event_driven: bool = event_driven
+        self.polling_interval: float = polling_interval
+        self.dirty_set_enabled: bool = True
+        self._condition = threading.Condition()
+        self._pending_event: bool = False
+        self._ready_components: Set[str] = set()
+        self._last_remote_sweep: Optional[float] = None
+
+        self.nb_iterations: int = 0
+        self.nb_evaluations: int = 0
+        self.nb_skipped_evaluations: int = 0
+        self.last_nb_skipped_evaluations: int = 0
+
+    def set_event_driven(self, value: bool):
+        self.event_driven = value
+
+    def set_dirty_set_enabled(self, value: bool):
+        self.dirty_set_enabled = value
+
+    def notify(self):
+        """
+        Wake up the semantics loop. Thread safe, can be called from transitions threads or the API thread.
+        """
+        with self._condition:
+            self._pending_event = True
+            self._condition.notify_all()
+
+    def mark_ready(self, component_name: str):
+        """
+        Ask for the evaluation of the component at the next iteration and wake up the semantics loop.
+        Thread safe.
+        """
+        with self._condition:
+            self._ready_components.add(component_name)
+            self._pending_event = True
+            self._condition.notify_all()
+
+    def mark_all_ready(self):
+        """
+        Next iteration evaluates every active component (used when the assembly state is restored)
+        """
+        with self._condition:
+            self._last_remote_sweep = None
+
+    def select_components_to_evaluate(self, active_components: Set[str], remotely_connected_components: Set[str]) -> List[str]:
+        """
+        Pop the ready-set and returns the active components to evaluate during this iteration.
+        """
+        with self._condition:
+            ready_components = self._ready_components
+            self._ready_components = set()
+
+        now = time.time()
+        if not self.dirty_set_enabled or self._last_remote_sweep is None:
+            to_evaluate = set(active_components)
+            self._last_remote_sweep = now
+        else:
+            to_evaluate = ready_components.intersection(active_components)
+            if now - self._last_remote_sweep >= self.polling_interval:
+                to_evaluate.update(remotely_connected_components.intersection(active_components))
+                self._last_remote_sweep = now
+
+        self.nb_iterations += 1
+        self.nb_evaluations += len(to_evaluate)
+        self.last_nb_skipped_evaluations = len(active_components) - len(to_evaluate)
+        self.nb_skipped_evaluations += self.last_nb_skipped_evaluations
+        return list(to_evaluate)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "nb_iterations": self.nb_iterations,
+            "nb_evaluations": self.nb_evaluations,
+            "nb_skipped_evaluations": self.nb_skipped_evaluations,
+            "last_nb_skipped_evaluations": self.last_nb_skipped_evaluations,
+        }
+
+    def wait_next_iteration(self, made_progress: bool, needs_polling: bool = True, deadline: Optional[float] = None):
+        """
+        :param needs_polling: if False, no remote state has to be polled: the wait is not bounded by
+        polling_interval but only by <deadline> (time.time() value, None for no bound)
+        """
+        if not self.event_driven:
+            time.sleep(self.polling_interval)
+            return
+
+        with self._condition:
+            if not made_progress and not self._pending_event:
+                if needs_polling:
+                    timeout = self.polling_interval
+                elif deadline is not None:
+                    timeout = max(0., deadline - time.time())
+                else:
+                    timeout = None
+                self._condition.wait(timeout)
+            self._pending_event = False
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: snapshot_codec
+   :synopsis: this file contains the SnapshotCodec class, the encodings of the checkpoint of the saved state.
+"""
+
+import gzip
+import json
+import pickle
+from typing import Any, Dict, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+"""
+A codec is an encoding, optionally followed by a compression: "json", "pickle", "json+gzip", "pickle+zstd"...
+The codec of a checkpoint is detected from its first bytes when it is loaded: an assembly can load a checkpoint
+saved with another codec than its own.
+"""
+JSON = "json"        # indented, readable (debugging)
+PICKLE = "pickle"    # pickle protocol 5, the saved state only holds dicts, lists and scalars
+GZIP = "gzip"
+ZSTD = "zstd"        # requires the zstandard package
+ENCODINGS = (JSON, PICKLE)
+COMPRESSIONS = (GZIP, ZSTD)
+
+PICKLE_PROTOCOL = 5
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+PICKLE_MAGIC = b"\x80"
+
+
+class SnapshotCodec:
+
+    def __init__(self, name: str = JSON):
+        encoding, _, compression = name.partition("+")
+        if encoding not in ENCODINGS:
+            raise Exception("Unknown snapshot encoding '%s' (expected one of %s)" % (encoding, ", ".join(ENCODINGS)))
+        if compression != "" and compression not in COMPRESSIONS:
+            raise Exception("Unknown snapshot compression '%s' (expected one of %s)" % (compression, ", ".join(COMPRESSIONS)))
+        if compression == ZSTD and zstandard is None:
+            raise Exception("The snapshot compression '%s' requires the zstandard package" % ZSTD)
+        self.name: str = name
+        self.encoding: str = encoding
+        self.compression: str = compression
+
+    def get_name(self) -> str:
+        return self.name
+
+    def dumps(self, state: Dict[str, Any]) -> bytes:
+        if self.encoding == PICKLE:
+            data = pickle.dumps(state, protocol=PICKLE_PROTOCOL)
+        else:
+            data = json.dumps(state, indent=4).encode("utf-8")
+        if self.compression == GZIP:
+            # Level 1: the checkpoint is written in the uptime of the node, the speed matters more than the size
+            return gzip.compress(data, compresslevel=1)
+        if self.compression == ZSTD:
+            return zstandard.ZstdCompressor().compress(data)
+        return data
+
+
+def loads(data: bytes) -> Tuple[Dict[str, Any], str]:
+    """
+    :return: (state, name of the codec detected)
+    """
+    compression = ""
+    if data.startswith(GZIP_MAGIC):
+        compression = GZIP
+        data = gzip.decompress(data)
+    elif data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise Exception("The saved state is compressed with %s, which requires the zstandard package" % ZSTD)
+        compression = ZSTD
+        data = zstandard.ZstdDecompressor().decompress(data)
+    if data.startswith(PICKLE_MAGIC):
+        encoding = PICKLE
+        state = pickle.loads(data)
+    else:
+        encoding = JSON
+        state = json.loads(data)
+    return state, encoding if compression == "" else f"{encoding}+{compression}"
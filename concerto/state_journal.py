@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: state_journal
+   :synopsis: this file contains the functions of the append-only journal of the saved states of an assembly.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+"""
+The saved state of an assembly is a checkpoint (the whole state) followed by a journal: one JSON line per
+sleep, containing only the changes since the previous one. A change is:
+- ["set", [key, ...], value]: the value at the path of keys is replaced (or added)
+- ["del", [key, ...]]: the key at the end of the path is removed
+The nested dicts are compared key by key, the other values (lists, scalars) are replaced as a whole.
+"""
+SET = "set"
+DEL = "del"
+
+# A checkpoint is written instead of a journal entry after this number of entries
+JOURNAL_COMPACTION_THRESHOLD = 20
+
+
+def diff_states(previous_state: Dict[str, Any], state: Dict[str, Any]) -> List[List]:
+    """
+    :return: the changes turning <previous_state> into <state>
+    """
+    changes = []
+    _diff(previous_state, state, [], changes)
+    return changes
+
+
+def _diff(previous: Dict[str, Any], current: Dict[str, Any], path: List[str], changes: List[List]):
+    for key, value in current.items():
+        if key not in previous:
+            changes.append([SET, path + [key], value])
+            continue
+        previous_value = previous[key]
+        if isinstance(value, dict) and isinstance(previous_value, dict):
+            _diff(previous_value, value, path + [key], changes)
+        elif value != previous_value:
+            changes.append([SET, path + [key], value])
+    for key in previous.keys():
+        if key not in current:
+            changes.append([DEL, path + [key]])
+
+
+def apply_changes(state: Dict[str, Any], changes: List[List]):
+    """
+    Applies <changes> to <state> in place
+    """
+    for change in changes:
+        operation, path = change[0], change[1]
+        parent = state
+        for key in path[:-1]:
+            parent = parent[key]
+        if operation == SET:
+            parent[path[-1]] = change[2]
+        elif operation == DEL:
+            del parent[path[-1]]
+        else:
+            raise Exception("Unknown operation '%s' in the state journal" % operation)
+
+
+def append_changes(journal_file_path: str, changes: List[List]) -> int:
+    """
+    Appends one line to the journal
+    :return: the number of bytes written
+    """
+    line = json.dumps(changes, separators=(",", ":")) + "\n"
+    with open(journal_file_path, "a") as journal_file:
+        journal_file.write(line)
+        journal_file.flush()
+        os.fsync(journal_file.fileno())
+    return len(line)
+
+
+def replay_journal(journal_file_path: str, state: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    Applies the changes of the journal to <state> (the checkpoint) in place. A last line that was not
+    completely written (the node stopped while appending it) is ignored and removed from the journal.
+    :return: (number of entries, size of the journal in bytes)
+    """
+    if not os.path.exists(journal_file_path):
+        return 0, 0
+    nb_entries = 0
+    journal_size = 0
+    with open(journal_file_path, "rb") as journal_file:
+        for line in journal_file:
+            if not line.endswith(b"\n"):
+                break
+            apply_changes(state, json.loads(line))
+            nb_entries += 1
+            journal_size += len(line)
+    if journal_size != os.path.getsize(journal_file_path):
+        os.truncate(journal_file_path, journal_size)
+    return nb_entries, journal_size
+
+
+class JournaledState:
+    """
+    State of the assembly as it is saved on disk (the checkpoint with the journal replayed): the next save
+    only appends the changes since this state.
+    """
+
+    def __init__(self, state: Dict[str, Any], nb_entries: int = 0, journal_size: int = 0, checkpoint_size: int = 0):
+        self.state: Dict[str, Any] = state
+        self.nb_entries: int = nb_entries
+        self.journal_size: int = journal_size
+        self.checkpoint_size: int = checkpoint_size
+
+    def needs_compaction(self) -> bool:
+        """
+        The journal is compacted in a new checkpoint when it has too many entries or is larger than the
+        checkpoint (it would cost more to replay than to load a checkpoint)
+        """
+        return self.nb_entries >= JOURNAL_COMPACTION_THRESHOLD or self.journal_size > self.checkpoint_size
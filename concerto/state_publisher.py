@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: state_publisher
+   :synopsis: this file contains the StatePublisher class, the background publisher of the local states.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from concerto.debug_logger import log
+
+# Time (in seconds) during which the updates are coalesced before being sent
+FLUSH_INTERVAL = 0.005
+
+
+class StatePublisher:
+    """
+    Sends the updates of the local states (nb users, refusing state, component state) from a background
+    thread, so that the semantics loop never blocks on the network.
+    The updates are coalesced per topic: if a topic is updated several times before the next flush, only its
+    latest value is sent. The updates of a flush are sent in the order of their last update.
+    """
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL):
+        self.flush_interval: float = flush_interval
+        self._pending: Dict[Hashable, Tuple[Callable, Tuple]] = {}
+        self._sending: bool = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+        self.nb_published: int = 0
+        self.nb_coalesced: int = 0
+        self.nb_flushes: int = 0
+
+    def publish(self, topic: Hashable, send_function: Callable, *args):
+        """
+        Queues the call send_function(*args), replacing the queued update of <topic> if any. Thread safe.
+        """
+        with self._condition:
+            if topic in self._pending:
+                self.nb_coalesced += 1
+                del self._pending[topic]
+            self._pending[topic] = (send_function, args)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="concerto_state_publisher", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+            # Let the updates of the current semantics iteration coalesce
+            time.sleep(self.flush_interval)
+            with self._condition:
+                updates = self._pending
+                self._pending = {}
+                self._sending = True
+            for send_function, args in updates.values():
+                try:
+                    send_function(*args)
+                except Exception as e:
+                    log.exception(e)
+            with self._condition:
+                self._sending = False
+                self.nb_published += len(updates)
+                self.nb_flushes += 1
+                self._condition.notify_all()
+
+    def flush(self):
+        """
+        Blocks until the updates queued before the call are sent (e.g. before going to sleep)
+        """
+        with self._condition:
+            while self._pending or self._sending:
+                self._condition.wait()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "nb_published": self.nb_published,
+            "nb_coalesced": self.nb_coalesced,
+            "nb_flushes": self.nb_flushes,
+        }
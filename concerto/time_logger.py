@@ -1,18 +1,50 @@
 import os
 import time
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Optional, Tuple
 
 import yaml
 
-from concerto import global_variables
+from concerto import clock, global_variables
 from concerto.debug_logger import log, log_once
+from concerto.timestamps_buffer import TimestampsBuffer
 
 LOG_DIR_TIMESTAMP = ""
 ASSEMBLY_NAME = ""
 
+# Backends of the timestamps of the assembly (the timestamps of the components of concerto-d-central always
+# use the dicts):
+# - dict: checked and stored in all_timestamps_dict, dumped in a YAML file per sleep round
+# - buffered: recorded in a TimestampsBuffer, appended to binary records per reconfiguration (see
+# timestamps_buffer for the format and the converter to the YAML files)
+DICT_BACKEND = "dict"
+BUFFERED_BACKEND = "buffered"
 
 all_timestamps_dict = {}
+timestamps_buffer: Optional[TimestampsBuffer] = None
+# Called with (timestamp type, period, args, kwargs values) for each timestamp of the assembly (see
+# exporters.trace_export)
+span_listener: Optional[Callable[[str, str, Tuple, Tuple], None]] = None
+
+
+def set_backend(backend: str):
+    global timestamps_buffer
+    if backend not in (DICT_BACKEND, BUFFERED_BACKEND):
+        raise Exception("Unknown time_logger backend '%s' (expected '%s' or '%s')" % (backend, DICT_BACKEND, BUFFERED_BACKEND))
+    if backend == BUFFERED_BACKEND:
+        if timestamps_buffer is None:
+            timestamps_buffer = TimestampsBuffer(build_timestamps_file_path)
+    else:
+        timestamps_buffer = None
+
+
+def set_span_listener(listener: Optional[Callable[[str, str, Tuple, Tuple], None]]):
+    global span_listener
+    span_listener = listener
+
+
+def build_timestamps_file_path() -> str:
+    return f"{global_variables.execution_expe_dir}/{global_variables.reconfiguration_name}/{ASSEMBLY_NAME}_timestamps.bin"
 
 
 def create_timestamp_metric(timestamp_type, is_instruction_method=False):
@@ -73,8 +105,13 @@ def init_time_log_dir(assembly_name: str):
     ASSEMBLY_NAME = assembly_name
 
 
-def log_time_value(timestamp_type: str, timestamp_period: str, *args, **kwargs):
-    register_time_value(timestamp_type, timestamp_period, *args, **kwargs)
+def log_time_value(timestamp_type: str, timestamp_period: str, *args, component_timestamps_dict=None, **kwargs):
+    if span_listener is not None and component_timestamps_dict is None:
+        span_listener(timestamp_type, timestamp_period, args, tuple(kwargs.values()))
+    if timestamps_buffer is not None and component_timestamps_dict is None:
+        timestamps_buffer.record(timestamp_type, timestamp_period, args, tuple(kwargs.values()))
+    else:
+        register_time_value(timestamp_type, timestamp_period, *args, component_timestamps_dict=component_timestamps_dict, **kwargs)
 
 
 def register_time_value(timestamp_type: str, timestamp_period: str, *args, component_timestamps_dict=None, **kwargs):
@@ -103,7 +140,7 @@ def register_time_value(timestamp_type: str, timestamp_period: str, *args, compo
                 log_once.debug(f"Register time value start not done: {timestamp_name} for {TimestampPeriod.START} already registered")
         else:
             timestamp_dict_to_save[timestamp_name] = {}
-            timestamp_dict_to_save[timestamp_name][TimestampPeriod.START] = time.time()
+            timestamp_dict_to_save[timestamp_name][TimestampPeriod.START] = clock.wall_time()
             log.debug(f"Saved timestamp: {timestamp_type} {args} {kwargs} {timestamp_period}")
 
     else:
@@ -119,16 +156,39 @@ def register_time_value(timestamp_type: str, timestamp_period: str, *args, compo
         elif TimestampPeriod.END in timestamp_dict_to_save[timestamp_name]:
             raise Exception(f"Register time value end error: {timestamp_name} for {TimestampPeriod.END} already registered")
         else:
-            timestamp_dict_to_save[timestamp_name][TimestampPeriod.END] = time.time()
+            timestamp_dict_to_save[timestamp_name][TimestampPeriod.END] = clock.wall_time()
             log.debug(f"Saved timestamp: {timestamp_type} {args} {kwargs} {timestamp_period}")
 
     return timestamp_name
 
 
+def register_time_value_attribute(timestamp_name: str, attribute: str, value):
+    """
+    Saves <attribute> beside the start and end of a timestamp already started (e.g. the codec of SAVING_STATE)
+    """
+    if timestamps_buffer is not None:
+        timestamps_buffer.record_attribute(timestamp_name, attribute, value)
+        return
+    if timestamp_name not in all_timestamps_dict.keys():
+        raise Exception(f"Register time value attribute error: {timestamp_name} never registered")
+    all_timestamps_dict[timestamp_name][attribute] = value
+
+
 # TODO rename functions
+def build_clock_file_path(timestamp: str) -> str:
+    return f"{global_variables.execution_expe_dir}/{global_variables.reconfiguration_name}/clocks/{ASSEMBLY_NAME}_{timestamp}.yaml"
+
+
 def register_timestamps_in_file(component_timestamps_dict=None, component_name=None):
     time_in_ms = time.time() % 1000
     timestamp = datetime.now().strftime(f"%Y-%m-%d_%H-%M-%S-{time_in_ms}")
+    if component_timestamps_dict is None:
+        # Anchor of the clock and offsets of the peers, to align the timestamps with the ones of the other nodes
+        clock.save_clock_file(build_clock_file_path(timestamp))
+    if timestamps_buffer is not None and component_timestamps_dict is None:
+        log.debug(f"FLUSHING TIMESTAMPS: {build_timestamps_file_path()}")
+        timestamps_buffer.flush()
+        return
     if component_timestamps_dict is not None and component_name is not None:
         timestamp_dict_to_save = component_timestamps_dict
         name_to_save = component_name
@@ -144,6 +204,9 @@ def register_timestamps_in_file(component_timestamps_dict=None, component_name=N
 
 
 def register_end_all_time_values(component_timestamps_dict=None):
+    if timestamps_buffer is not None and component_timestamps_dict is None:
+        timestamps_buffer.end_all()
+        return
     if component_timestamps_dict is not None:
         timestamp_dict_to_save = component_timestamps_dict
     else:
@@ -152,4 +215,4 @@ def register_end_all_time_values(component_timestamps_dict=None):
     for timestamp_name, timestamp_values in timestamp_dict_to_save.items():
         if TimestampPeriod.END not in timestamp_values.keys():
             log.debug(f"Saved timestamp: {timestamp_name} {TimestampPeriod.END}")
-            timestamp_dict_to_save[timestamp_name][TimestampPeriod.END] = time.time()
+            timestamp_dict_to_save[timestamp_name][TimestampPeriod.END] = clock.wall_time()
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: timestamps_analysis
+   :synopsis: this file contains the aggregation of the timestamps files of the nodes of a reconfiguration.
+
+usage:
+    python3 -m concerto.timestamps_analysis <reconfiguration dir> (<reconfiguration dir> ...) (--output <dir>) (--processes <n>)
+"""
+
+import argparse
+import csv
+import os
+import re
+import statistics
+from multiprocessing import Pool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import yaml
+
+from concerto.timestamps_buffer import read_timestamps_file
+
+"""
+Reads the files written by time_logger in the directories of the reconfigurations
+(<execution_expe_dir>/<reconfiguration_name>):
+- <node>_<%Y-%m-%d_%H-%M-%S-ms>.yaml: the timestamps of one sleep round of a node (dict backend)
+- <node>_timestamps.bin: the timestamps of all the sleep rounds of a node (buffered backend, see timestamps_buffer)
+The files are parsed in parallel, each one into the intervals of its timestamps, and the intervals are
+streamed to the intervals table while the metrics of each node are computed:
+- span: first start to last end of the node
+- uptime: sum of the durations of the rounds (event_uptime if logged, else first start to last end of the round)
+- sleeping: sum of the gaps between two rounds
+- busy: time of the uptime covered by at least one behavior
+- utilisation: busy / uptime
+- waiting: time of the uptime covered by wait and waitall instructions (and event_uptime_wait_all)
+- critical path: chain of the intervals ending the node, from the interval that ends last back to the first
+interval, each step going to the interval that ends last before the start of the current one (the uptime and
+sleeping events are not part of it)
+"""
+CATEGORIES = ("event", "instruction", "behavior")
+UPTIME = "event_uptime"
+# Not part of the critical paths: they contain the other intervals of the round
+ROUND_EVENTS = (UPTIME, "event_sleeping")
+WAITING_PREFIXES = ("instruction_wait_", "instruction_waitall_", "event_uptime_wait_all")
+INTERVALS_FIELDS = ["reconfiguration", "node", "round", "category", "name", "start", "end", "duration"]
+NODES_FIELDS = ["reconfiguration", "node", "nb_rounds", "nb_intervals", "start", "end", "span", "uptime",
+                "sleeping", "busy", "utilisation", "waiting", "waiting_ratio", "critical_path_length"]
+CRITICAL_PATH_FIELDS = ["reconfiguration", "node", "step", "category", "name", "start", "end", "duration", "gap_before"]
+
+ROUND_FILE_REGEX = re.compile(r"^(?P<node>.+)_(?P<round>\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}-[\d.]+)\.yaml$")
+BUFFERED_FILE_SUFFIX = "_timestamps.bin"
+
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# (round, category, name, start, end)
+Interval = Tuple[str, str, str, float, float]
+
+
+def list_timestamps_files(reconfiguration_dirs: List[str]) -> Iterator[Tuple[str, str, str]]:
+    """
+    :return: (reconfiguration name, node, path) of the timestamps files of <reconfiguration_dirs>
+    """
+    for reconfiguration_dir in reconfiguration_dirs:
+        reconfiguration_name = os.path.basename(os.path.normpath(reconfiguration_dir))
+        with os.scandir(reconfiguration_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                match = ROUND_FILE_REGEX.match(entry.name)
+                if match is not None:
+                    yield reconfiguration_name, match.group("node"), entry.path
+                elif entry.name.endswith(BUFFERED_FILE_SUFFIX):
+                    yield reconfiguration_name, entry.name[:-len(BUFFERED_FILE_SUFFIX)], entry.path
+
+
+def _to_intervals(round_name: str, timestamps: Dict[str, Dict[str, Any]]) -> List[Interval]:
+    intervals = []
+    for name, values in timestamps.items():
+        if not isinstance(values, dict) or "start" not in values or "end" not in values:
+            # Not ended (the node was killed)
+            continue
+        category = name.split("_", 1)[0]
+        if category not in CATEGORIES:
+            continue
+        intervals.append((round_name, category, name, float(values["start"]), float(values["end"])))
+    return intervals
+
+
+def parse_timestamps_file(file_info: Tuple[str, str, str]) -> Tuple[str, str, List[Interval]]:
+    """
+    Run by the processes of the pool
+    :return: (reconfiguration name, node, intervals of the file)
+    """
+    reconfiguration_name, node, path = file_info
+    if path.endswith(BUFFERED_FILE_SUFFIX):
+        intervals = []
+        for round_start_ns, timestamps in read_timestamps_file(path).items():
+            intervals.extend(_to_intervals(str(round_start_ns), timestamps))
+    else:
+        with open(path) as f:
+            timestamps = yaml.load(f, Loader=_YAML_LOADER) or {}
+        intervals = _to_intervals(ROUND_FILE_REGEX.match(os.path.basename(path)).group("round"), timestamps)
+    return reconfiguration_name, node, intervals
+
+
+def union_length(intervals: List[Tuple[float, float]]) -> float:
+    total = 0.
+    current_start, current_end = None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def compute_critical_path(intervals: List[Interval]) -> List[Tuple[Interval, float]]:
+    """
+    :return: the intervals of the critical path in chronological order, with the gap before each of them (time
+    without any interval of the path: sleeping or waiting for the semantics)
+    """
+    by_end = sorted(intervals, key=lambda interval: interval[4])
+    if not by_end:
+        return []
+    path = [by_end[-1]]
+    current = by_end[-1]
+    # The intervals are sorted by end: the predecessor is the last one ending before the start of the current one
+    ends = [interval[4] for interval in by_end]
+    index = len(by_end) - 1
+    while True:
+        start = current[3]
+        index -= 1
+        while index >= 0 and ends[index] > start:
+            index -= 1
+        if index < 0:
+            break
+        current = by_end[index]
+        path.append(current)
+    path.reverse()
+    return [(interval, interval[3] - path[i - 1][4] if i > 0 else 0.) for i, interval in enumerate(path)]
+
+
+class NodeMetrics:
+
+    def __init__(self, reconfiguration_name: str, node: str):
+        self.reconfiguration_name: str = reconfiguration_name
+        self.node: str = node
+        self.intervals: List[Interval] = []
+
+    def add_intervals(self, intervals: List[Interval]):
+        self.intervals.extend(intervals)
+
+    def get_rounds(self) -> Dict[str, Tuple[float, float]]:
+        """
+        :return: round => (start, end) of the uptime of the round
+        """
+        rounds = {}
+        uptimes = {}
+        for round_name, _, name, start, end in self.intervals:
+            round_start, round_end = rounds.get(round_name, (start, end))
+            rounds[round_name] = (min(round_start, start), max(round_end, end))
+            if name == UPTIME:
+                uptimes[round_name] = (start, end)
+        rounds.update(uptimes)
+        return rounds
+
+    def compute(self) -> Tuple[Dict[str, Any], List[Tuple[Interval, float]]]:
+        rounds = sorted(self.get_rounds().values())
+        uptime = sum(end - start for start, end in rounds)
+        sleeping = sum((max(0., rounds[i][0] - rounds[i - 1][1]) for i in range(1, len(rounds))), 0.)
+        busy = union_length([(start, end) for _, category, _, start, end in self.intervals if category == "behavior"])
+        waiting = union_length([(start, end) for _, _, name, start, end in self.intervals
+                                if name.startswith(WAITING_PREFIXES)])
+        critical_path = compute_critical_path([interval for interval in self.intervals if interval[2] not in ROUND_EVENTS])
+        start = min((interval[3] for interval in self.intervals), default=None)
+        end = max((interval[4] for interval in self.intervals), default=None)
+        return {
+            "reconfiguration": self.reconfiguration_name,
+            "node": self.node,
+            "nb_rounds": len(rounds),
+            "nb_intervals": len(self.intervals),
+            "start": start,
+            "end": end,
+            "span": end - start if start is not None else 0.,
+            "uptime": uptime,
+            "sleeping": sleeping,
+            "busy": busy,
+            "utilisation": busy / uptime if uptime > 0 else None,
+            "waiting": waiting,
+            "waiting_ratio": waiting / uptime if uptime > 0 else None,
+            "critical_path_length": len(critical_path),
+        }, critical_path
+
+
+def _describe(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"min": None, "mean": None, "median": None, "max": None, "sum": 0.}
+    return {"min": min(values), "mean": statistics.mean(values), "median": statistics.median(values),
+            "max": max(values), "sum": sum(values)}
+
+
+def aggregate(reconfiguration_dirs: List[str], output_dir: str, nb_processes: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Writes intervals.csv, nodes.csv, critical_paths.csv and summary.yaml in <output_dir>
+    :return: the summary
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    nodes: Dict[Tuple[str, str], NodeMetrics] = {}
+    nb_files = 0
+    nb_intervals = 0
+    with open(f"{output_dir}/intervals.csv", "w", newline="") as intervals_file, Pool(nb_processes) as pool:
+        intervals_writer = csv.writer(intervals_file)
+        intervals_writer.writerow(INTERVALS_FIELDS)
+        for reconfiguration_name, node, intervals in pool.imap_unordered(
+                parse_timestamps_file, list_timestamps_files(reconfiguration_dirs), chunksize=16):
+            nb_files += 1
+            nb_intervals += len(intervals)
+            intervals_writer.writerows(
+                (reconfiguration_name, node, round_name, category, name, start, end, end - start)
+                for round_name, category, name, start, end in intervals
+            )
+            key = (reconfiguration_name, node)
+            if key not in nodes:
+                nodes[key] = NodeMetrics(reconfiguration_name, node)
+            nodes[key].add_intervals(intervals)
+
+    nodes_rows = []
+    with open(f"{output_dir}/critical_paths.csv", "w", newline="") as critical_paths_file:
+        critical_paths_writer = csv.DictWriter(critical_paths_file, fieldnames=CRITICAL_PATH_FIELDS)
+        critical_paths_writer.writeheader()
+        for key in sorted(nodes.keys()):
+            node_row, critical_path = nodes[key].compute()
+            nodes_rows.append(node_row)
+            for step, ((_, category, name, start, end), gap_before) in enumerate(critical_path):
+                critical_paths_writer.writerow({
+                    "reconfiguration": key[0], "node": key[1], "step": step, "category": category, "name": name,
+                    "start": start, "end": end, "duration": end - start, "gap_before": gap_before
+                })
+    with open(f"{output_dir}/nodes.csv", "w", newline="") as nodes_file:
+        nodes_writer = csv.DictWriter(nodes_file, fieldnames=NODES_FIELDS)
+        nodes_writer.writeheader()
+        nodes_writer.writerows(nodes_rows)
+
+    summary = {"nb_files": nb_files, "nb_intervals": nb_intervals, "reconfigurations": {}}
+    for reconfiguration_name in sorted({row["reconfiguration"] for row in nodes_rows}):
+        rows = [row for row in nodes_rows if row["reconfiguration"] == reconfiguration_name and row["start"] is not None]
+        # The nodes with only unfinished timestamps have no interval: reported with null metrics
+        if rows:
+            total_time = max(row["end"] for row in rows) - min(row["start"] for row in rows)
+            last_node = max(rows, key=lambda row: row["end"])["node"]
+        else:
+            total_time = None
+            last_node = None
+        summary["reconfigurations"][reconfiguration_name] = {
+            "nb_nodes": len(rows),
+            "total_time": total_time,
+            "last_node": last_node,
+            **{metric: _describe([row[metric] for row in rows if row[metric] is not None])
+               for metric in ("uptime", "sleeping", "busy", "utilisation", "waiting", "waiting_ratio")}
+        }
+    with open(f"{output_dir}/summary.yaml", "w") as f:
+        yaml.safe_dump(summary, f)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Aggregation of the timestamps files of the nodes of reconfigurations")
+    parser.add_argument("reconfiguration_dirs", nargs="+")
+    parser.add_argument("--output", default="timestamps_analysis")
+    parser.add_argument("--processes", type=int, default=None, help="number of parsing processes (default: number of CPUs)")
+    args = parser.parse_args()
+    print(yaml.safe_dump(aggregate(args.reconfiguration_dirs, args.output, args.processes)))
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: timestamps_buffer
+   :synopsis: this file contains the TimestampsBuffer class, the buffered backend of time_logger, and the converter of its files to the YAML files of time_logger.
+
+usage of the converter:
+    python3 -m concerto.timestamps_buffer <timestamps file> (<output dir>)
+"""
+
+import json
+import os
+import struct
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import yaml
+
+from concerto import clock
+
+"""
+The events are appended to two files per assembly and reconfiguration (see time_logger.build_timestamps_file_path),
+the sleep rounds of the assembly following each other:
+- <assembly>_timestamps.bin: fixed-width records (RECORD, 13 bytes), kind (uint8), id (uint32), value (int64):
+    - ROUND: a round starts, value: wall-clock time (ns) of its start
+    - START, END: id of the name of the timestamp, value: time (ns) since the start of the round
+    - ATTRIBUTE: id of the name of the timestamp, value: id of the "<attribute>=<value>" string (e.g. codec)
+- <assembly>_timestamps.names: the table of the names of the timestamps and of the attributes, one JSON string per
+line, the id of a name is its line number. A name is appended the first time it is used in the reconfiguration:
+the names of the events, behaviors and of most of the instructions are the same in each round.
+"""
+RECORDS_EXTENSION = ".bin"
+NAMES_EXTENSION = ".names"
+ROUND = 0
+START = 1
+END = 2
+ATTRIBUTE = 3
+KINDS = {"start": START, "end": END}
+RECORD = struct.Struct("<BIq")
+
+DEFAULT_CAPACITY = 4096
+
+
+def build_names_file_path(records_file_path: str) -> str:
+    return os.path.splitext(records_file_path)[0] + NAMES_EXTENSION
+
+
+def _read_names(names_file_path: str) -> List[str]:
+    if not os.path.exists(names_file_path):
+        return []
+    with open(names_file_path) as f:
+        # A line that was not completely written (the node stopped while appending it) has no id
+        return [json.loads(line) for line in f if line.endswith("\n")]
+
+
+def build_timestamp_name(timestamp_type: str, args: Tuple, kwargs_values: Tuple) -> str:
+    """
+    Same name as time_logger.register_time_value
+    """
+    timestamp_name = timestamp_type
+    if args:
+        timestamp_name += "_" + "-".join(args)
+    if kwargs_values:
+        timestamp_name += "_" + "-".join(map(str, kwargs_values))
+    return timestamp_name
+
+
+class TimestampsBuffer:
+    """
+    Events of time_logger recorded as raw records (timestamp key, period, perf_counter_ns), up to <capacity>
+    records: the names of the timestamps are looked up in the names table and the times converted only when the
+    records are written to the file, when the buffer is full or when the assembly goes to sleep.
+
+    Unlike the dict backend of time_logger, the sequence of the events is not checked (start registered twice,
+    end without start): the reader keeps the first start and the last end of each timestamp.
+    """
+
+    def __init__(self, get_file_path: Callable[[], str], capacity: int = DEFAULT_CAPACITY):
+        # Called when the buffer is written: the file depends on the reconfiguration, known after the buffer is created
+        self._get_file_path: Callable[[], str] = get_file_path
+        self.capacity: int = capacity
+        # (timestamp key, period or attribute, value), timestamp key: (timestamp type, args, kwargs values). The
+        # records are appended without lock (append and popleft of a deque are thread-safe), the lock only
+        # serializes the writes
+        self._records: Deque[Tuple[Tuple, str, Any]] = deque()
+        self._write_lock: Lock = Lock()
+        # Timestamps started and not ended, ended by end_all
+        self._open: Dict[Tuple, None] = {}
+        # timestamp key => id of its name, the same timestamps are started and ended in each round
+        self._keys_ids: Dict[Tuple, int] = {}
+        # Names table of the current file: name => id
+        self._names_ids: Dict[str, int] = {}
+        self._names_file_path: Optional[str] = None
+        # perf_counter_ns has no origin, the times of the events are computed from the anchor of the clock
+        anchor = clock.get_anchor()
+        self._round_start_wall_ns: int = anchor["wall_ns"]
+        self._round_start_perf_ns: int = anchor["perf_ns"]
+        self._round_written: bool = False
+        self.nb_events: int = 0
+        self.nb_writes: int = 0
+
+    def record(self, timestamp_type: str, timestamp_period: str, args: Tuple, kwargs_values: Tuple = ()):
+        timestamp_key = (timestamp_type, args, kwargs_values)
+        self._records.append((timestamp_key, timestamp_period, time.perf_counter_ns()))
+        if timestamp_period == "start":
+            self._open[timestamp_key] = None
+        else:
+            self._open.pop(timestamp_key, None)
+        if len(self._records) >= self.capacity:
+            self.flush()
+
+    def record_attribute(self, timestamp_name: str, attribute: str, value: Any):
+        self._records.append(((timestamp_name, (), ()), attribute, value))
+        if len(self._records) >= self.capacity:
+            self.flush()
+
+    def end_all(self):
+        """
+        Ends the timestamps not ended yet (see time_logger.register_end_all_time_values)
+        """
+        for timestamp_type, args, kwargs_values in list(self._open.keys()):
+            self.record(timestamp_type, "end", args, kwargs_values)
+
+    def flush(self):
+        with self._write_lock:
+            self._write()
+
+    def _load_names(self, names_file_path: str):
+        if names_file_path != self._names_file_path:
+            # First write of the process in this reconfiguration: the names of the previous rounds are reused
+            self._names_file_path = names_file_path
+            self._names_ids = {name: name_id for name_id, name in enumerate(_read_names(names_file_path))}
+            self._keys_ids = {}
+            # The records of the round in the new file start with its header
+            self._round_written = False
+
+    def _get_name_id(self, name: str, new_names: List[str]) -> int:
+        name_id = self._names_ids.get(name)
+        if name_id is None:
+            name_id = len(self._names_ids)
+            self._names_ids[name] = name_id
+            new_names.append(name)
+        return name_id
+
+    def _get_key_id(self, timestamp_key: Tuple, new_names: List[str]) -> int:
+        key_id = self._keys_ids.get(timestamp_key)
+        if key_id is None:
+            key_id = self._get_name_id(build_timestamp_name(*timestamp_key), new_names)
+            self._keys_ids[timestamp_key] = key_id
+        return key_id
+
+    def _write(self):
+        nb_records = len(self._records)
+        if nb_records == 0:
+            return
+        file_path = self._get_file_path()
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        names_file_path = build_names_file_path(file_path)
+        self._load_names(names_file_path)
+        new_names = []
+        records = bytearray()
+        pack = RECORD.pack
+        if not self._round_written:
+            records += pack(ROUND, 0, self._round_start_wall_ns)
+            self._round_written = True
+        round_start_perf_ns = self._round_start_perf_ns
+        # The records appended meanwhile are written by the next flush
+        for _ in range(nb_records):
+            timestamp_key, key, value = self._records.popleft()
+            key_id = self._get_key_id(timestamp_key, new_names)
+            kind = KINDS.get(key)
+            if kind is not None:
+                records += pack(kind, key_id, value - round_start_perf_ns)
+            else:
+                records += pack(ATTRIBUTE, key_id, self._get_name_id(f"{key}={value}", new_names))
+        # The names are written before the records using them
+        if new_names:
+            with open(names_file_path, "a") as f:
+                f.write("".join(json.dumps(name) + "\n" for name in new_names))
+        with open(file_path, "ab") as f:
+            f.write(records)
+        self.nb_events += nb_records
+        self.nb_writes += 1
+
+
+def read_timestamps_file(file_path: str) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """
+    :return: wall-clock time (ns) of the start of the round => timestamps of the round, in the layout of the YAML
+    files of time_logger
+    """
+    names = _read_names(build_names_file_path(file_path))
+    rounds = {}
+    round_start_ns = 0
+    timestamps = None
+    with open(file_path, "rb") as f:
+        data = f.read()
+    # A last record that was not completely written is ignored
+    data = data[:len(data) - len(data) % RECORD.size]
+    for kind, name_id, value in RECORD.iter_unpack(data):
+        if kind == ROUND:
+            round_start_ns = value
+            timestamps = rounds.setdefault(round_start_ns, {})
+            continue
+        if timestamps is None:
+            raise Exception(f"Timestamps records before the header of their round in {file_path}")
+        values = timestamps.setdefault(names[name_id], {})
+        if kind == START:
+            if "start" not in values:
+                values["start"] = (round_start_ns + value) / 1e9
+        elif kind == END:
+            values["end"] = (round_start_ns + value) / 1e9
+        else:
+            attribute, _, attribute_value = names[value].partition("=")
+            values[attribute] = attribute_value
+    return rounds
+
+
+def convert_to_yaml(file_path: str, output_dir: str, name: str) -> List[str]:
+    """
+    Writes one YAML file per round of <file_path>, named as the files of time_logger.register_timestamps_in_file
+    :return: the paths of the YAML files
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    yaml_paths = []
+    for round_start, timestamps in read_timestamps_file(file_path).items():
+        round_time = round_start / 1e9
+        timestamp = datetime.fromtimestamp(round_time).strftime(f"%Y-%m-%d_%H-%M-%S-{round_time % 1000}")
+        yaml_path = f"{output_dir}/{name}_{timestamp}.yaml"
+        with open(yaml_path, "w") as f:
+            yaml.safe_dump(timestamps, f)
+        yaml_paths.append(yaml_path)
+    return yaml_paths
+
+
+if __name__ == '__main__':
+    timestamps_file_path = sys.argv[1]
+    output_dir = os.path.dirname(timestamps_file_path) or "."
+    if len(sys.argv) >= 3:
+        output_dir = sys.argv[2]
+    assembly_name = os.path.basename(timestamps_file_path).rsplit("_timestamps", 1)[0]
+    for path in convert_to_yaml(timestamps_file_path, output_dir, assembly_name):
+        print(path)
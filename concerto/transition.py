@@ -6,7 +6,9 @@
    :synopsis: this file contains the Transition class.
 """
 
-import threading
+from concurrent.futures import Future
+
+from concerto.transition_executor import TransitionRun, is_coroutine_function
 
 
 class Transition:
@@ -16,15 +18,18 @@ class Transition:
         action is performed between a source and destination dock, each of
         which is attached to a place.
 
-        This is an abstract class that need to be override. In particular,
-        the method 'run' must be override
+        Transitions are part of the component template: they are shared by
+        all the instances of a component type. The function to run and the
+        thread running it belong to the component instance.
     """
 
+    __slots__ = ("transition_name", "src_place", "dst_place", "behavior", "dst_idset", "src_dock", "dst_dock")
+
     """
     BUILD TRANSITION
     """
 
-    def __init__(self, name, src, dst, bhv, idset, func, args, component):
+    def __init__(self, name, src, dst, bhv, idset):
         self.transition_name = name
         self.src_place = None
         if src is not None:
@@ -32,18 +37,14 @@ class Transition:
         self.dst_place = dst.get_name()
         self.behavior = bhv
         self.dst_idset = idset  # TODO: what is it
-        self.code = func
-        self.args = args
-        self._component = component
         self.src_dock = None
         if src is not None:
             self.src_dock = src.create_output_dock(self)
         self.dst_dock = dst.create_input_dock(self)
-        self.thread = None
 
     @property
     def obj_id(self):
-        return f"{self._component.name}_{self.transition_name}"
+        return self.transition_name
 
     def to_json(self):
         return {
@@ -93,42 +94,60 @@ class Transition:
         """
         return self.behavior
 
-    def execute_user_function(self, user_function, arguments):
+    def _on_function_end(self, component, future: Future):
+        """
+        Done callback of the future of the transition function: records its timings, reports its error if
+        any, and wakes up the semantics of the component.
+        """
         try:
-            user_function(*arguments)
+            run = future.result()
         except Exception as e:
-            self._component.thread_safe_report_error(self, repr(e))
+            # The function could not be run (e.g. not picklable for a process pool)
+            run = TransitionRun(0., 0., 0., repr(e))
+        try:
+            component.record_transition_run(self, run)
+            if run.error is not None:
+                component.thread_safe_report_error(self, run.error)
+        finally:
+            component.thread_safe_notify_transition_end(self)
 
-    def start_thread(self, gantt_tuple, dryrun):
+    def start_thread(self, component, gantt_tuple, dryrun):
         """
-        This method creates the thread of the transition
-
-        :return: the Thread of the transition
+        This method submits the function of the transition for the instance <component> to its
+        transition executor, or to the event loop of the assembly if it is declared with async def.
+        The transition is pushed on the completion queue of the component when its function ends.
         """
         if not dryrun:
-            self.thread = threading.Thread(target=self.execute_user_function, args=(self.code, self.args))
+            user_function, arguments = component.get_transition_function(self.transition_name)
             if gantt_tuple is not None:
                 (gantt_chart, args) = gantt_tuple
                 gantt_chart.start_transition(*args)
-            self.thread.start()
+            if is_coroutine_function(user_function):
+                future = component.get_transition_event_loop().submit(user_function, arguments)
+            else:
+                future = component.get_transition_executor().submit(user_function, arguments)
+            component.transitions_futures[self] = future
+            future.add_done_callback(lambda f: self._on_function_end(component, f))
         else:
-            pass
+            component.thread_safe_notify_transition_end(self)
 
-    def join_thread(self, gantt_tuple, dryrun):
+    def join_thread(self, component, gantt_tuple, dryrun):
         """
-        This method tries to join self.thread. The default behavior has no
-        timeout.
+        This method checks whether the function of the transition for the instance <component> is
+        completed (its future is done). It never blocks, and is only called on the transitions drained
+        from the completion queue of the component.
 
-        :return: True if the tread has been joined, False othwise
+        :return: True if the function is completed, False othwise
         """
         if not dryrun:
-            if not self.thread.is_alive():
-                self.thread.join()
-                if gantt_tuple is not None:
-                    (gantt_chart, args) = gantt_tuple
-                    gantt_chart.stop_transition(*args)
-                return True
-            else:
-                return False
+            future = component.transitions_futures.get(self)
+            if future is not None:
+                if not future.done():
+                    return False
+                del component.transitions_futures[self]
+            if gantt_tuple is not None:
+                (gantt_chart, args) = gantt_tuple
+                gantt_chart.stop_transition(*args)
+            return True
         else:
             return True
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: transition_executor
+   :synopsis: this file contains the TransitionExecutor class, the executor running the transitions functions,
+   and the TransitionEventLoop class running the asynchronous (async def) transitions functions.
+"""
+
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, Executor
+from typing import Callable, Dict, Optional, Tuple
+
+THREAD_POOL = "thread"
+PROCESS_POOL = "process"
+
+# Transitions mostly wait (sleeps, remote commands): suggested bound of a thread pool, larger than the one of
+# concurrent.futures (based on the number of CPUs). Opt-in, see Assembly.set_transition_executor
+BOUNDED_MAX_THREADS = 128
+
+
+class TransitionRun:
+    """
+    Timings of one execution of a transition function (monotonic clock, comparable between the
+    processes of the pool).
+    """
+
+    __slots__ = ("submitted_at", "started_at", "ended_at", "error", "is_coroutine")
+
+    def __init__(self, submitted_at: float, started_at: float, ended_at: float, error: Optional[str],
+                 is_coroutine: bool = False):
+        self.submitted_at = submitted_at
+        self.started_at = started_at
+        self.ended_at = ended_at
+        self.error = error
+        self.is_coroutine = is_coroutine
+
+    def get_queue_wait_time(self) -> float:
+        return self.started_at - self.submitted_at
+
+    def get_execution_time(self) -> float:
+        return self.ended_at - self.started_at
+
+
+def _run_transition_function(user_function: Callable, arguments: Tuple, submitted_at: float) -> TransitionRun:
+    """
+    Runs in a worker of the pool. Module level function so that it can be sent to the workers of a
+    process pool (the user function and its arguments need to be picklable in this case).
+    """
+    started_at = time.monotonic()
+    error = None
+    try:
+        user_function(*arguments)
+    except Exception as e:
+        error = repr(e)
+    return TransitionRun(submitted_at, started_at, time.monotonic(), error)
+
+
+async def _run_transition_coroutine(user_function: Callable, arguments: Tuple, submitted_at: float) -> TransitionRun:
+    """
+    Runs on the event loop of the TransitionEventLoop.
+    """
+    started_at = time.monotonic()
+    error = None
+    try:
+        await user_function(*arguments)
+    except Exception as e:
+        error = repr(e)
+    return TransitionRun(submitted_at, started_at, time.monotonic(), error, is_coroutine=True)
+
+
+def is_coroutine_function(user_function: Callable) -> bool:
+    return inspect.iscoroutinefunction(user_function)
+
+
+class _RunsStats:
+    """
+    Counters of the transitions runs of an executor. record_run is thread safe.
+    """
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.nb_submitted: int = 0
+        self.nb_done: int = 0
+        self.total_queue_wait_time: float = 0.
+        self.total_execution_time: float = 0.
+
+    def record_run(self, run: TransitionRun):
+        """
+        Thread safe, called by the done callbacks of the futures
+        """
+        with self._stats_lock:
+            self.nb_done += 1
+            self.total_queue_wait_time += run.get_queue_wait_time()
+            self.total_execution_time += run.get_execution_time()
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            "nb_submitted": self.nb_submitted,
+            "nb_done": self.nb_done,
+            "total_queue_wait_time": self.total_queue_wait_time,
+            "total_execution_time": self.total_execution_time,
+        }
+
+
+class _ThreadPerRunExecutor(Executor):
+    """
+    Unbounded executor: each function runs in its own thread, as many transitions as fired run at the same time
+    """
+
+    def __init__(self):
+        self._threads = set()
+        self._threads_lock = threading.Lock()
+
+    def _run(self, future: Future, function: Callable, args: Tuple):
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(function(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            with self._threads_lock:
+                self._threads.discard(threading.current_thread())
+
+    def submit(self, function: Callable, *args) -> Future:
+        future = Future()
+        thread = threading.Thread(target=self._run, args=(future, function, args), name="concerto_transition")
+        with self._threads_lock:
+            self._threads.add(thread)
+        thread.start()
+        return future
+
+    def shutdown(self, wait: bool = True, **kwargs):
+        if wait:
+            with self._threads_lock:
+                threads = list(self._threads)
+            for thread in threads:
+                thread.join()
+
+
+class TransitionExecutor(_RunsStats):
+    """
+    Runs the functions of the transitions. By default each function runs in its own thread, as soon as the
+    transition is fired. With <max_concurrency>, a pool of workers runs at most <max_concurrency> functions at
+    the same time (the others wait in the queue of the pool).
+
+    - THREAD_POOL (default): the functions run in threads of the assembly process.
+    - PROCESS_POOL: the functions run in worker processes, for CPU-bound transitions. The functions and
+    their arguments must be picklable (module level functions, not methods of the component) and cannot
+    modify the state of the component.
+
+    One executor is owned by the assembly and shared by its components, a component can have its own
+    executor to bound its concurrency separately (see Component.set_max_concurrency).
+    """
+
+    def __init__(self, executor_type: str = THREAD_POOL, max_concurrency: Optional[int] = None):
+        if executor_type not in (THREAD_POOL, PROCESS_POOL):
+            raise Exception("Unknown transition executor type '%s' (expected '%s' or '%s')" % (
+                executor_type, THREAD_POOL, PROCESS_POOL))
+        _RunsStats.__init__(self)
+        self.executor_type: str = executor_type
+        self.max_concurrency: Optional[int] = max_concurrency
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        # Workers are created lazily, at the first transition
+        if self._executor is None:
+            if self.executor_type == PROCESS_POOL:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_concurrency)
+            elif self.max_concurrency is None:
+                self._executor = _ThreadPerRunExecutor()
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                    thread_name_prefix="concerto_transition")
+        return self._executor
+
+    def submit(self, user_function: Callable, arguments: Tuple) -> Future:
+        """
+        Queues the execution of <user_function>. The result of the future is a TransitionRun.
+        """
+        self.nb_submitted += 1
+        return self._get_executor().submit(_run_transition_function, user_function, arguments, time.monotonic())
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            "executor_type": self.executor_type,
+            "max_concurrency": self.max_concurrency,
+            **_RunsStats.get_stats(self)
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+class TransitionEventLoop(_RunsStats):
+    """
+    Event loop owned by the assembly, running the transitions functions declared with async def. The loop runs
+    in its own thread, alongside the semantics loop: the concurrent I/O-bound transitions are coroutines of this
+    loop instead of workers of a TransitionExecutor.
+    """
+
+    def __init__(self):
+        _RunsStats.__init__(self)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        # The loop and its thread are started lazily, at the first asynchronous transition
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="concerto_transitions_loop",
+                                                daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def submit(self, user_function: Callable, arguments: Tuple) -> Future:
+        """
+        Schedules the coroutine <user_function>(*<arguments>) on the loop. The result of the future is a
+        TransitionRun.
+        """
+        self.nb_submitted += 1
+        coroutine = _run_transition_coroutine(user_function, arguments, time.monotonic())
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop())
+
+    def shutdown(self):
+        with self._start_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._loop = None
+                self._thread = None
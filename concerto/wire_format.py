@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: wire_format
+   :synopsis: this file contains the compact binary encoding of the messages exchanged between the assemblies.
+"""
+
+import struct
+from typing import Any, List, Union
+
+TEXT = "text"
+BINARY = "binary"
+
+"""
+Binary messages start with the version byte of the format, a control character that cannot start a text
+message (decimal strings, True/False, ACTIVE/INACTIVE, CONN/DECONN): the receivers detect the format of
+each message from its first byte, both formats can be received at the same time.
+
+Single value: <version> <tagged value>
+List of values (REST /batch): <version> <number of values: uint32> <tagged value> * number of values
+Tagged value: <kind: uint8> <value>
+"""
+WIRE_FORMAT_VERSION = 1
+# Content type of the binary answers of the REST API, requested by the clients in their Accept header
+BINARY_CONTENT_TYPE = "application/vnd.concerto-d.v1"
+
+KIND_NONE = 0
+KIND_INT = 1        # nb_users: int32
+KIND_BOOL = 2       # refusing state, is_conn_synced: uint8
+KIND_STATE = 3      # component state and connection sync action: uint8, index in STATES
+KIND_STR = 4        # data of a dependency: uint32 length + utf-8
+KIND_SMALL_INT = 5  # nb_users from 0 to 255: uint8
+STATES = ("ACTIVE", "INACTIVE", "CONN", "DECONN")
+
+_HEADER = struct.Struct(">BB")
+_COUNT = struct.Struct(">I")
+_INT = struct.Struct(">i")
+_UINT8 = struct.Struct(">B")
+_LENGTH = struct.Struct(">I")
+
+# Tagged values of the constants, encoded once (bool keys are checked before the int ones, True == 1)
+_ENCODED_CONSTANTS = {
+    None: _UINT8.pack(KIND_NONE),
+    **{state: _HEADER.pack(KIND_STATE, i) for i, state in enumerate(STATES)},
+}
+_ENCODED_BOOLS = {True: _HEADER.pack(KIND_BOOL, 1), False: _HEADER.pack(KIND_BOOL, 0)}
+_ENCODED_SMALL_INTS = [_HEADER.pack(KIND_SMALL_INT, i) for i in range(256)]
+# Two bytes tagged values (bools, states, small ints) => value
+_DECODED_PAIRS = {
+    **{tagged: value for value, tagged in _ENCODED_CONSTANTS.items() if len(tagged) == 2},
+    **{tagged: value for value, tagged in _ENCODED_BOOLS.items()},
+    **{tagged: i for i, tagged in enumerate(_ENCODED_SMALL_INTS)},
+}
+_VERSION_BYTE = _UINT8.pack(WIRE_FORMAT_VERSION)
+# Single value messages of the constants and of the small ints => value
+_DECODED_MESSAGES = {_VERSION_BYTE + tagged: value for tagged, value in _DECODED_PAIRS.items()}
+_DECODED_MESSAGES[_VERSION_BYTE + _ENCODED_CONSTANTS[None]] = None
+
+# Format of the messages sent by this assembly, the messages received are decoded whatever their format
+wire_format = TEXT
+
+
+def set_wire_format(value: str):
+    global wire_format
+    if value not in (TEXT, BINARY):
+        raise Exception("Unknown wire format '%s' (expected '%s' or '%s')" % (value, TEXT, BINARY))
+    wire_format = value
+
+
+def is_binary_enabled() -> bool:
+    return wire_format == BINARY
+
+
+def is_binary(payload: bytes) -> bool:
+    return len(payload) > 0 and payload[0] < 0x20
+
+
+def _encode_tagged_value(value: Any) -> bytes:
+    value_type = type(value)
+    if value_type is bool:  # Before int, bool is a subclass of int
+        return _ENCODED_BOOLS[value]
+    if value_type is int:
+        if 0 <= value < 256:
+            return _ENCODED_SMALL_INTS[value]
+        return _UINT8.pack(KIND_INT) + _INT.pack(value)
+    if value is None or value_type is str:
+        encoded_constant = _ENCODED_CONSTANTS.get(value)
+        if encoded_constant is not None:
+            return encoded_constant
+    encoded = str(value).encode("utf-8")
+    return _UINT8.pack(KIND_STR) + _LENGTH.pack(len(encoded)) + encoded
+
+
+def _decode_tagged_value(payload: bytes, offset: int):
+    """
+    :return: (value, offset of the next value)
+    """
+    kind = payload[offset]
+    offset += 1
+    if kind == KIND_SMALL_INT:
+        return payload[offset], offset + 1
+    if kind == KIND_NONE:
+        return None, offset
+    if kind == KIND_BOOL:
+        return payload[offset] != 0, offset + 1
+    if kind == KIND_INT:
+        return _INT.unpack_from(payload, offset)[0], offset + _INT.size
+    if kind == KIND_STATE:
+        return STATES[payload[offset]], offset + 1
+    if kind == KIND_STR:
+        length = _LENGTH.unpack_from(payload, offset)[0]
+        offset += _LENGTH.size
+        if offset + length > len(payload):
+            raise ValueError("Truncated string in binary message")
+        return payload[offset:offset + length].decode("utf-8"), offset + length
+    raise ValueError("Unknown kind of value %d in binary message" % kind)
+
+
+def _check_version(payload: bytes):
+    if len(payload) == 0:
+        raise ValueError("Empty binary message")
+    if payload[0] != WIRE_FORMAT_VERSION:
+        raise ValueError("Unsupported wire format version %d (supported: %d)" % (payload[0], WIRE_FORMAT_VERSION))
+
+
+def encode_value(value: Any) -> bytes:
+    return _VERSION_BYTE + _encode_tagged_value(value)
+
+
+def decode_value(payload: bytes):
+    """
+    Raises ValueError if <payload> is not a valid binary message
+    """
+    if payload in _DECODED_MESSAGES:
+        return _DECODED_MESSAGES[payload]
+    _check_version(payload)
+    try:
+        return _decode_tagged_value(payload, 1)[0]
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise ValueError("Truncated or corrupted binary message: %s" % e)
+
+
+def encode_values(values: List[Any]) -> bytes:
+    return b"".join([_VERSION_BYTE, _COUNT.pack(len(values))] +
+                    [_encode_tagged_value(value) for value in values])
+
+
+def decode_values(payload: bytes) -> List[Any]:
+    """
+    Raises ValueError if <payload> is not a valid binary message
+    """
+    _check_version(payload)
+    try:
+        count = _COUNT.unpack_from(payload, 1)[0]
+        offset = 1 + _COUNT.size
+        values = []
+        for _ in range(count):
+            # Most of the values are two bytes long, decoded with a lookup
+            pair = payload[offset:offset + 2]
+            if pair in _DECODED_PAIRS:
+                values.append(_DECODED_PAIRS[pair])
+                offset += 2
+            else:
+                value, offset = _decode_tagged_value(payload, offset)
+                values.append(value)
+        return values
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise ValueError("Truncated or corrupted binary message: %s" % e)
+
+
+def encode(value: Any, text_value: Union[str, int]):
+    """
+    Payload of a message sent by this assembly: <value> encoded if the binary format is enabled, else <text_value>
+    """
+    if wire_format == BINARY:
+        return encode_value(value)
+    return text_value
+
+
+def decode(payload: bytes):
+    """
+    Value of a message received, in binary (typed value) or text (str) format
+    """
+    if is_binary(payload):
+        return decode_value(payload)
+    return payload.decode("utf-8")
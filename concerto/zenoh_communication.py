@@ -1,8 +1,12 @@
+import threading
 import time
+from typing import Any, Callable, Dict, Optional, Set
 
 import zenoh
 
+from concerto import clock, wire_format
 from concerto.debug_logger import log_once, log
+from concerto.semantics_scheduler import FREQUENCE_POLLING
 
 config = {}
 
@@ -13,6 +17,9 @@ INACTIVE = "INACTIVE"
 
 last_msg_component_state = ""
 
+# Peer of the offsets estimated from the timestamps of the samples, see clock
+ZENOH_ROUTER_PEER = "zenoh_router"
+
 class _ZenohSession:
     _session = None
 
@@ -23,6 +30,138 @@ def _get_zenoh_session() -> zenoh.session.Session:
     return _ZenohSession._session
 
 
+class _StateMirror:
+    """
+    Local mirror of the remote states, updated by Zenoh subscribers: the reads are dictionary lookups
+    instead of a session.get query each.
+    The first read of a topic subscribes to its prefix (<first two levels>/**, e.g. nb_users/<component>/**
+    or wait/<reconfiguration_name>/**) and seeds the value with a session.get, as the values put before the
+    subscription are only known by the storage of the router. The next reads cost no network round trip.
+    A put can be missed (while the subscription reaches the router, or if the router restarts): the topics still
+    read are queried again every <refresh_interval> seconds (see refresh), except the ones received meanwhile.
+    A topic without value is not cached, it is queried at each read until a value is put.
+    """
+
+    def __init__(self):
+        # Values decoded from the text (str) or binary (typed value) format, see wire_format
+        self._values: Dict[str, Any] = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        # Not the lock of the values: the callbacks of the subscribers can be called while declaring them
+        self._subscribe_lock = threading.Lock()
+        self._listener: Optional[Callable[[str], None]] = None
+        # Topics read (resp. received from the subscribers) since the last refresh
+        self._read_topics: Set[str] = set()
+        self._received_topics: Set[str] = set()
+        self._last_refresh: float = time.monotonic()
+
+    def set_listener(self, listener: Optional[Callable[[str], None]]):
+        """
+        <listener> is called with the topic of each value received (from the threads of Zenoh)
+        """
+        self._listener = listener
+
+    @staticmethod
+    def _decode(zenoh_topic: str, payload: bytes):
+        # The data of the dependencies are put as they are written, they are not messages of the wire format
+        if zenoh_topic.startswith("data/"):
+            return payload.decode("utf-8")
+        return wire_format.decode(payload)
+
+    def _on_sample(self, sample):
+        received_at = clock.wall_time()
+        if sample.timestamp is not None:
+            clock.record_one_way(ZENOH_ROUTER_PEER, sample.timestamp.time, received_at)
+        key = str(sample.key_expr)
+        if sample.kind == zenoh.SampleKind.DELETE:
+            value = None
+        else:
+            value = self._decode(key, sample.payload)
+        with self._lock:
+            self._values[key] = value
+            self._received_topics.add(key)
+        if self._listener is not None:
+            self._listener(key)
+
+    def _query(self, session: zenoh.session.Session, zenoh_topic: str):
+        res = session.get(zenoh_topic, zenoh.ListCollector())()
+        return self._decode(zenoh_topic, res[0].ok.payload) if len(res) > 0 else None
+
+    def get(self, session: zenoh.session.Session, zenoh_topic: str):
+        """
+        :return: the last value put on <zenoh_topic>, None if there is none
+        """
+        with self._lock:
+            self._read_topics.add(zenoh_topic)
+            value = self._values.get(zenoh_topic)
+        if value is not None:
+            return value
+
+        prefix = "/".join(zenoh_topic.split("/")[:2])
+        with self._subscribe_lock:
+            if prefix not in self._subscribers:
+                self._subscribers[prefix] = session.declare_subscriber(f"{prefix}/**", self._on_sample)
+        # Subscribed before the query: a put received meanwhile is more recent than the stored value
+        stored_value = self._query(session, zenoh_topic)
+        with self._lock:
+            value = self._values.get(zenoh_topic)
+            if value is not None:
+                return value
+            if stored_value is not None:
+                self._values[zenoh_topic] = stored_value
+            return stored_value
+
+    def refresh(self, session: zenoh.session.Session, refresh_interval: float):
+        """
+        Queries again the topics read and not received since the last refresh, at most every <refresh_interval>
+        seconds. Called by the semantics loop.
+        """
+        now = time.monotonic()
+        if now - self._last_refresh < refresh_interval:
+            return
+        self._last_refresh = now
+        with self._lock:
+            topics = self._read_topics - self._received_topics
+            self._read_topics = set()
+            self._received_topics = set()
+        for zenoh_topic in topics:
+            stored_value = self._query(session, zenoh_topic)
+            with self._lock:
+                # A put received during the query is more recent than the stored value
+                if stored_value is None or zenoh_topic in self._received_topics or self._values.get(zenoh_topic) == stored_value:
+                    continue
+                self._values[zenoh_topic] = stored_value
+            log.debug(f"Missed value of {zenoh_topic} recovered by the refresh of the remote states")
+            if self._listener is not None:
+                self._listener(zenoh_topic)
+
+    def close(self):
+        with self._subscribe_lock:
+            for subscriber in self._subscribers.values():
+                subscriber.undeclare()
+            self._subscribers.clear()
+        with self._lock:
+            self._values.clear()
+            self._read_topics.clear()
+            self._received_topics.clear()
+
+
+_state_mirror = _StateMirror()
+
+
+def refresh_state_mirror(refresh_interval: float = FREQUENCE_POLLING):
+    if _ZenohSession._session is not None:
+        _state_mirror.refresh(_ZenohSession._session, refresh_interval)
+
+
+def close_state_mirror():
+    _state_mirror.close()
+
+
+def set_remote_state_listener(listener: Optional[Callable[[str], None]]):
+    _state_mirror.set_listener(listener)
+
+
 def zenoh_session(func):
     """
     Décorateur permettant d'ouvrir et de fermer automatiquement une session Zenoh
@@ -39,8 +178,8 @@ def zenoh_session(func):
 @zenoh_session
 def get_nb_dependency_users(component_name: str, dependency_name: str, session: zenoh.session.Session = None) -> int:
     zenoh_topic = f"nb_users/{component_name}/{dependency_name}"
-    res = session.get(zenoh_topic, zenoh.ListCollector())()
-    int_res = int(res[0].ok.payload.decode("utf-8")) if len(res) > 0 else -1
+    res = _state_mirror.get(session, zenoh_topic)
+    int_res = int(res) if res is not None else -1
     log_once.debug(f"Get nb dependency users on {zenoh_topic}, result: {int_res}")
     return int_res
 
@@ -49,14 +188,14 @@ def get_nb_dependency_users(component_name: str, dependency_name: str, session:
 def send_nb_dependency_users(nb: int, component_name: str, dependency_name: str, session: zenoh.session.Session = None):
     zenoh_topic = f"nb_users/{component_name}/{dependency_name}"
     log_once.debug(f"Put nb dependency users {str(nb)} on {zenoh_topic}")
-    session.put(zenoh_topic, str(nb))
+    session.put(zenoh_topic, wire_format.encode(nb, str(nb)))
 
 
 @zenoh_session
 def get_refusing_state(component_name: str, dependency_name: str, session=None) -> int:
     zenoh_topic = f"refusing/{component_name}/{dependency_name}"
-    res = session.get(zenoh_topic, zenoh.ListCollector())()
-    bool_res = bool(int(res[0].ok.payload.decode("utf-8"))) if len(res) > 0 else False
+    res = _state_mirror.get(session, zenoh_topic)
+    bool_res = bool(int(res)) if res is not None else False
     log_once.debug(f"Get refusing state on {zenoh_topic}, result: {bool_res}")
     return bool_res
 
@@ -65,14 +204,14 @@ def get_refusing_state(component_name: str, dependency_name: str, session=None)
 def send_refusing_state(value: int, component_name: str, dependency_name: str, session=None):
     zenoh_topic = f"refusing/{component_name}/{dependency_name}"
     log_once.debug(f"Send refusing state {int(value)} on {zenoh_topic}")
-    session.put(zenoh_topic, int(value))
+    session.put(zenoh_topic, wire_format.encode(bool(value), int(value)))
 
 
 @zenoh_session
 def get_data_dependency(component_name: str, dependency_name: str, session=None):
     zenoh_topic = f"data/{component_name}/{dependency_name}"
-    res = session.get(zenoh_topic, zenoh.ListCollector())()
-    str_res = res[0].ok.payload.decode("utf-8") if len(res) > 0 else ""
+    res = _state_mirror.get(session, zenoh_topic)
+    str_res = res if res is not None else ""
     log_once.debug(f"Get data dependency on {zenoh_topic}, result: {str_res}")
     return str_res
 
@@ -88,15 +227,15 @@ def write_data_dependency(component_name: str, dependency_name: str, data, sessi
 def send_syncing_conn(syncing_component: str, component_to_sync: str,  dep_provide: str, dep_use: str, action: str, session=None):
     zenoh_topic = f"{action}/{syncing_component}/{component_to_sync}/{dep_provide}/{dep_use}"
     log_once.debug(f"Send synced connection {action} on {zenoh_topic}")
-    session.put(zenoh_topic, action)
+    session.put(zenoh_topic, wire_format.encode(action, action))
 
 
 @zenoh_session
 def is_conn_synced(syncing_component: str, component_to_sync: str,  dep_provide: str, dep_use: str, action: str, session=None):
     zenoh_topic = f"{action}/{component_to_sync}/{syncing_component}/{dep_provide}/{dep_use}"
-    result = session.get(zenoh_topic, zenoh.ListCollector())()
-    if len(result) > 0:
-        str_result = result[0].ok.payload.decode("utf-8")
+    result = _state_mirror.get(session, zenoh_topic)
+    if result is not None:
+        str_result = result
     else:
         str_result = ""
     log_once.debug(f"Check synced connection on {zenoh_topic}, result: {str_result}")
@@ -109,16 +248,16 @@ def set_component_state(state: [ACTIVE, INACTIVE], component_name: str, reconfig
     if state + component_name + reconfiguration_name != last_msg_component_state:
         zenoh_topic = f"wait/{reconfiguration_name}/{component_name}"
         log_once.debug(f"Put component state {state} on {zenoh_topic}")
-        session.put(zenoh_topic, state)
+        session.put(zenoh_topic, wire_format.encode(state, state))
         last_msg_component_state = state + component_name + reconfiguration_name
 
 
 @zenoh_session
 def get_remote_component_state(component_name: str, reconfiguration_name: str, session=None) -> [ACTIVE, INACTIVE]:
     zenoh_topic = f"wait/{reconfiguration_name}/{component_name}"
-    result = session.get(zenoh_topic, zenoh.ListCollector())()
-    if len(result) > 0:
-        str_result = result[0].ok.payload.decode("utf-8")
+    result = _state_mirror.get(session, zenoh_topic)
+    if result is not None:
+        str_result = result
     else:
         str_result = ACTIVE
     log_once.debug(f"Wait component state on {zenoh_topic}, result: {str_result}")
@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+
+"""
+Construction time and memory of N components of the same type, with the structure shared
+through ComponentTemplate (default) or rebuilt for each instance (template cache cleared
+before each instanciation, as before the templates).
+
+usage: bench_component_templates.py (<number of components> (<number of parallel transitions>))
+"""
+
+import csv, sys, time, tracemalloc
+
+from concerto.all import *
+from concerto.component_template import ComponentTemplate
+from concerto.utility import empty_transition
+
+
+class UserParallel(Component):
+
+    def __init__(self, nb_trans: int):
+        self.nb_trans = nb_trans
+        Component.__init__(self)
+
+    def create(self):
+        self.places = [
+            'waiting',
+            'configured',
+            'started'
+        ]
+
+        self.groups = {
+            'running': ['configured', 'started']
+        }
+
+        self.initial_place = 'waiting'
+
+        self.transitions = {
+            'start': ('configured', 'started', 'start', 0, empty_transition),
+            'stop': ('started', 'waiting', 'stop', 0, empty_transition)
+        }
+        for i in range(self.nb_trans):
+            self.transitions['configure%d' % i] = ('waiting', 'configured', 'deploy', 0, empty_transition)
+
+        self.dependencies = {
+            'service': (DepType.USE, ['start']),
+            'config': (DepType.DATA_USE, ['configure0']),
+            'ip': (DepType.DATA_PROVIDE, ['started']),
+            'running_service': (DepType.PROVIDE, ['running'])
+        }
+
+
+def build_components(nb_comp: int, nb_trans: int, shared: bool):
+    ComponentTemplate.clear_cache()
+    components = []
+    for i in range(nb_comp):
+        if not shared:
+            ComponentTemplate.clear_cache()
+        component = UserParallel(nb_trans)
+        component.set_name("user%d" % i)
+        components.append(component)
+    return components
+
+
+def time_test(nb_comp: int, nb_trans: int, shared: bool) -> float:
+    start = time.perf_counter()
+    build_components(nb_comp, nb_trans, shared)
+    return time.perf_counter() - start
+
+
+def memory_test(nb_comp: int, nb_trans: int, shared: bool) -> int:
+    """
+    Memory still allocated once the components are built (the templates are included)
+    """
+    tracemalloc.start()
+    components = build_components(nb_comp, nb_trans, shared)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del components
+    return current
+
+
+if __name__ == '__main__':
+    nb_comp = 10000
+    if len(sys.argv) >= 2:
+        nb_comp = int(sys.argv[1])
+    nb_trans = 5
+    if len(sys.argv) >= 3:
+        nb_trans = int(sys.argv[2])
+
+    writer = csv.DictWriter(sys.stderr, fieldnames=['structure', 'nb_comp', 'nb_trans', 'time_s', 'memory_mb'])
+    writer.writeheader()
+    for shared in [False, True]:
+        duration = time_test(nb_comp, nb_trans, shared)
+        memory = memory_test(nb_comp, nb_trans, shared)
+        writer.writerow({
+            'structure': "shared" if shared else "per_instance",
+            'nb_comp': nb_comp,
+            'nb_trans': nb_trans,
+            'time_s': round(duration, 3),
+            'memory_mb': round(memory / 1024 / 1024, 2)
+        })
@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+
+"""
+Memory retained per component (in bytes) for the ParallelTransitionsComponent of
+tests/parallel_test/assembly.py with 1, 10 and 100 parallel transitions, with the structure
+shared through ComponentTemplate and rebuilt for each instance.
+
+usage (from the root of the repository):
+    python3 -m examples.scalability.bench_memory_per_component (<number of components>)
+"""
+
+import csv, sys, tracemalloc
+
+from concerto.component_template import ComponentTemplate
+from tests.parallel_test.assembly import ParallelTransitionsComponent
+
+
+NB_PARALLEL_TRANSITIONS = [1, 10, 100]
+
+
+def bytes_per_component(nb_comp: int, nb_parallel_transitions: int, shared: bool) -> float:
+    ComponentTemplate.clear_cache()
+    tracemalloc.start()
+    components = []
+    for i in range(nb_comp):
+        if not shared:
+            ComponentTemplate.clear_cache()
+        component = ParallelTransitionsComponent(nb_parallel_transitions)
+        component.set_name("user%d" % i)
+        components.append(component)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del components
+    return current / nb_comp
+
+
+if __name__ == '__main__':
+    nb_comp = 1000
+    if len(sys.argv) >= 2:
+        nb_comp = int(sys.argv[1])
+
+    writer = csv.DictWriter(sys.stderr, fieldnames=['structure', 'nb_comp', 'nb_parallel_transitions', 'bytes_per_component'])
+    writer.writeheader()
+    for shared in [False, True]:
+        for nb_parallel_transitions in NB_PARALLEL_TRANSITIONS:
+            writer.writerow({
+                'structure': "shared" if shared else "per_instance",
+                'nb_comp': nb_comp,
+                'nb_parallel_transitions': nb_parallel_transitions,
+                'bytes_per_component': round(bytes_per_component(nb_comp, nb_parallel_transitions, shared))
+            })
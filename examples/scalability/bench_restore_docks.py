@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+
+"""
+Restore time (in milliseconds) of the active docks of a component with N parallel transitions, all their docks
+being active in the saved state, by the lookup of assembly_config (index of the docks of the template) and by
+the previous lookup (scan of all the transitions for each saved dock). The template is rebuilt before each
+restore, as at the wake up of an assembly, so the time of the index is included.
+
+usage (from the root of the repository):
+    python3 -m examples.scalability.bench_restore_docks (<max number of transitions> (<number of repetitions>))
+"""
+
+import csv, sys, time
+
+from concerto import assembly_config
+from concerto.component_template import ComponentTemplate
+from examples.scalability.user_Ntrans import UserNTrans
+
+COMPONENT_NAME = "user"
+
+
+class BenchAssembly:
+    """
+    Stand-in of the assembly: only what _restore_component writes
+    """
+
+    def __init__(self):
+        self.component_connections = {}
+
+
+def build_component(nb_trans: int) -> UserNTrans:
+    ComponentTemplate.clear_cache()
+    component = UserNTrans(nb_trans)
+    component.set_name(COMPONENT_NAME)
+    return component
+
+
+def build_saved_component(nb_trans: int):
+    """
+    Saved state of the component with the docks of all the transitions active
+    """
+    component = build_component(nb_trans)
+    for transition in component.st_transitions.values():
+        if transition.src_dock is not None:
+            component.act_odocks.add(transition.src_dock)
+        component.act_idocks.add(transition.dst_dock)
+    comp_values = assembly_config.build_component_state(component)
+    comp_values['act_behavior'] = None
+    return comp_values
+
+
+def scan_restore_docks(component, comp_values):
+    """
+    Previous lookup of the docks in assembly_config._restore_component
+    """
+    for odock_id in comp_values['act_odocks']:
+        for transition in component.st_transitions.values():
+            if transition.src_dock is not None and transition.src_dock.obj_id == odock_id:
+                component.act_odocks.add(transition.src_dock)
+    for idock_id in comp_values['act_idocks']:
+        for transition in component.st_transitions.values():
+            if transition.dst_dock.obj_id == idock_id:
+                component.act_idocks.add(transition.dst_dock)
+
+
+def index_restore_docks(component, comp_values):
+    assembly_config._restore_component(BenchAssembly(), comp_values, [COMPONENT_NAME], {COMPONENT_NAME: component})
+
+
+def time_restore(restore_function, nb_trans: int, nb_repetitions: int) -> float:
+    comp_values = build_saved_component(nb_trans)
+    total = 0.
+    for _ in range(nb_repetitions):
+        component = build_component(nb_trans)
+        start = time.perf_counter()
+        restore_function(component, comp_values)
+        total += time.perf_counter() - start
+        assert len(component.act_odocks) == len(comp_values['act_odocks'])
+    return total / nb_repetitions * 1000
+
+
+if __name__ == '__main__':
+    max_nb_trans = 1000
+    if len(sys.argv) >= 2:
+        max_nb_trans = int(sys.argv[1])
+    nb_repetitions = 5
+    if len(sys.argv) >= 3:
+        nb_repetitions = int(sys.argv[2])
+
+    writer = csv.DictWriter(sys.stderr, fieldnames=['lookup', 'nb_trans', 'restore_ms'])
+    writer.writeheader()
+    for nb_trans in [max_nb_trans // 8, max_nb_trans // 4, max_nb_trans // 2, max_nb_trans]:
+        for lookup, restore_function in [("scan", scan_restore_docks), ("index", index_restore_docks)]:
+            writer.writerow({
+                'lookup': lookup,
+                'nb_trans': nb_trans,
+                'restore_ms': round(time_restore(restore_function, nb_trans, nb_repetitions), 3)
+            })
@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+
+"""
+Size (in bytes), encoding and decoding time (in milliseconds) of the checkpoint of the saved state of an assembly
+of <number of components> components, for each codec of snapshot_codec (the zstd ones only if the zstandard
+package is installed).
+
+usage (from the root of the repository):
+    python3 -m examples.scalability.bench_snapshot_codec (<number of components> (<number of repetitions>))
+"""
+
+import csv, sys, time
+
+from concerto import assembly_config, snapshot_codec
+from examples.scalability.user_Ntrans import UserNTrans
+
+NB_TRANS = 5
+
+
+def build_state(nb_comp: int):
+    """
+    Saved state of an assembly of <nb_comp> components each in the middle of its deploy
+    """
+    components = {}
+    for i in range(nb_comp):
+        component = UserNTrans(NB_TRANS)
+        component.set_name("user%d" % i)
+        component.act_places.add(component.st_places['configured'])
+        for transition in component.st_transitions.values():
+            if transition.src_dock is not None and transition.src_dock.get_place().get_name() == 'configured':
+                component.act_odocks.add(transition.src_dock)
+        components[component.get_name()] = assembly_config.build_component_state(component)
+    return {
+        "schema_version": assembly_config.SNAPSHOT_SCHEMA_VERSION,
+        "components": components,
+        "connections": sorted("user%d-service/provider-service" % i for i in range(nb_comp)),
+        "act_components": sorted(components.keys()),
+        "global_nb_instructions_done": {"deploy": nb_comp},
+        "waiting_rate": 1,
+        "components_states": {},
+        "remote_confirmations": [],
+    }
+
+
+def get_codecs_names():
+    compressions = [""] + [
+        compression for compression in snapshot_codec.COMPRESSIONS
+        if compression != snapshot_codec.ZSTD or snapshot_codec.zstandard is not None
+    ]
+    return [encoding if compression == "" else f"{encoding}+{compression}"
+            for compression in compressions for encoding in snapshot_codec.ENCODINGS]
+
+
+if __name__ == '__main__':
+    nb_comp = 1000
+    if len(sys.argv) >= 2:
+        nb_comp = int(sys.argv[1])
+    nb_repetitions = 10
+    if len(sys.argv) >= 3:
+        nb_repetitions = int(sys.argv[2])
+
+    state = build_state(nb_comp)
+    writer = csv.DictWriter(sys.stderr, fieldnames=['codec', 'nb_comp', 'size_bytes', 'save_ms', 'load_ms'])
+    writer.writeheader()
+    for codec_name in get_codecs_names():
+        codec = snapshot_codec.SnapshotCodec(codec_name)
+        start = time.perf_counter()
+        for _ in range(nb_repetitions):
+            data = codec.dumps(state)
+        save_time = (time.perf_counter() - start) / nb_repetitions
+        start = time.perf_counter()
+        for _ in range(nb_repetitions):
+            loaded_state, loaded_codec_name = snapshot_codec.loads(data)
+        load_time = (time.perf_counter() - start) / nb_repetitions
+        assert loaded_state == state and loaded_codec_name == codec_name
+        writer.writerow({
+            'codec': codec_name,
+            'nb_comp': nb_comp,
+            'size_bytes': len(data),
+            'save_ms': round(save_time * 1000, 3),
+            'load_ms': round(load_time * 1000, 3)
+        })
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+
+"""
+Time (in nanoseconds per event) of the instrumentation of time_logger, and size of its files (in bytes), with the
+dict backend (YAML file per sleep round) and the buffered backend (CSV file of the events), for <number of rounds>
+sleep rounds of <number of timestamps> timestamps (a start and an end event each).
+
+usage (from the root of the repository):
+    python3 -m examples.scalability.bench_time_logger (<number of timestamps> (<number of rounds>))
+"""
+
+import csv, os, sys, tempfile, time
+
+from concerto import global_variables, time_logger
+from concerto.time_logger import TimestampPeriod, TimestampType
+
+ASSEMBLY_NAME = "bench_assembly"
+
+
+def run_round(nb_timestamps: int) -> float:
+    """
+    :return: time spent logging the events, in seconds
+    """
+    start = time.perf_counter()
+    for i in range(nb_timestamps):
+        time_logger.log_time_value(TimestampType.BEHAVIOR, TimestampPeriod.START, "deploy%d" % i, "server")
+        time_logger.log_time_value(TimestampType.BEHAVIOR, TimestampPeriod.END, "deploy%d" % i, "server")
+    return time.perf_counter() - start
+
+
+def get_files_size(dir_path: str) -> int:
+    return sum(os.path.getsize(os.path.join(dir_path, file_name)) for file_name in os.listdir(dir_path))
+
+
+if __name__ == '__main__':
+    nb_timestamps = 10000
+    if len(sys.argv) >= 2:
+        nb_timestamps = int(sys.argv[1])
+    nb_rounds = 10
+    if len(sys.argv) >= 3:
+        nb_rounds = int(sys.argv[2])
+
+    time_logger.init_time_log_dir(ASSEMBLY_NAME)
+    global_variables.reconfiguration_name = "bench"
+    writer = csv.DictWriter(sys.stderr, fieldnames=['backend', 'nb_timestamps', 'nb_rounds', 'ns_per_event', 'dump_ms', 'files_bytes'])
+    writer.writeheader()
+    for backend in [time_logger.DICT_BACKEND, time_logger.BUFFERED_BACKEND]:
+        global_variables.execution_expe_dir = tempfile.mkdtemp()
+        time_logger.set_backend(backend)
+        logging_time = 0.
+        dump_time = 0.
+        for _ in range(nb_rounds):
+            # A new process at each round
+            time_logger.all_timestamps_dict.clear()
+            time_logger.set_backend(time_logger.DICT_BACKEND)
+            time_logger.set_backend(backend)
+            logging_time += run_round(nb_timestamps)
+            start = time.perf_counter()
+            time_logger.register_end_all_time_values()
+            time_logger.register_timestamps_in_file()
+            dump_time += time.perf_counter() - start
+        writer.writerow({
+            'backend': backend,
+            'nb_timestamps': nb_timestamps,
+            'nb_rounds': nb_rounds,
+            'ns_per_event': round(logging_time / (2 * nb_timestamps * nb_rounds) * 1e9),
+            'dump_ms': round(dump_time / nb_rounds * 1000, 3),
+            'files_bytes': get_files_size(f"{global_variables.execution_expe_dir}/{global_variables.reconfiguration_name}")
+        })
+    time_logger.set_backend(time_logger.DICT_BACKEND)
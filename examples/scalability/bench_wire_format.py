@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+
+"""
+Payload size (in bytes) and encoding/decoding time (in nanoseconds per message) of the messages exchanged
+between the assemblies, in the text format and in the binary format of wire_format:
+- the single values put on Zenoh or answered by the REST endpoints (nb_users, refusing, component state,
+connection sync)
+- the answer of the REST /batch endpoint for <batch size> lookups (JSON in the text format)
+
+usage (from the root of the repository):
+    python3 -m examples.scalability.bench_wire_format (<batch size> (<number of repetitions>))
+"""
+
+import csv, json, sys, timeit
+
+from concerto import wire_format
+
+MESSAGES = {
+    "nb_users": (12, str(12)),
+    "refusing": (True, str(int(True))),
+    "component_state": ("INACTIVE", "INACTIVE"),
+    "conn_sync": ("DECONN", "DECONN"),
+}
+
+
+def text_encode(text_value):
+    return text_value.encode("utf-8")
+
+
+def text_decode(payload: bytes):
+    return payload.decode("utf-8")
+
+
+def text_encode_batch(values):
+    return json.dumps({"results": [str(value) for value in values]}).encode()
+
+
+def text_decode_batch(payload: bytes):
+    return json.loads(payload)["results"]
+
+
+def time_ns(function, argument, nb_repetitions: int) -> float:
+    return timeit.timeit(lambda: function(argument), number=nb_repetitions) / nb_repetitions * 1e9
+
+
+if __name__ == '__main__':
+    batch_size = 100
+    if len(sys.argv) >= 2:
+        batch_size = int(sys.argv[1])
+    nb_repetitions = 100000
+    if len(sys.argv) >= 3:
+        nb_repetitions = int(sys.argv[2])
+
+    writer = csv.DictWriter(sys.stderr, fieldnames=['message', 'format', 'payload_bytes', 'encode_ns', 'decode_ns'])
+    writer.writeheader()
+    for message, (value, text_value) in MESSAGES.items():
+        text_payload = text_encode(text_value)
+        binary_payload = wire_format.encode_value(value)
+        writer.writerow({
+            'message': message,
+            'format': wire_format.TEXT,
+            'payload_bytes': len(text_payload),
+            'encode_ns': round(time_ns(text_encode, text_value, nb_repetitions)),
+            'decode_ns': round(time_ns(wire_format.decode, text_payload, nb_repetitions))
+        })
+        writer.writerow({
+            'message': message,
+            'format': wire_format.BINARY,
+            'payload_bytes': len(binary_payload),
+            'encode_ns': round(time_ns(wire_format.encode_value, value, nb_repetitions)),
+            'decode_ns': round(time_ns(wire_format.decode, binary_payload, nb_repetitions))
+        })
+
+    # Answer of /batch: lookups of nb_users, refusing states and connections syncs
+    batch = [[3, False, True][i % 3] for i in range(batch_size)]
+    text_payload = text_encode_batch(batch)
+    binary_payload = wire_format.encode_values(batch)
+    nb_batch_repetitions = max(1, nb_repetitions // batch_size)
+    writer.writerow({
+        'message': "batch_%d" % batch_size,
+        'format': wire_format.TEXT,
+        'payload_bytes': len(text_payload),
+        'encode_ns': round(time_ns(text_encode_batch, batch, nb_batch_repetitions)),
+        'decode_ns': round(time_ns(text_decode_batch, text_payload, nb_batch_repetitions))
+    })
+    writer.writerow({
+        'message': "batch_%d" % batch_size,
+        'format': wire_format.BINARY,
+        'payload_bytes': len(binary_payload),
+        'encode_ns': round(time_ns(wire_format.encode_values, batch, nb_batch_repetitions)),
+        'decode_ns': round(time_ns(wire_format.decode_values, binary_payload, nb_batch_repetitions))
+    })
@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+
+"""
+Requests per second and latency of the exposed API of an assembly, with the Flask development server and
+with the asyncio server of api_server. The server exposes a stand-in assembly of <nb dependencies> dependencies,
+<nb clients> client processes query get_nb_dependency_users on random dependencies through keep-alive sessions
+(as rest_communication does).
+
+usage (from the root of the repository):
+    python3 -m examples.synchronous_communication.bench_api_server (<nb clients> (<nb requests per client> (<nb dependencies>)))
+"""
+
+import csv, random, sys, tempfile, time
+from multiprocessing import Pool, Process
+
+import requests
+
+from concerto import exposed_api, global_variables
+from concerto.api_snapshot import ApiSnapshot
+
+PORT = 5700
+ASSEMBLY_NAME = "bench_assembly"
+
+
+class BenchAssembly:
+    """
+    Stand-in of the assembly: only what the exposed API reads
+    """
+
+    def __init__(self, nb_dependencies: int):
+        self.remote_confirmations = set()
+        self.api_snapshot = ApiSnapshot(
+            {("comp%d" % i, "dep"): (1, False, None) for i in range(nb_dependencies)},
+            {}
+        )
+
+    def get_name(self):
+        return ASSEMBLY_NAME
+
+    def get_api_snapshot(self):
+        return self.api_snapshot
+
+    def publish_api_snapshot(self):
+        pass
+
+    def is_component_idle(self, component_name: str):
+        return False
+
+    def notify_semantics_event(self):
+        pass
+
+
+def run_server(server_type: str, nb_dependencies: int):
+    exposed_api.set_api_server_type(server_type)
+    assembly = BenchAssembly(nb_dependencies)
+    if server_type == exposed_api.API_SERVER_FLASK:
+        exposed_api.run_flask_api(assembly)
+    else:
+        exposed_api.api_server.ApiServer(assembly, PORT).run()
+
+
+def run_client(args):
+    nb_requests, nb_dependencies = args
+    session = requests.Session()
+    latencies = []
+    for _ in range(nb_requests):
+        url = f"http://localhost:{PORT}/get_nb_dependency_users/comp{random.randrange(nb_dependencies)}/dep"
+        request_start = time.perf_counter()
+        session.get(url).raise_for_status()
+        latencies.append(time.perf_counter() - request_start)
+    session.close()
+    return latencies
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def wait_server_up():
+    while True:
+        try:
+            requests.get(f"http://localhost:{PORT}/get_nb_dependency_users/comp0/dep")
+            return
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+
+
+if __name__ == '__main__':
+    nb_clients = 8
+    if len(sys.argv) >= 2:
+        nb_clients = int(sys.argv[1])
+    nb_requests = 2000
+    if len(sys.argv) >= 3:
+        nb_requests = int(sys.argv[2])
+    nb_dependencies = 1000
+    if len(sys.argv) >= 4:
+        nb_dependencies = int(sys.argv[3])
+
+    global_variables.execution_expe_dir = tempfile.mkdtemp()
+    with open(global_variables.get_inventory_absolute_path(), "w") as f:
+        f.write(f"{ASSEMBLY_NAME}: localhost:{PORT}\n")
+
+    writer = csv.DictWriter(sys.stderr, fieldnames=['server', 'nb_clients', 'nb_requests', 'requests_per_s', 'p50_ms', 'p99_ms'])
+    writer.writeheader()
+    for server_type in [exposed_api.API_SERVER_FLASK, exposed_api.API_SERVER_ASYNCIO]:
+        server = Process(target=run_server, args=(server_type, nb_dependencies), daemon=True)
+        server.start()
+        wait_server_up()
+        with Pool(nb_clients) as pool:
+            start = time.perf_counter()
+            latencies = [l for client_latencies in pool.map(run_client, [(nb_requests, nb_dependencies)] * nb_clients)
+                         for l in client_latencies]
+            duration = time.perf_counter() - start
+        server.terminate()
+        server.join()
+        writer.writerow({
+            'server': server_type,
+            'nb_clients': nb_clients,
+            'nb_requests': len(latencies),
+            'requests_per_s': round(len(latencies) / duration),
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3)
+        })
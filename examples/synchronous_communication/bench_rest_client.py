@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+
+"""
+Requests per second and latency of the synchronous (REST) client of rest_communication, against a local
+stand-in of <nb nodes> assemblies: one process per node running a minimal HTTP server that answers the
+endpoints of exposed_api with constant values.
+
+Two clients are compared on the lookups made by a synchronous wait_all (get_remote_component_state on each
+node, in a loop):
+- legacy: requests.head pre-check then requests.get, a new connection for each request (previous client)
+- pooled: rest_communication, one keep-alive session per node and no pre-check
+
+usage (from the root of the repository):
+    python3 -m examples.synchronous_communication.bench_rest_client (<nb nodes> (<nb rounds>))
+"""
+
+import csv, sys, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Process
+
+import requests
+
+from concerto import rest_communication
+
+BASE_PORT = 5600
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # headers and body are written separately
+
+    def _answer(self, body: str):
+        encoded = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(encoded)
+
+    def do_HEAD(self):
+        self._answer("")
+
+    def do_GET(self):
+        if self.path.startswith("/get_remote_component_state"):
+            self._answer("ACTIVE")
+        elif self.path.startswith("/get_nb_dependency_users"):
+            self._answer("1")
+        else:
+            self._answer("False")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_stand_in(port: int):
+    ThreadingHTTPServer(("localhost", port), StandInHandler).serve_forever()
+
+
+def legacy_get(url, params=None):
+    requests.head(url)
+    return requests.get(url, params=params).text
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run_client(nb_nodes: int, nb_rounds: int, pooled: bool):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(nb_rounds):
+        for i in range(nb_nodes):
+            request_start = time.perf_counter()
+            if pooled:
+                rest_communication.get_remote_component_state("node%d" % i, "bench")
+            else:
+                legacy_get(f"http://localhost:{BASE_PORT + i}/get_remote_component_state/node{i}",
+                           params={"calling_assembly_name": "bench"})
+            latencies.append(time.perf_counter() - request_start)
+    duration = time.perf_counter() - start
+    return len(latencies) / duration, percentile(latencies, 0.5), percentile(latencies, 0.99)
+
+
+if __name__ == '__main__':
+    nb_nodes = 12
+    if len(sys.argv) >= 2:
+        nb_nodes = int(sys.argv[1])
+    nb_rounds = 200
+    if len(sys.argv) >= 3:
+        nb_rounds = int(sys.argv[2])
+
+    servers = [Process(target=run_stand_in, args=(BASE_PORT + i,), daemon=True) for i in range(nb_nodes)]
+    for server in servers:
+        server.start()
+    for i in range(nb_nodes):
+        rest_communication.inventory["node%d" % i] = f"localhost:{BASE_PORT + i}"
+    time.sleep(1)  # Servers startup
+
+    writer = csv.DictWriter(sys.stderr, fieldnames=['client', 'nb_nodes', 'nb_rounds', 'requests_per_s', 'p50_ms', 'p99_ms'])
+    writer.writeheader()
+    for pooled in [False, True]:
+        requests_per_s, p50, p99 = run_client(nb_nodes, nb_rounds, pooled)
+        writer.writerow({
+            'client': "pooled" if pooled else "legacy",
+            'nb_nodes': nb_nodes,
+            'nb_rounds': nb_rounds,
+            'requests_per_s': round(requests_per_s),
+            'p50_ms': round(p50 * 1000, 3),
+            'p99_ms': round(p99 * 1000, 3)
+        })
+
+    rest_communication.close_sessions()
+    for server in servers:
+        server.terminate()
@@ -0,0 +1,45 @@
+import json
+import os
+import tempfile
+import unittest
+
+try:
+    from concerto import global_variables, time_logger
+    from concerto.assembly import Assembly
+    from concerto.global_variables import CONCERTO_D_CENTRAL
+except ImportError as e:
+    raise unittest.SkipTest(f"the dependencies of concerto are not installed: {e}")
+
+
+class TestCentralAssembly(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.previous_globals = (global_variables.execution_expe_dir, global_variables.concerto_d_version,
+                                 global_variables.reconfiguration_name)
+        global_variables.execution_expe_dir = self.directory.name
+        # The timestamps of the assembly (loading of the state) are registered once per sleep round
+        time_logger.all_timestamps_dict.clear()
+        # Uptime and duration of the node of the assembly for each round
+        self.uptimes_file_path = os.path.join(self.directory.name, "uptimes.json")
+        with open(self.uptimes_file_path, "w") as f:
+            json.dump([[[0, 60]]], f)
+
+    def tearDown(self):
+        (global_variables.execution_expe_dir, global_variables.concerto_d_version,
+         global_variables.reconfiguration_name) = self.previous_globals
+        self.directory.cleanup()
+
+    def build_assembly(self):
+        return Assembly("server", {}, [], {}, 1., CONCERTO_D_CENTRAL, 1, "reconf", self.uptimes_file_path)
+
+    def test_dirty_set_disabled(self):
+        assembly = self.build_assembly()
+        self.assertFalse(assembly.scheduler.dirty_set_enabled)
+
+    def test_semantics_loop_polls(self):
+        assembly = self.build_assembly()
+        waits = []
+        assembly.scheduler.wait_next_iteration = lambda made_progress, needs_polling=True, deadline=None: waits.append(needs_polling)
+        assembly._wait_next_iteration(False)
+        self.assertEqual(waits, [True])
@@ -0,0 +1,83 @@
+import types
+import unittest
+
+try:
+    from concerto import assembly_config
+    from concerto.component import Component
+    from concerto.dependency import DepType
+    from concerto.utility import empty_transition
+except ImportError as e:
+    raise unittest.SkipTest(f"the dependencies of concerto are not installed: {e}")
+
+
+class Server(Component):
+
+    def create(self):
+        self.places = ["undeployed", "running"]
+        self.initial_place = "undeployed"
+        self.transitions = {"deploy": ("undeployed", "running", "deploy", 0, empty_transition)}
+        self.dependencies = {"service": (DepType.PROVIDE, ["running"])}
+
+
+def build_full_model_state():
+    """
+    State saved with the schema version 1 (Assembly.to_json) while the transition deploy of server was running
+    """
+    return {
+        "components": {
+            "server": {
+                "obj_id": "server",
+                "component_type": "Server",
+                "initialized": True,
+                "st_dependencies": {
+                    "server-service": {"dependency_name": "service", "is_refusing": False, "nb_users": 0, "data": ""},
+                },
+                "st_groups": {},
+                "act_places": [],
+                "act_transitions": [{"obj_id": "server_deploy", "transition_name": "deploy"}],
+                "act_odocks": [{"obj_id": "server_undeployed_deploy", "dock_type": 1}],
+                "act_idocks": [{"obj_id": "server_running_deploy", "dock_type": 0}],
+                "act_behavior": "deploy",
+                "queued_behaviors": [],
+                "visited_places": [{"obj_id": "server_undeployed", "place_name": "undeployed"}],
+                "round_reconf": 0,
+            },
+        },
+        "connections": {},
+        "act_components": ["server"],
+        "global_nb_instructions_done": {"reconf": 2},
+        "waiting_rate": 1.,
+        "components_states": {},
+        "remote_confirmations": [],
+    }
+
+
+class TestUpgradeFromFullModel(unittest.TestCase):
+
+    def test_docks_ids_are_not_prefixed_by_the_component(self):
+        state = assembly_config._upgrade_from_full_model(build_full_model_state())
+        self.assertEqual(state["schema_version"], assembly_config.SNAPSHOT_SCHEMA_VERSION)
+        component_state = state["components"]["server"]
+        self.assertEqual(component_state["act_odocks"], ["undeployed_deploy"])
+        self.assertEqual(component_state["act_idocks"], ["running_deploy"])
+        self.assertEqual(component_state["visited_places"], ["undeployed"])
+
+    def test_restore_of_an_upgraded_state_keeps_the_active_docks(self):
+        state = assembly_config._upgrade_from_full_model(build_full_model_state())
+        component = Server()
+        component.set_name("server")
+        assembly = types.SimpleNamespace(component_connections={})
+        assembly_config._restore_component(assembly, state["components"]["server"], ["server"], {"server": component})
+        transition = component.st_transitions["deploy"]
+        self.assertEqual(component.act_transitions, {transition})
+        self.assertEqual(component.act_odocks, {transition.src_dock})
+        self.assertEqual(component.act_idocks, {transition.dst_dock})
+
+    def test_restore_of_an_unknown_dock(self):
+        state = assembly_config._upgrade_from_full_model(build_full_model_state())
+        state["components"]["server"]["act_idocks"] = ["stopped_deploy"]
+        component = Server()
+        component.set_name("server")
+        assembly = types.SimpleNamespace(component_connections={})
+        with self.assertRaises(Exception):
+            assembly_config._restore_component(assembly, state["components"]["server"], ["server"], {"server": component})
@@ -0,0 +1,67 @@
+import json
+import time
+import unittest
+
+from concerto.communication_cache import CommunicationCache, SERVE_STALE, DROP_STALE
+
+KEY = ("get_nb_dependency_users", "server", "service")
+
+
+class TestCommunicationCache(unittest.TestCase):
+
+    def build_cache(self, age: float, **policy) -> CommunicationCache:
+        """
+        :return: a cache with the value "2" of KEY stored <age> seconds ago
+        """
+        cache = CommunicationCache(**policy)
+        cache.load_json([[list(KEY), "2", time.time() - age]])
+        return cache
+
+    def test_fallback_without_ttl(self):
+        cache = self.build_cache(3600.)
+        self.assertEqual(cache.get_fallback(KEY, -1), "2")
+        self.assertEqual(cache.get_stats()["nb_fallback_hits"], 1)
+
+    def test_fallback_without_entry(self):
+        cache = CommunicationCache()
+        self.assertEqual(cache.get_fallback(KEY, -1), -1)
+        self.assertEqual(cache.get_stats()["nb_misses"], 1)
+
+    def test_stale_entry_served(self):
+        cache = self.build_cache(10., ttl=5., stale_policy=SERVE_STALE)
+        self.assertEqual(cache.get_fallback(KEY, -1), "2")
+        self.assertEqual(cache.get_stats()["nb_stale_hits"], 1)
+
+    def test_stale_entry_dropped(self):
+        cache = self.build_cache(10., ttl=5., stale_policy=DROP_STALE)
+        self.assertEqual(cache.get_fallback(KEY, -1), -1)
+        self.assertNotIn(KEY, cache)
+
+    def test_entry_younger_than_the_ttl(self):
+        cache = self.build_cache(1., ttl=5., stale_policy=DROP_STALE)
+        self.assertEqual(cache.get_fallback(KEY, -1), "2")
+
+    def test_fresh_entry_used_without_request(self):
+        cache = self.build_cache(1., max_age_without_request=5.)
+        self.assertEqual(cache.get_fresh(KEY), "2")
+        self.assertIs(self.build_cache(10., max_age_without_request=5.).get_fresh(KEY), CommunicationCache.MISSING)
+        self.assertIs(self.build_cache(0.).get_fresh(KEY), CommunicationCache.MISSING)
+
+    def test_unknown_stale_policy(self):
+        with self.assertRaises(Exception):
+            CommunicationCache(stale_policy="serve")
+
+    def test_remove_if(self):
+        cache = CommunicationCache()
+        cache.put(KEY, "2")
+        cache.put(("get_remote_component_state", "server"), "ACTIVE")
+        cache.remove_if(lambda key: key[0] == "get_remote_component_state")
+        self.assertEqual(len(cache), 1)
+        self.assertIn(KEY, cache)
+
+    def test_json_round_trip(self):
+        cache = CommunicationCache()
+        cache.put(KEY, "2")
+        loaded_cache = CommunicationCache()
+        loaded_cache.load_json(json.loads(json.dumps(cache.to_json())))
+        self.assertEqual(loaded_cache.to_json(), cache.to_json())
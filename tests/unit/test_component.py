@@ -0,0 +1,146 @@
+import threading
+import time
+import unittest
+
+try:
+    from concerto import time_logger
+    from concerto.component import Component
+    from concerto.dependency import DepType
+    from concerto.transition_executor import TransitionExecutor, TransitionEventLoop
+    from concerto.utility import empty_transition
+except ImportError as e:
+    raise unittest.SkipTest(f"the dependencies of concerto are not installed: {e}")
+
+
+class DeclaredServer(Component):
+
+    def create(self):
+        self.places = ["undeployed", "running"]
+        self.initial_place = "undeployed"
+        self.transitions = {"deploy": ("undeployed", "running", "deploy", 0, empty_transition)}
+        self.dependencies = {"service": (DepType.PROVIDE, ["running"])}
+
+
+class BuiltServer(Component):
+
+    def create(self):
+        self.add_places(["undeployed", "running"], initial="undeployed")
+        self.add_transition("deploy", "undeployed", "running", "deploy", 0, empty_transition)
+        self.add_dependency("service", DepType.PROVIDE, ["running"])
+
+
+class TestComponent(unittest.TestCase):
+
+    def test_instances_share_the_template(self):
+        first, second = DeclaredServer(), DeclaredServer()
+        self.assertIs(first.template, second.template)
+        self.assertIs(first.st_transitions["deploy"], second.st_transitions["deploy"])
+        self.assertIsNot(first.get_dependency("service"), second.get_dependency("service"))
+
+    def test_builder_methods_extend_the_declaration(self):
+        component = BuiltServer()
+        self.assertEqual(sorted(component.st_places), ["running", "undeployed"])
+        self.assertEqual(sorted(component.st_transitions), ["_init", "deploy"])
+        self.assertEqual(component.place_dependencies["running"], [component.get_dependency("service")])
+
+    def test_builder_method_after_create(self):
+        component = DeclaredServer()
+        template = component.template
+        component.add_place("stopped")
+        self.assertIn("stopped", component.st_places)
+        self.assertIsNot(component.template, template)
+        self.assertNotIn("stopped", DeclaredServer().st_places)
+
+    def test_builder_method_after_init(self):
+        component = DeclaredServer()
+        component.init()
+        with self.assertRaises(Exception):
+            component.add_place("stopped")
+
+    def test_name_declared_twice(self):
+        component = DeclaredServer()
+        with self.assertRaises(Exception):
+            component.add_transition("deploy", "undeployed", "running", "deploy", 0, empty_transition)
+
+    def test_dependencies_mappings_are_cached(self):
+        component = DeclaredServer()
+        self.assertIs(component.place_dependencies, component.place_dependencies)
+        self.assertIs(component.trans_dependencies, component.trans_dependencies)
+        self.assertIs(component.group_dependencies, component.group_dependencies)
+        self.assertIs(component.place_groups, component.place_groups)
+
+
+class AssemblyStub:
+    """
+    What the components use of their assembly to run their transitions
+    """
+
+    def __init__(self):
+        self.transition_executor = TransitionExecutor()
+        self.transition_event_loop = TransitionEventLoop()
+        self.semantics_profiler = None
+        self.ready_components = []
+        self.errors = []
+
+    def mark_component_ready(self, component_name: str):
+        self.ready_components.append(component_name)
+
+    def thread_safe_report_error(self, component, transition, error: str):
+        self.errors.append(error)
+
+
+class BlockingServer(Component):
+
+    def __init__(self):
+        self.can_end = threading.Event()
+        super().__init__()
+
+    def create(self):
+        self.places = ["undeployed", "running"]
+        self.initial_place = "undeployed"
+        self.transitions = {"deploy": ("undeployed", "running", "deploy", 0, self.can_end.wait)}
+
+
+class TestCompletionQueue(unittest.TestCase):
+
+    def setUp(self):
+        time_logger.all_timestamps_dict.clear()
+        self.assembly = AssemblyStub()
+        self.component = BlockingServer()
+        self.component.set_name("server")
+        self.component.set_assembly(self.assembly)
+
+    def tearDown(self):
+        self.component.can_end.set()
+        self.assembly.transition_executor.shutdown(wait=True)
+        self.assembly.transition_event_loop.shutdown()
+
+    def run_semantics(self, nb_iterations: int):
+        # As the assembly, the component is not evaluated anymore once idle
+        for _ in range(nb_iterations):
+            idle, _, _, _ = self.component.semantics()
+            if idle:
+                return
+
+    def wait_ready(self, timeout: float = 5.):
+        end = time.monotonic() + timeout
+        while not self.assembly.ready_components and time.monotonic() < end:
+            time.sleep(0.01)
+
+    def test_transition_ended_from_the_queue(self):
+        self.run_semantics(3)
+        self.component.queue_behavior("deploy")
+        self.run_semantics(3)
+        deploy = self.component.st_transitions["deploy"]
+        self.assertEqual(self.component.act_transitions, {deploy})
+        self.assertTrue(self.component.completed_transitions.empty())
+
+        self.component.can_end.set()
+        self.wait_ready()
+        self.assertEqual(self.assembly.ready_components, ["server"])
+        self.assertFalse(self.component.completed_transitions.empty())
+        self.run_semantics(3)
+        self.assertEqual(self.component.act_transitions, set())
+        self.assertEqual(self.component.act_places, {self.component.st_places["running"]})
+        self.assertTrue(self.component.completed_transitions.empty())
+        self.assertEqual(self.assembly.errors, [])
@@ -0,0 +1,110 @@
+import unittest
+
+import requests
+
+from concerto import rest_communication
+
+HOST = "10.0.0.1:5000"
+
+
+class FakeResponse:
+
+    def __init__(self, text="", results=None):
+        self.headers = {}
+        self.text = text
+        self.content = text.encode()
+        self._results = results
+
+    def json(self):
+        return {"results": self._results}
+
+
+class FakeSession:
+    """
+    Session of a peer answering the lookups with <values>: (endpoint name, *path arguments) => result
+    """
+
+    def __init__(self, values):
+        self.values = values
+        self.is_reachable = True
+        self.get_urls = []
+        self.batches = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        if not self.is_reachable:
+            raise requests.exceptions.ConnectionError()
+        self.get_urls.append(url)
+        endpoint_name, *path_args = url.split("/", 3)[3].split("/")
+        return FakeResponse(text=self.values[(endpoint_name, *path_args)])
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        if not self.is_reachable:
+            raise requests.exceptions.ConnectionError()
+        self.batches.append(json["queries"])
+        return FakeResponse(results=[self.values[(endpoint_name, *args)] for endpoint_name, args in json["queries"]])
+
+
+class TestBatchedLookups(unittest.TestCase):
+
+    def setUp(self):
+        rest_communication._next_batch.clear()
+        rest_communication._batch_results.clear()
+        rest_communication._unreachable_hosts.clear()
+        rest_communication.communications_cache.clear()
+        rest_communication.communications_cache.set_policy()
+        rest_communication.inventory["server"] = HOST
+        self.session = FakeSession({
+            ("get_nb_dependency_users", "server", "service"): "2",
+            ("get_refusing_state", "server", "service"): "False",
+        })
+        rest_communication._sessions[HOST] = self.session
+
+    def tearDown(self):
+        rest_communication._sessions.pop(HOST, None)
+        rest_communication.inventory.pop("server", None)
+        rest_communication._next_batch.clear()
+        rest_communication._batch_results.clear()
+        rest_communication._unreachable_hosts.clear()
+        rest_communication.communications_cache.clear()
+
+    def read_server(self):
+        return (rest_communication.get_nb_dependency_users("server", "service"),
+                rest_communication.get_refusing_state("server", "service"))
+
+    def test_lookups_of_an_iteration_are_sent_in_one_batch(self):
+        self.assertEqual(self.read_server(), (2, False))
+        self.assertEqual(len(self.session.get_urls), 2)
+
+        rest_communication.send_batched_lookups()
+        self.assertEqual(len(self.session.batches), 1)
+        self.assertEqual(len(self.session.batches[0]), 2)
+        self.assertEqual(self.read_server(), (2, False))
+        self.assertEqual(len(self.session.get_urls), 2)
+
+    def test_nothing_sent_without_lookup(self):
+        rest_communication.send_batched_lookups()
+        self.assertEqual(self.session.batches, [])
+
+    def test_results_kept_until_the_lookups_are_sent_again(self):
+        self.read_server()
+        rest_communication.send_batched_lookups()
+        # Iteration without lookup of the server (between two sweeps of the scheduler)
+        rest_communication.send_batched_lookups()
+        self.assertEqual(len(self.session.batches), 1)
+        self.session.values[("get_nb_dependency_users", "server", "service")] = "3"
+        self.assertEqual(self.read_server(), (2, False))
+        self.assertEqual(len(self.session.get_urls), 2)
+
+        rest_communication.send_batched_lookups()
+        self.assertEqual(self.read_server(), (3, False))
+
+    def test_unreachable_peer_answered_from_the_cache(self):
+        self.read_server()
+        self.session.is_reachable = False
+        rest_communication.send_batched_lookups()
+        self.assertEqual(self.read_server(), (2, False))
+        self.assertEqual(len(self.session.get_urls), 2)
+
+    def test_unreachable_peer_without_cache(self):
+        self.session.is_reachable = False
+        self.assertEqual(self.read_server(), (-1, False))
@@ -0,0 +1,79 @@
+import threading
+import time
+import unittest
+
+from concerto.semantics_scheduler import SemanticsScheduler
+
+
+class TestDirtySet(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = SemanticsScheduler(polling_interval=60.)
+        self.active_components = {"server", "client", "database"}
+
+    def test_first_iteration_evaluates_every_active_component(self):
+        to_evaluate = self.scheduler.select_components_to_evaluate(self.active_components, set())
+        self.assertEqual(set(to_evaluate), self.active_components)
+
+    def test_only_the_ready_components_are_evaluated(self):
+        self.scheduler.select_components_to_evaluate(self.active_components, set())
+        self.scheduler.mark_ready("client")
+        self.scheduler.mark_ready("inactive")
+        self.assertEqual(self.scheduler.select_components_to_evaluate(self.active_components, set()), ["client"])
+        self.assertEqual(self.scheduler.select_components_to_evaluate(self.active_components, set()), [])
+        self.assertEqual(self.scheduler.last_nb_skipped_evaluations, 3)
+
+    def test_remotely_connected_components_are_swept(self):
+        self.scheduler.polling_interval = 0.
+        self.scheduler.select_components_to_evaluate(self.active_components, {"server"})
+        self.assertEqual(self.scheduler.select_components_to_evaluate(self.active_components, {"server", "remote"}), ["server"])
+
+    def test_mark_all_ready(self):
+        self.scheduler.select_components_to_evaluate(self.active_components, set())
+        self.scheduler.mark_all_ready()
+        to_evaluate = self.scheduler.select_components_to_evaluate(self.active_components, set())
+        self.assertEqual(set(to_evaluate), self.active_components)
+
+    def test_dirty_set_disabled(self):
+        self.scheduler.set_dirty_set_enabled(False)
+        for _ in range(2):
+            to_evaluate = self.scheduler.select_components_to_evaluate(self.active_components, set())
+            self.assertEqual(set(to_evaluate), self.active_components)
+
+
+class TestEventDrivenWait(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = SemanticsScheduler(polling_interval=0.05)
+
+    def measure_wait(self, made_progress, needs_polling=True, deadline=None) -> float:
+        start = time.perf_counter()
+        self.scheduler.wait_next_iteration(made_progress, needs_polling, deadline)
+        return time.perf_counter() - start
+
+    def test_no_wait_after_progress(self):
+        self.assertLess(self.measure_wait(True), 0.04)
+
+    def test_pending_event_is_not_waited(self):
+        self.scheduler.mark_ready("server")
+        self.assertLess(self.measure_wait(False), 0.04)
+        # The event was consumed
+        self.assertGreaterEqual(self.measure_wait(False), 0.04)
+
+    def test_wait_bounded_by_the_polling_interval(self):
+        self.assertGreaterEqual(self.measure_wait(False), 0.04)
+
+    def test_wait_bounded_by_the_deadline_without_polling(self):
+        self.assertGreaterEqual(self.measure_wait(False, needs_polling=False, deadline=time.time() + 0.2), 0.15)
+
+    def test_wait_woken_up_by_an_event_without_polling(self):
+        timer = threading.Timer(0.1, self.scheduler.notify)
+        timer.start()
+        try:
+            self.assertLess(self.measure_wait(False, needs_polling=False), 5.)
+        finally:
+            timer.cancel()
+
+    def test_polling_mode(self):
+        self.scheduler.set_event_driven(False)
+        self.assertGreaterEqual(self.measure_wait(True), 0.04)
@@ -0,0 +1,47 @@
+import unittest
+
+from concerto import snapshot_codec
+from concerto.snapshot_codec import SnapshotCodec
+
+STATE = {
+    "schema_version": 2,
+    "components": {"server": {"act_places": ["p1", "p2"], "initialized": True, "act_behavior": None}},
+    "waiting_rate": 1.5,
+    "remote_confirmations": [],
+}
+
+
+def get_codecs_names():
+    names = []
+    for encoding in snapshot_codec.ENCODINGS:
+        names.append(encoding)
+        for compression in snapshot_codec.COMPRESSIONS:
+            if compression == snapshot_codec.ZSTD and snapshot_codec.zstandard is None:
+                continue
+            names.append(f"{encoding}+{compression}")
+    return names
+
+
+class TestSnapshotCodec(unittest.TestCase):
+
+    def test_round_trip_of_every_codec(self):
+        for codec_name in get_codecs_names():
+            with self.subTest(codec=codec_name):
+                state, detected_codec_name = snapshot_codec.loads(SnapshotCodec(codec_name).dumps(STATE))
+                self.assertEqual(state, STATE)
+                self.assertEqual(detected_codec_name, codec_name)
+
+    def test_unknown_codec(self):
+        for codec_name in ["yaml", "json+bz2"]:
+            with self.subTest(codec=codec_name):
+                with self.assertRaises(Exception):
+                    SnapshotCodec(codec_name)
+
+    @unittest.skipIf(snapshot_codec.zstandard is not None, "zstandard is installed")
+    def test_zstd_requires_zstandard(self):
+        with self.assertRaises(Exception):
+            SnapshotCodec("json+zstd")
+
+
+if __name__ == "__main__":
+    unittest.main()
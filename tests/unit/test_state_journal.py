@@ -0,0 +1,85 @@
+import copy
+import os
+import tempfile
+import unittest
+
+from concerto import state_journal
+
+
+def build_state():
+    return {
+        "schema_version": 2,
+        "components": {
+            "server": {"act_places": ["p1"], "dependencies": {"service": {"nb_users": 0, "is_refusing": False}}},
+            "client": {"act_places": ["p0"], "queued_behaviors": ["deploy"]},
+        },
+        "global_nb_instructions_done": 3,
+    }
+
+
+class TestStateJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal_file_path = os.path.join(self.directory.name, "saved_config_test.journal")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_diff_then_apply_gives_the_new_state(self):
+        previous_state = build_state()
+        state = build_state()
+        state["components"]["server"]["dependencies"]["service"]["nb_users"] = 2
+        state["components"]["server"]["act_places"] = ["p2"]
+        del state["components"]["client"]
+        state["components"]["database"] = {"act_places": []}
+        state["remote_confirmations"] = ["assembly_1"]
+
+        changes = state_journal.diff_states(previous_state, state)
+        state_journal.apply_changes(previous_state, changes)
+        self.assertEqual(previous_state, state)
+
+    def test_no_change(self):
+        self.assertEqual(state_journal.diff_states(build_state(), build_state()), [])
+
+    def test_replay_journal_gives_back_the_saved_states(self):
+        checkpoint = build_state()
+        saved_state = copy.deepcopy(checkpoint)
+        expected_size = 0
+        for round_reconf in range(3):
+            state = copy.deepcopy(saved_state)
+            state["global_nb_instructions_done"] += 1
+            state["components"]["server"]["round_reconf"] = round_reconf
+            expected_size += state_journal.append_changes(self.journal_file_path, state_journal.diff_states(saved_state, state))
+            saved_state = state
+
+        replayed_state = copy.deepcopy(checkpoint)
+        nb_entries, journal_size = state_journal.replay_journal(self.journal_file_path, replayed_state)
+        self.assertEqual(replayed_state, saved_state)
+        self.assertEqual((nb_entries, journal_size), (3, expected_size))
+
+    def test_replay_ignores_and_removes_a_truncated_last_entry(self):
+        state = build_state()
+        changed_state = copy.deepcopy(state)
+        changed_state["global_nb_instructions_done"] = 4
+        size = state_journal.append_changes(self.journal_file_path, state_journal.diff_states(state, changed_state))
+        with open(self.journal_file_path, "a") as journal_file:
+            journal_file.write('[["set",["global_nb_instr')
+
+        nb_entries, journal_size = state_journal.replay_journal(self.journal_file_path, state)
+        self.assertEqual(state, changed_state)
+        self.assertEqual((nb_entries, journal_size), (1, size))
+        self.assertEqual(os.path.getsize(self.journal_file_path), size)
+
+    def test_replay_without_journal(self):
+        state = build_state()
+        self.assertEqual(state_journal.replay_journal(self.journal_file_path, state), (0, 0))
+        self.assertEqual(state, build_state())
+
+    def test_unknown_operation(self):
+        with self.assertRaises(Exception):
+            state_journal.apply_changes(build_state(), [["move", ["components"]]])
+
+
+if __name__ == "__main__":
+    unittest.main()
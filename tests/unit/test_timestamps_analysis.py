@@ -0,0 +1,94 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import yaml
+
+from concerto import timestamps_analysis
+from concerto.timestamps_buffer import TimestampsBuffer
+
+# Round file name => timestamps of the round
+SERVER_ROUNDS = {
+    "server_2024-01-01_00-00-00-1.0.yaml": {
+        "event_uptime": {"start": 0., "end": 10.},
+        "behavior_deploy-server": {"start": 1., "end": 5.},
+        "instruction_waitall_1": {"start": 5., "end": 8.},
+    },
+    "server_2024-01-01_00-00-20-1.0.yaml": {
+        "event_uptime": {"start": 20., "end": 25.},
+        "behavior_update-server": {"start": 21., "end": 23.},
+        # The node was killed before the end of the instruction
+        "instruction_wait_2": {"start": 23.},
+    },
+}
+
+
+class TestAggregate(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output_dir = os.path.join(self.directory.name, "analysis")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_rounds(self, reconfiguration_name, rounds):
+        reconfiguration_dir = os.path.join(self.directory.name, reconfiguration_name)
+        os.makedirs(reconfiguration_dir, exist_ok=True)
+        for file_name, timestamps in rounds.items():
+            with open(os.path.join(reconfiguration_dir, file_name), "w") as f:
+                yaml.safe_dump(timestamps, f)
+        return reconfiguration_dir
+
+    def read_nodes(self):
+        with open(os.path.join(self.output_dir, "nodes.csv"), newline="") as f:
+            return {row["node"]: row for row in csv.DictReader(f)}
+
+    def test_metrics_of_a_node(self):
+        reconfiguration_dir = self.write_rounds("deploy", SERVER_ROUNDS)
+        summary = timestamps_analysis.aggregate([reconfiguration_dir], self.output_dir, 1)
+        self.assertEqual(summary["nb_files"], 2)
+        self.assertEqual(summary["nb_intervals"], 5)
+        reconfiguration = summary["reconfigurations"]["deploy"]
+        self.assertEqual(reconfiguration["nb_nodes"], 1)
+        self.assertEqual(reconfiguration["total_time"], 25.)
+        self.assertEqual(reconfiguration["last_node"], "server")
+
+        server = self.read_nodes()["server"]
+        self.assertEqual(int(server["nb_rounds"]), 2)
+        self.assertEqual(float(server["uptime"]), 15.)
+        self.assertEqual(float(server["sleeping"]), 10.)
+        self.assertEqual(float(server["busy"]), 6.)
+        self.assertEqual(float(server["waiting"]), 3.)
+        self.assertEqual(float(server["span"]), 25.)
+
+    def test_critical_path(self):
+        reconfiguration_dir = self.write_rounds("deploy", SERVER_ROUNDS)
+        timestamps_analysis.aggregate([reconfiguration_dir], self.output_dir, 1)
+        with open(os.path.join(self.output_dir, "critical_paths.csv"), newline="") as f:
+            steps = [(row["name"], float(row["gap_before"])) for row in csv.DictReader(f)]
+        self.assertEqual(steps, [("behavior_deploy-server", 0.), ("instruction_waitall_1", 0.),
+                                 ("behavior_update-server", 13.)])
+
+    def test_node_without_finished_timestamps(self):
+        reconfiguration_dir = self.write_rounds("deploy", {
+            "server_2024-01-01_00-00-00-1.0.yaml": {"event_uptime": {"start": 1.}},
+        })
+        summary = timestamps_analysis.aggregate([reconfiguration_dir], self.output_dir, 1)
+        reconfiguration = summary["reconfigurations"]["deploy"]
+        self.assertEqual(reconfiguration["nb_nodes"], 0)
+        self.assertIsNone(reconfiguration["total_time"])
+        self.assertIsNone(reconfiguration["last_node"])
+
+    def test_buffered_file(self):
+        reconfiguration_dir = os.path.join(self.directory.name, "deploy")
+        buffer = TimestampsBuffer(lambda: os.path.join(reconfiguration_dir, f"client{timestamps_analysis.BUFFERED_FILE_SUFFIX}"))
+        buffer.record("event", "start", ("uptime",))
+        buffer.record("behavior", "start", ("deploy", "client"))
+        buffer.end_all()
+        buffer.flush()
+        summary = timestamps_analysis.aggregate([reconfiguration_dir], self.output_dir, 1)
+        self.assertEqual(summary["nb_files"], 1)
+        self.assertEqual(summary["nb_intervals"], 2)
+        self.assertEqual(summary["reconfigurations"]["deploy"]["last_node"], "client")
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import yaml
+
+from concerto import timestamps_buffer
+from concerto.timestamps_buffer import TimestampsBuffer
+
+
+class TestTimestampsBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "reconf", "server_timestamps.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def build_buffer(self, capacity=timestamps_buffer.DEFAULT_CAPACITY):
+        return TimestampsBuffer(lambda: self.file_path, capacity)
+
+    def test_round_trip(self):
+        buffer = self.build_buffer(capacity=2)
+        buffer.record("event", "start", ("uptime",))
+        buffer.record("behavior", "start", ("deploy", "server"))
+        buffer.record("behavior", "end", ("deploy", "server"))
+        buffer.record_attribute("event_uptime", "codec", "json")
+        buffer.end_all()
+        buffer.flush()
+
+        rounds = timestamps_buffer.read_timestamps_file(self.file_path)
+        self.assertEqual(len(rounds), 1)
+        timestamps = next(iter(rounds.values()))
+        self.assertEqual(sorted(timestamps), ["behavior_deploy-server", "event_uptime"])
+        self.assertEqual(timestamps["event_uptime"]["codec"], "json")
+        for values in timestamps.values():
+            self.assertLessEqual(values["start"], values["end"])
+        self.assertEqual(buffer.nb_events, 5)
+
+    def test_names_are_written_once(self):
+        for _ in range(2):
+            buffer = self.build_buffer()
+            buffer.record("event", "start", ("uptime",))
+            buffer.record("event", "end", ("uptime",))
+            buffer.flush()
+        with open(timestamps_buffer.build_names_file_path(self.file_path)) as f:
+            self.assertEqual(f.read(), '"event_uptime"\n')
+        for timestamps in timestamps_buffer.read_timestamps_file(self.file_path).values():
+            self.assertEqual(sorted(timestamps["event_uptime"]), ["end", "start"])
+
+    def test_new_file_starts_with_the_round_header(self):
+        buffer = self.build_buffer()
+        buffer.record("event", "start", ("uptime",))
+        buffer.flush()
+        self.file_path = os.path.join(self.directory.name, "next_reconf", "server_timestamps.bin")
+        buffer.record("event", "end", ("uptime",))
+        buffer.flush()
+        rounds = timestamps_buffer.read_timestamps_file(self.file_path)
+        self.assertEqual(list(rounds.values()), [{"event_uptime": {"end": mock.ANY}}])
+
+    def test_records_without_round_header(self):
+        buffer = self.build_buffer()
+        buffer.record("event", "start", ("uptime",))
+        buffer.flush()
+        with open(self.file_path, "rb") as f:
+            data = f.read()
+        with open(self.file_path, "wb") as f:
+            f.write(data[timestamps_buffer.RECORD.size:])
+        with self.assertRaises(Exception):
+            timestamps_buffer.read_timestamps_file(self.file_path)
+
+    def test_convert_to_yaml(self):
+        buffer = self.build_buffer()
+        buffer.record("event", "start", ("uptime",))
+        buffer.record("event", "end", ("uptime",))
+        buffer.flush()
+        yaml_paths = timestamps_buffer.convert_to_yaml(self.file_path, self.directory.name, "server")
+        self.assertEqual(len(yaml_paths), 1)
+        with open(yaml_paths[0]) as f:
+            self.assertEqual(sorted(yaml.safe_load(f)["event_uptime"]), ["end", "start"])
@@ -0,0 +1,55 @@
+import unittest
+
+from concerto import wire_format
+
+VALUES = [None, True, False, 0, 1, 255, 256, -1, 2 ** 31 - 1, -2 ** 31, "ACTIVE", "INACTIVE", "CONN", "DECONN",
+          "", "some data", "données"]
+
+
+class TestWireFormat(unittest.TestCase):
+
+    def test_value_round_trip(self):
+        for value in VALUES:
+            with self.subTest(value=value):
+                decoded_value = wire_format.decode_value(wire_format.encode_value(value))
+                self.assertEqual(decoded_value, value)
+                self.assertIs(type(decoded_value), type(value))
+
+    def test_values_round_trip(self):
+        for values in [[], VALUES, [3] * 1000]:
+            self.assertEqual(wire_format.decode_values(wire_format.encode_values(values)), values)
+
+    def test_binary_payloads_are_detected(self):
+        for value in VALUES:
+            self.assertTrue(wire_format.is_binary(wire_format.encode_value(value)))
+        for text in [b"0", b"12", b"True", b"ACTIVE", b"DECONN"]:
+            self.assertFalse(wire_format.is_binary(text))
+            self.assertEqual(wire_format.decode(text), text.decode())
+
+    def test_truncated_value(self):
+        for value in [256, "some data", True, "ACTIVE"]:
+            payload = wire_format.encode_value(value)
+            for length in range(len(payload)):
+                with self.subTest(value=value, length=length):
+                    with self.assertRaises(ValueError):
+                        wire_format.decode_value(payload[:length])
+
+    def test_truncated_values(self):
+        payload = wire_format.encode_values([1, 256, "some data", None])
+        for length in range(len(payload)):
+            with self.subTest(length=length):
+                with self.assertRaises(ValueError):
+                    wire_format.decode_values(payload[:length])
+
+    def test_unsupported_version(self):
+        payload = wire_format.encode_value(3)
+        with self.assertRaises(ValueError):
+            wire_format.decode_value(bytes([wire_format.WIRE_FORMAT_VERSION + 1]) + payload[1:])
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            wire_format.decode_value(bytes([wire_format.WIRE_FORMAT_VERSION, 42, 0]))
+
+
+if __name__ == "__main__":
+    unittest.main()